@@ -6,58 +6,166 @@ import SudokuSquare
 from utils import *
 from GameResources import *
 
+SCREEN_SIZE = (700, 700)
+IMAGE_PATH = os.path.join(this_path, "images", "sudoku-board-bare.jpg")
 
-def play(values, result, history):
-    assignments = reconstruct(result, history)
-    pygame.init()
+_background = []
+
+
+def square_position(x, y):
+    """Top-left pixel of the square in column x and row y of the board image"""
+    return (x * 57) + (38, 99, 159)[x // 3], (y * 57) + (35, 100, 165)[y // 3]
+
+
+def background():
+    """The board image, loaded once per process"""
+    if not _background:
+        image = pygame.image.load(IMAGE_PATH)
+        if pygame.display.get_surface() is not None:
+            image = image.convert()
+        _background.append(image)
+    return _background[0]
+
+
+def clear_caches():
+    """Forget the cached board image, fonts and tiles; call it after pygame.quit()"""
+    _background.clear()
+    SudokuSquare.clear_caches()
+
+
+def number_of(value):
+    """The number shown for a box value, None while the box is unsolved"""
+    if len(value) > 1 or value == '' or value == '.':
+        return None
+    return int(value)
+
+
+class Board:
+    """The 81 squares of a replay, built once and updated one box at a time
+    Parameters
+    ----------
+    values(dict)
+        the board to show first, in the dictionary representation
+    surface(pygame.Surface)
+        where to draw, the display surface by default
+    """
+    def __init__(self, values, surface=None):
+        self.surface = surface or pygame.display.get_surface()
+        self.squares = {}
+        for y, r in enumerate(rows):
+            for x, c in enumerate(cols):
+                startX, startY = square_position(x, y)
+                self.squares[r + c] = SudokuSquare.SudokuSquare(number_of(values[r + c]), startX, startY, "N", x, y)
+
+    def draw(self):
+        """Draw the whole board and return the area to update"""
+        self.surface.blit(background(), (0, 0))
+        for square in self.squares.values():
+            square.draw(self.surface)
+        return self.surface.get_rect()
 
-    size = width, height = 700, 700
-    screen = pygame.display.set_mode(size)
+    def assign(self, box, value):
+        """Redraw a single box with its new value and return the area to update"""
+        square = self.squares[box]
+        dirty = square.rect()
+        square.setNumber(number_of(value))
+        dirty = dirty.union(square.rect())
+        # restore the board image under the old tile before drawing the new one
+        self.surface.blit(background(), dirty, dirty)
+        square.draw(self.surface)
+        return dirty
 
-#    background_image = pygame.image.load("./images/sudoku-board-bare.jpg").convert()
-    image_path = os.path.join(this_path, "images/sudoku-board-bare.jpg")
-    background_image = pygame.image.load(image_path).convert()
 
+def frames(values, result, history, surface=None):
+    """Draw a replay one frame at a time on surface
+    Parameters
+    ----------
+    values(dict)
+        the puzzle being solved
+    result(dict)
+        the solution reached by the recorded solve
+    history(dict)
+        the history of a recorder, see utils.TraceRecorder
+    Yields
+    ------
+    list
+        the areas of the surface changed by each frame: the whole board first,
+        then the box of each assignment
+    """
+    board = Board(values, surface)
+    yield [board.draw()]
+    for box, value in reconstruct(result, history):
+        yield [board.assign(box, value)]
+
+
+def play(values, result, history, fps=5):
+    pygame.init()
+    screen = pygame.display.set_mode(SCREEN_SIZE)
     clock = pygame.time.Clock()
 
-    while True:
+    for dirty in frames(values, result, history, screen):
         pygame.event.pump()
-        theSquares = []
-        initXLoc = 0
-        initYLoc = 0
-        startX, startY, editable, number = 0, 0, "N", 0
-        for y in range(9):
-            for x in range(9):
-                if x in (0, 1, 2):  startX = (x * 57) + 38
-                if x in (3, 4, 5):  startX = (x * 57) + 99
-                if x in (6, 7, 8):  startX = (x * 57) + 159
-
-                if y in (0, 1, 2):  startY = (y * 57) + 35
-                if y in (3, 4, 5):  startY = (y * 57) + 100
-                if y in (6, 7, 8):  startY = (y * 57) + 165
-                string_number = values[rows[y] + cols[x]]
-                if len(string_number) > 1 or string_number == '' or string_number == '.':
-                    number = None
-                else:
-                    number = int(string_number)
-                theSquares.append(SudokuSquare.SudokuSquare(number, startX, startY, editable, x, y))
-
-        screen.blit(background_image, (0, 0))
-        for num in theSquares:
-            num.draw()
-
-        pygame.display.flip()
-        pygame.display.update()
-        clock.tick(5)
-
-        if len(assignments) == 0:
-            break
-        box, value = assignments.pop()
-        values[box] = value
+        pygame.display.update(dirty)
+        clock.tick(fps)
 
     # leave game showing until closed by user
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
+        if pygame.event.wait().type == pygame.QUIT:
+            pygame.quit()
+            quit()
+
+
+def export(values, result, history, path, fps=5):
+    """Render a replay without a window and save its frames, as fast as they can be drawn
+    Parameters
+    ----------
+    path(string)
+        a .gif file (needs Pillow), or a file name pattern with a frame number
+        placeholder, e.g. 'replay/frame_{:04d}.png'
+    fps(int)
+        frames per second of the GIF
+    Returns
+    -------
+    int
+        the number of frames
+    """
+    # SDL's dummy video driver needs no display; it has to be chosen before the display starts
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+    screen = pygame.display.get_surface() or pygame.display.set_mode(SCREEN_SIZE)
+
+    if path.lower().endswith('.gif'):
+        from PIL import Image  # Pillow is only needed for GIF export
+        images = [Image.frombytes('RGB', screen.get_size(), pygame.image.tostring(screen, 'RGB'))
+                  for _ in frames(values, result, history, screen)]
+        images[0].save(path, save_all=True, append_images=images[1:], duration=1000 // fps, loop=0)
+        return len(images)
+
+    count = 0
+    for count, _ in enumerate(frames(values, result, history, screen), 1):
+        pygame.image.save(screen, path.format(count - 1))
+    return count
+
+
+def main(argv=None):
+    import argparse
+    import solution
+    parser = argparse.ArgumentParser(description="Replay the solve of a diagonal sudoku.")
+    parser.add_argument('grid', help="the puzzle, 81 characters with '.' for empty boxes")
+    parser.add_argument('--export', metavar='PATH',
+                        help="save the frames to a .gif file or a pattern like 'frame_{:04d}.png' instead of playing")
+    parser.add_argument('--fps', type=int, default=5, help="frames per second")
+    args = parser.parse_args(argv)
+
+    recorder = TraceRecorder()
+    result = solution.solve(args.grid, recorder=recorder)
+    if not result:
+        sys.exit("The puzzle has no solution")
+    if args.export:
+        print(export(grid2values(args.grid), result, recorder.history, args.export, args.fps), "frames written")
+    else:
+        play(grid2values(args.grid), result, recorder.history, args.fps)
+
+if __name__ == "__main__":
+    main()
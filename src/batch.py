@@ -0,0 +1,141 @@
+"""Solve many diagonal sudokus at once, optionally across a pool of processes.
+
+Usage: python batch.py puzzles.txt [-o solutions.txt] [-j WORKERS] [--chunksize N]
+
+The input file (plain or gzip-compressed) holds one 81-character grid per line,
+or grids spread over 9 lines; see reader.py for the formats accepted. The output
+holds one line per record, in input order: the solved grid, 'unsolvable', or
+'invalid' for a malformed record. Malformed records are also reported to
+--errors (stderr by default).
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+from functools import partial
+from itertools import islice
+
+import reader
+import solution
+from utils import grid2values, values2grid
+
+UNSOLVABLE = 'unsolvable'
+INVALID = 'invalid'
+
+
+def solve_grid(grid, engine='bitmask'):
+    """Solve one grid string and return the solved grid string, or False.
+    Results are passed between processes as strings, which pickle far more
+    cheaply than the dictionary representation. A None grid (a rejected record)
+    gives None.
+    """
+    if grid is None:
+        return None
+    values = solution.solve(grid, engine=engine)
+    return values and values2grid(values)
+
+
+def solve_chunk(grids):
+    """Solve a list of grid strings with the vectorized NumPy propagator"""
+    import vectorized  # numpy is only needed for vectorized runs
+    results = iter(vectorized.solve_batch([grid for grid in grids if grid is not None]))
+    return [None if grid is None else next(results) for grid in grids]
+
+
+def chunked(items, size):
+    """Group an iterable into lists of at most size items"""
+    items = iter(items)
+    while True:
+        chunk = list(islice(items, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def imap_ordered(func, items, workers, chunksize=1):
+    """map() in the calling process for a single worker, Pool.imap otherwise"""
+    if workers <= 1:
+        yield from map(func, items)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(func, items, chunksize)
+
+
+def checked_grids(path, errors=None):
+    """Yield the grids of a puzzle file in input order, and None for each rejected
+    record, so that results stay aligned with the input records. Rejected
+    records are reported to errors.
+    """
+    # contradictory grids are still solved, so that they get their 'unsolvable' line
+    for record in reader.validate(reader.parse(reader.iter_lines(path)), contradictions=False):
+        if record.error is None:
+            yield record.grid
+            continue
+        if errors is not None:
+            reader.write_error(errors, record)
+        yield None
+
+
+def solve_grids(grids, workers=None, chunksize=64, engine='bitmask', vectorized=False):
+    """Solve an iterable of grid strings and yield solved grid strings (or False) in input order.
+    None items are passed through as None.
+    Parameters
+    ----------
+    grids(iterable)
+        grid strings; it is consumed lazily, so it can be a file or a generator
+    workers(int)
+        number of worker processes, defaults to the number of CPUs. With a single
+        worker everything runs in the calling process.
+    chunksize(int)
+        number of grids sent to a worker at a time
+    engine(string)
+        the solver backend, see solution.ENGINES
+    vectorized(bool)
+        propagate each chunk of grids at once with NumPy (see vectorized.py) and
+        only search the boards that propagation cannot finish; engine is ignored.
+        Use chunks of a few hundred grids or more for this to pay off.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if vectorized:
+        for results in imap_ordered(solve_chunk, chunked(grids, chunksize), workers):
+            yield from results
+        return
+    yield from imap_ordered(partial(solve_grid, engine=engine), grids, workers, chunksize)
+
+
+def solve_many(grids, workers=None, chunksize=64, engine='bitmask', vectorized=False):
+    """Solve an iterable of grid strings, yielding what solve() returns for each
+    of them (the solved dictionary or False), in input order.
+    See solve_grids() for the parameters.
+    """
+    for result in solve_grids(grids, workers, chunksize, engine, vectorized):
+        yield result and grid2values(result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a file of diagonal sudoku grids, one per line.")
+    parser.add_argument('puzzles', help="plain or gzip-compressed file of grids ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="where to write the solutions (default: stdout)")
+    parser.add_argument('--errors', default='-', help="where to report malformed records (default: stderr)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--chunksize', type=int, default=64, help="grids sent to a worker at a time")
+    parser.add_argument('--engine', default='bitmask', choices=sorted(solution.ENGINES))
+    parser.add_argument('--vectorized', action='store_true',
+                        help="propagate whole chunks at once with NumPy (try --chunksize 1024)")
+    args = parser.parse_args(argv)
+
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+    report = sys.stderr if args.errors == '-' else open(args.errors, 'w')
+    try:
+        grids = checked_grids(args.puzzles, report)
+        for result in solve_grids(grids, args.workers, args.chunksize, args.engine, args.vectorized):
+            outfile.write((INVALID if result is None else result or UNSOLVABLE) + '\n')
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+        if report is not sys.stderr:
+            report.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""Benchmark solve() on the bundled puzzle sets and track regressions.
+
+Usage: python benchmark.py [--sets easy hard ...] [--engine ENGINE] [--repeat N]
+                           [--branching VARIABLE VALUE] [--compare-branching]
+                           [--pipeline STRATEGY ...] [--compare-strategies] [--startup]
+                           [-o results.json] [--baseline baseline.json] [--threshold 0.1]
+
+Each set in benchmarks/ is solved puzzle by puzzle. For every set the report
+holds the median, p95 and p99 latency, the search nodes and propagation passes
+(from SolveStats), and the peak memory allocated during a solve. Latencies are
+measured on plain solve() calls; the counts and the memory (with tracemalloc)
+come from separate passes, so that neither kind of instrumentation skews them.
+
+With --baseline, the results are compared against a previous JSON report. The
+exit status is 1 if a metric is worse than the baseline by more than the
+threshold (a fraction, 0.1 = 10%).
+
+With --compare-branching, every set is also solved with each combination of
+variable and value order (see strategies.py), and the report shows the search
+nodes of each one and their reduction relative to the default branching.
+
+With --compare-strategies, every set is also solved with each rule that is not
+in the default pipeline added to it ('+rule'), with all of them ('all'), and
+with all of them but one ('-rule'), and the report shows the search nodes of
+each pipeline and their reduction relative to the default one.
+
+With --startup, the report also holds the cold start of the solver: the time
+`import solution` takes in a fresh interpreter, from python -X importtime, and
+the heavy modules (asyncio, json, numpy, pygame) that it loads, which should be
+none. Run it without PYTHONDONTWRITEBYTECODE, or the times include compiling
+the sources.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from itertools import product
+from time import perf_counter
+
+import reader
+import solution
+from metrics import percentile
+from strategies import (DEFAULT_BRANCHING, DEFAULT_PIPELINE, EXTRA_STRATEGIES, STRATEGY_NAMES, VALUE_ORDERS,
+                        VARIABLE_ORDERS, Branching, SolveStats)
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+BENCHMARK_DIR = os.path.join(SOURCE_DIR, 'benchmarks')
+SETS = ('easy', 'hard', 'adversarial', 'unsolvable')
+# metrics compared against a baseline; higher is worse for all of them
+TRACKED = ('median_ms', 'p95_ms', 'p99_ms', 'nodes', 'propagations', 'peak_kib')
+# modules that have no place on the import path of the solving API
+HEAVY_MODULES = ('asyncio', 'json', 'numpy', 'pygame')
+
+
+def load_set(name):
+    """Return the grids of a bundled puzzle set"""
+    return list(reader.read_grids(os.path.join(BENCHMARK_DIR, name + '.txt')))
+
+
+def peak_memory(grid, solve):
+    """Peak bytes allocated by Python while solve(grid) runs"""
+    tracemalloc.start()
+    try:
+        solve(grid)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run_set(grids, engine='bitmask', pipeline=DEFAULT_PIPELINE, repeat=1, memory=True, branching=DEFAULT_BRANCHING):
+    """Solve every grid of a set and summarize what it took
+    Parameters
+    ----------
+    grids(list)
+        the grid strings to solve
+    engine(string)
+        the solver backend, see solution.ENGINES
+    pipeline(tuple)
+        the strategies to apply
+    repeat(int)
+        solve each grid this many times and keep its fastest time
+    memory(bool)
+        whether to measure the peak memory of each solve as well
+    branching(Branching)
+        the variable and value orders of the search
+    Returns
+    -------
+    dict
+        count, solved, latency percentiles in milliseconds, total nodes,
+        backtracks and propagations, and the largest peak memory in KiB
+    """
+    latencies = []
+    solved = nodes = backtracks = propagations = 0
+    for grid in grids:
+        best = None
+        for _ in range(repeat):
+            started = perf_counter()
+            solution.solve(grid, engine=engine, pipeline=pipeline, branching=branching)
+            elapsed = perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        latencies.append(best * 1000)
+        # SolveStats times every strategy, so the counts come from a separate, untimed solve
+        stats = SolveStats(pipeline)
+        result = solution.solve(grid, engine=engine, pipeline=pipeline, stats=stats, branching=branching)
+        solved += bool(result)
+        nodes += stats.nodes
+        backtracks += stats.backtracks
+        propagations += stats.propagations
+    report = {
+        'count': len(grids), 'solved': solved,
+        'median_ms': percentile(latencies, 50), 'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99), 'max_ms': max(latencies),
+        'nodes': nodes, 'backtracks': backtracks, 'propagations': propagations,
+    }
+    if memory:
+        solve = lambda grid: solution.solve(grid, engine=engine, pipeline=pipeline, branching=branching)
+        report['peak_kib'] = max(peak_memory(grid, solve) for grid in grids) / 1024
+    return report
+
+
+def run(sets=SETS, engine='bitmask', pipeline=DEFAULT_PIPELINE, repeat=1, memory=True, branching=DEFAULT_BRANCHING):
+    """Run the benchmark on the named sets and return the full JSON-ready report"""
+    return {
+        'engine': engine,
+        'pipeline': list(pipeline),
+        'branching': list(branching),
+        'python': platform.python_version(),
+        'sets': {name: run_set(load_set(name), engine, pipeline, repeat, memory, branching) for name in sets},
+    }
+
+
+def count_nodes(grids, engine='bitmask', pipeline=DEFAULT_PIPELINE, branching=DEFAULT_BRANCHING):
+    """Total search nodes needed to solve grids"""
+    total = 0
+    for grid in grids:
+        stats = SolveStats(pipeline)
+        solution.solve(grid, engine=engine, pipeline=pipeline, stats=stats, branching=branching)
+        total += stats.nodes
+    return total
+
+
+def reductions(nodes, baseline):
+    """{configuration: {'nodes': int, 'reduction': fraction of the baseline's nodes saved}}"""
+    default = nodes[baseline]
+    return {key: {'nodes': count, 'reduction': 1 - count / default if default else 0.0}
+            for key, count in nodes.items()}
+
+
+def compare_branching(sets=SETS, engine='bitmask', pipeline=DEFAULT_PIPELINE):
+    """Count the search nodes of each set under every branching configuration
+    Returns
+    -------
+    dict
+        {set name: {'variable/value': {'nodes': int, 'reduction': fraction of the
+        default branching's nodes saved}}}
+    """
+    report = {}
+    for name in sets:
+        grids = load_set(name)
+        nodes = {'/'.join(branching): count_nodes(grids, engine, pipeline, branching)
+                 for branching in map(Branching._make, product(VARIABLE_ORDERS, VALUE_ORDERS))}
+        report[name] = reductions(nodes, '/'.join(DEFAULT_BRANCHING))
+    return report
+
+
+def compare_strategies(sets=SETS, engine='bitmask', branching=DEFAULT_BRANCHING):
+    """Count the search nodes of each set with and without each extra strategy
+    Returns
+    -------
+    dict
+        {set name: {pipeline: {'nodes': int, 'reduction': fraction of the default
+        pipeline's nodes saved}}}, where the pipelines are 'default', '+rule' for
+        each extra rule, 'all', and '-rule' for all the rules but one
+    """
+    pipelines = {'default': DEFAULT_PIPELINE}
+    pipelines.update(('+' + rule, DEFAULT_PIPELINE + (rule,)) for rule in EXTRA_STRATEGIES)
+    pipelines['all'] = STRATEGY_NAMES
+    pipelines.update(('-' + rule, tuple(name for name in STRATEGY_NAMES if name != rule)) for rule in EXTRA_STRATEGIES)
+    report = {}
+    for name in sets:
+        grids = load_set(name)
+        nodes = {key: count_nodes(grids, engine, pipeline, branching) for key, pipeline in pipelines.items()}
+        report[name] = reductions(nodes, 'default')
+    return report
+
+
+def parse_importtime(output):
+    """{module: (self microseconds, cumulative microseconds)} from the stderr of python -X importtime"""
+    times = {}
+    for line in output.splitlines():
+        fields = line.partition('import time:')[2].split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return times
+
+
+def measure_startup(module='solution', repeat=5):
+    """Time the import of module in fresh interpreters with python -X importtime
+    Parameters
+    ----------
+    module(string)
+        the module to import, from the source directory
+    repeat(int)
+        imports to time, after a first one that warms the bytecode cache
+    Returns
+    -------
+    dict
+        import_ms: the median cumulative import time of the module
+        modules: the number of modules that import loaded
+        slowest: {module: self time in ms} of the five slowest of them
+        heavy: the HEAVY_MODULES that were loaded, which should be none
+    """
+    code = 'import sys, {}; print(" ".join(name for name in {!r} if name in sys.modules))'.format(
+        module, HEAVY_MODULES)
+    runs = []
+    for _ in range(repeat + 1):
+        done = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=SOURCE_DIR,
+                              capture_output=True, text=True, check=True)
+        runs.append((parse_importtime(done.stderr), done.stdout.split()))
+    runs = sorted(runs[1:], key=lambda run: run[0][module][1])
+    times, heavy = runs[len(runs) // 2]
+    slowest = sorted(times, key=lambda name: times[name][0], reverse=True)[:5]
+    return {
+        'import_ms': times[module][1] / 1000,
+        'modules': len(times),
+        'slowest': {name: times[name][0] / 1000 for name in slowest},
+        'heavy': heavy,
+    }
+
+
+def compare(results, baseline, threshold=0.1):
+    """List the metrics of results that are worse than baseline by more than threshold
+    Returns
+    -------
+    list
+        (set name, metric, baseline value, new value) tuples
+    """
+    regressions = []
+    for name, report in results['sets'].items():
+        before = baseline.get('sets', {}).get(name)
+        if before is None:
+            continue
+        for metric in TRACKED:
+            if metric in report and metric in before and report[metric] > before[metric] * (1 + threshold):
+                regressions.append((name, metric, before[metric], report[metric]))
+    before, after = baseline.get('startup'), results.get('startup')
+    if before and after and after['import_ms'] > before['import_ms'] * (1 + threshold):
+        regressions.append(('startup', 'import_ms', before['import_ms'], after['import_ms']))
+    return regressions
+
+
+def format_report(results):
+    lines = ['{:<12} {:>5} {:>6} {:>10} {:>10} {:>10} {:>8} {:>8} {:>10}'.format(
+        'set', 'count', 'solved', 'median ms', 'p95 ms', 'p99 ms', 'nodes', 'passes', 'peak KiB')]
+    for name, r in results['sets'].items():
+        lines.append('{:<12} {:>5} {:>6} {:>10.3f} {:>10.3f} {:>10.3f} {:>8} {:>8} {:>10}'.format(
+            name, r['count'], r['solved'], r['median_ms'], r['p95_ms'], r['p99_ms'], r['nodes'],
+            r['propagations'], '{:.1f}'.format(r['peak_kib']) if 'peak_kib' in r else '-'))
+    return '\n'.join(lines)
+
+
+def format_branching(report):
+    configurations = list(next(iter(report.values())))
+    lines = ['{:<12}'.format('set') + ''.join('{:>22}'.format(key) for key in configurations)]
+    for name, by_configuration in report.items():
+        lines.append('{:<12}'.format(name) + ''.join(
+            '{:>22}'.format('{} ({:+.0%})'.format(r['nodes'], 0.0 - r['reduction'])) for r in by_configuration.values()))
+    return '\n'.join(lines)
+
+
+def format_strategies(report):
+    """One line per pipeline and one column per set, as there are many pipelines"""
+    sets = list(report)
+    lines = ['{:<18}'.format('pipeline') + ''.join('{:>20}'.format(name) for name in sets)]
+    for key in report[sets[0]]:
+        lines.append('{:<18}'.format(key) + ''.join(
+            '{:>20}'.format('{} ({:+.0%})'.format(report[name][key]['nodes'], 0.0 - report[name][key]['reduction']))
+            for name in sets))
+    return '\n'.join(lines)
+
+
+def format_startup(report):
+    lines = ['import solution: {:.1f} ms, {} modules, heavy modules: {}'.format(
+        report['import_ms'], report['modules'], ', '.join(report['heavy']) or 'none')]
+    lines.extend('  {:<30} {:>8.2f} ms'.format(name, ms) for name, ms in report['slowest'].items())
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the solver on the bundled puzzle sets.")
+    parser.add_argument('--sets', nargs='+', choices=SETS, default=list(SETS))
+    parser.add_argument('--engine', default='bitmask', choices=sorted(solution.ENGINES))
+    parser.add_argument('--repeat', type=int, default=3, help="solves per puzzle, the fastest one counts")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the peak memory pass")
+    parser.add_argument('--branching', nargs=2, metavar=('VARIABLE', 'VALUE'), default=list(DEFAULT_BRANCHING),
+                        help="variable order {} and value order {}".format(VARIABLE_ORDERS, VALUE_ORDERS))
+    parser.add_argument('--compare-branching', action='store_true',
+                        help="report the search nodes of every branching configuration")
+    parser.add_argument('--pipeline', nargs='+', choices=STRATEGY_NAMES, default=list(DEFAULT_PIPELINE),
+                        help="the strategies to apply (default: %(default)s)")
+    parser.add_argument('--compare-strategies', action='store_true',
+                        help="report the search nodes with and without each extra strategy")
+    parser.add_argument('--startup', action='store_true',
+                        help="report the import time of the solver in a fresh interpreter")
+    parser.add_argument('-o', '--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="relative slowdown that counts as a regression (default: 0.1)")
+    args = parser.parse_args(argv)
+
+    results = run(args.sets, args.engine, args.pipeline, args.repeat, args.memory, args.branching)
+    print(format_report(results))
+    if args.compare_branching:
+        results['branching_nodes'] = compare_branching(args.sets, args.engine, args.pipeline)
+        print()
+        print(format_branching(results['branching_nodes']))
+    if args.compare_strategies:
+        results['strategy_nodes'] = compare_strategies(args.sets, args.engine, args.branching)
+        print()
+        print(format_strategies(results['strategy_nodes']))
+    if args.startup:
+        results['startup'] = measure_startup(repeat=args.repeat)
+        print()
+        print(format_startup(results['startup']))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for name, metric, before, after in regressions:
+            print('REGRESSION {} {}: {:.3f} -> {:.3f}'.format(name, metric, before, after))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
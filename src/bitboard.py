@@ -0,0 +1,652 @@
+"""Bitmask candidate engine for sudoku boards described by a Topology.
+
+Each box is stored as an integer in a flat array, where bit ``d - 1`` is set
+while the d-th symbol is still a candidate for that box (9 bits per box on the
+usual 9x9 board). Units and peers come from the topology as tuples of integer
+indices, so the strategies below never touch strings or dictionaries until
+the final board is converted back to the usual ``{'A1': '8', ...}`` form.
+"""
+from array import array
+from itertools import combinations
+from time import perf_counter
+
+from strategies import DEFAULT_BRANCHING, DEFAULT_PIPELINE, DIAGONAL_WEIGHT, check_branching, check_pipeline
+from tracing import NULL_TRACER
+from utils import NULL_RECORDER
+
+
+def new_cells(tables, masks):
+    """Build the flat cell array for a topology; 16-bit slots are enough up to 16x16"""
+    return array('H' if tables.size <= 16 else 'L', masks)
+
+
+def grid2cells(grid, tables):
+    """Convert a grid string into a flat array of candidate masks ('.' or '0' means any symbol).
+    Raises ValueError for a grid of the wrong length or with unexpected characters.
+    """
+    if len(grid) != len(tables.boxes):
+        raise ValueError("expected a grid of {} characters, got {}".format(len(tables.boxes), len(grid)))
+    mask_of = tables.mask_of
+    try:
+        return new_cells(tables, (tables.all_digits if val in '.0' else mask_of[val] for val in grid))
+    except KeyError as e:
+        raise ValueError("unexpected character in grid: {!r}".format(e.args[0])) from None
+
+
+def values2cells(values, tables):
+    """Convert the dictionary board representation into a flat array of candidate masks"""
+    mask_of = tables.mask_of
+    return new_cells(tables, (sum(mask_of[symbol] for symbol in values[box]) for box in tables.boxes))
+
+
+def cells2values(cells, tables):
+    """Convert a flat array of candidate masks into the dictionary board representation"""
+    return {box: tables.mask2symbols(mask) for box, mask in zip(tables.boxes, cells)}
+
+
+def cells2grid(cells, tables):
+    """Convert a flat array of candidate masks into a grid string ('.' for unsolved boxes)"""
+    symbol_of = tables.symbol_of
+    return ''.join([symbol_of.get(mask, '.') for mask in cells])
+
+
+def eliminate(cells, tables):
+    """Clear the digit of every solved box from the candidates of its peers"""
+    peers = tables.cell_peers
+    popcount = tables.popcount
+    for i, mask in enumerate(cells):
+        if popcount[mask] == 1:
+            keep = ~mask
+            for p in peers[i]:
+                cells[p] &= keep
+    return cells
+
+
+def only_choice(cells, tables):
+    """Assign a digit to a box whenever it is the only place left for it in a unit"""
+    for unit in tables.unit_cells:
+        for bit in tables.digit_bits:
+            place = -1
+            for i in unit:
+                if cells[i] & bit:
+                    if place >= 0:
+                        break
+                    place = i
+            else:
+                if place >= 0:
+                    cells[place] = bit
+    return cells
+
+
+def naked_twins(cells, tables):
+    """Clear the digits of each naked pair from the other boxes in its unit.
+
+    Pairs are grouped by their mask, so each unit is scanned once instead of
+    comparing every two boxes. As in ``solution.naked_twins``, all pairs are
+    detected on the original input before any of them is applied.
+    """
+    popcount = tables.popcount
+    original = cells[:]
+    for unit in tables.unit_cells:
+        seen = set()
+        twins = set()
+        for i in unit:
+            mask = original[i]
+            if popcount[mask] == 2:
+                if mask in seen:
+                    twins.add(mask)
+                seen.add(mask)
+        for pair in twins:
+            keep = ~pair
+            for i in unit:
+                if original[i] != pair:
+                    cells[i] &= keep
+    return cells
+
+
+def count_solved(cells, tables):
+    """Number of boxes with exactly one candidate left"""
+    popcount = tables.popcount
+    return sum(1 for mask in cells if popcount[mask] == 1)
+
+
+def record_assignment(cells, tables, i, recorder):
+    """Hand the assignment that just solved box i to the recorder, chaining grid
+    strings the same way as utils.assign_value
+    """
+    grid = cells2grid(cells, tables)
+    recorder.record(grid[:i] + '.' + grid[i + 1:], grid, (tables.boxes[i], grid[i]))
+
+
+class Solver:
+    """A configured bitmask solve: the index tables, the strategy pipeline, and the
+    optional recorder and stats that observe it.
+
+    Parameters
+    ----------
+    tables(Topology)
+        the board topology, see topology.py
+    pipeline(tuple)
+        the strategies to apply, see strategies.check_pipeline. The solver always
+        clears solved digits from peers first and then re-checks changed units with
+        the other strategies in pipeline order.
+    recorder(NullRecorder or TraceRecorder)
+        receives every assignment that solves a box
+    stats(SolveStats)
+        filled in with per-strategy counters and the size of the search tree, if given
+    tracer(NullTracer or SearchTracer)
+        receives the choice points, nodes and solutions of the search
+    branching(Branching)
+        the variable and value orders of the search, see strategies.py
+    budget(budget.Budget)
+        charged for every search node; it stops the search by raising BudgetExceeded
+    """
+    def __init__(self, tables, pipeline=DEFAULT_PIPELINE, recorder=NULL_RECORDER, stats=None, tracer=NULL_TRACER,
+                 branching=DEFAULT_BRANCHING, budget=None):
+        self.tables = tables
+        self.pipeline = check_pipeline(pipeline)
+        self.branching = check_branching(branching)
+        # (name, method) of the strategies that re-check a dirty unit
+        self.unit_strategies = tuple((name, getattr(self, name)) for name in self.pipeline if name != 'eliminate')
+        self.recorder = recorder
+        self.stats = stats
+        self.tracer = tracer
+        self.budget = budget
+        # hot lookups, kept on the solver to save an attribute access per use
+        self.popcount = tables.popcount
+        self.all_digits = tables.all_digits
+        self.cell_units = tables.cell_units
+        self.digit_orders = {}
+        self.digits_of = {}  # mask -> indices of its digits
+        if self.branching.variable == 'mrv_degree':
+            self.diagonal_bonus = diagonal_bonus(tables)
+
+    def choose_box(self, cells):
+        """Index of the unsolved box to branch on, or -1 if every box is solved"""
+        if self.branching.variable == 'mrv':
+            return choose_box(cells, self.popcount)
+        return choose_box_degree(cells, self.tables, self.diagonal_bonus)
+
+    def order_values(self, cells, i):
+        """The candidate bits of box i, in the order the search tries them"""
+        if self.branching.value == 'lcv':
+            return least_constraining(cells, self.tables, i)
+        mask = cells[i]
+        order = self.digit_orders.get(mask)
+        if order is None:
+            order = self.digit_orders[mask] = tuple(bit for bit in self.tables.digit_bits if mask & bit)
+        return order
+
+    def propagate(self, cells, singles, dirty, trail):
+        """Event-driven propagation of the pipeline strategies.
+
+        Only boxes whose candidates changed generate work: a box that becomes solved
+        is pushed on ``singles`` so its digit is cleared from its peers (eliminate),
+        and every changed box marks its member units as ``dirty`` so they are
+        re-checked by the other strategies of the pipeline (only_choice, naked_twins,
+        ...), each of which is a method taking the index of the dirty unit.
+        Propagation stops when both queues drain.
+
+        Parameters
+        ----------
+        cells(array)
+            the candidate masks, modified in place
+        singles(list)
+            indices of solved boxes whose digit has not been cleared from their peers yet
+        dirty(set)
+            indices (into tables.unit_cells) of the units that have to be re-checked
+        trail(list)
+            receives the index and the previous mask of every changed box (as two
+            flat entries, to avoid allocating a tuple per change), so the caller can
+            undo the propagation with rewind()
+
+        Returns
+        -------
+        array or False
+            The cells, or False as soon as a box or a digit in a unit runs out of places.
+        """
+        tables = self.tables
+        peers = tables.cell_peers
+        member_units = tables.cell_units
+        popcount = tables.popcount
+        unit_strategies = self.unit_strategies
+        recorder = self.recorder
+        record = recorder.enabled
+        stats = self.stats
+        push = trail.append
+        if stats is not None:
+            stats.propagations += 1
+        while singles or dirty:
+            # eliminate: clear each newly solved digit from the peers of its box
+            if stats is not None:
+                counter = stats.strategy('eliminate')
+                started = perf_counter()
+                mark = len(trail)
+                counter.calls += len(singles)
+            while singles:
+                i = singles.pop()
+                mask = cells[i]
+                for p in peers[i]:
+                    old = cells[p]
+                    if old & mask:
+                        new = old ^ mask
+                        if not new:
+                            if stats is not None:
+                                counter.contradictions += 1
+                            return False
+                        push(p)
+                        push(old)
+                        cells[p] = new
+                        dirty.update(member_units[p])
+                        if popcount[new] == 1:
+                            singles.append(p)
+                            if stats is not None:
+                                counter.calls += 1
+                            if record:
+                                record_assignment(cells, tables, p, recorder)
+            if stats is not None:
+                counter.seconds += perf_counter() - started
+                counter.eliminated += (len(trail) - mark) // 2
+            if not dirty:
+                break
+            u = dirty.pop()
+            for name, strategy in unit_strategies:
+                if stats is not None:
+                    counter = stats.strategy(name)
+                    counter.calls += 1
+                    started = perf_counter()
+                    mark = len(trail)
+                ok = strategy(cells, u, singles, dirty, push)
+                if stats is not None:
+                    counter.seconds += perf_counter() - started
+                    counter.eliminated += sum(popcount[trail[k + 1]] - popcount[cells[trail[k]]]
+                                              for k in range(mark, len(trail), 2))
+                    if not ok:
+                        counter.contradictions += 1
+                if not ok:
+                    return False
+        return cells
+
+    def remove(self, cells, i, mask, singles, dirty, push):
+        """Clear the candidates of mask from box i, queueing the events it causes;
+        False if that leaves the box without candidates
+        """
+        old = cells[i]
+        if not old & mask:
+            return True
+        new = old & ~mask
+        if not new:
+            return False
+        push(i)
+        push(old)
+        cells[i] = new
+        dirty.update(self.cell_units[i])
+        if self.popcount[new] == 1:
+            singles.append(i)
+            if self.recorder.enabled:
+                record_assignment(cells, self.tables, i, self.recorder)
+        return True
+
+    def places(self, cells, unit):
+        """For each digit, the positions in unit of the boxes where it is a candidate, as a bitmask"""
+        places = [0] * self.tables.size
+        digits_of = self.digits_of
+        for k, i in enumerate(unit):
+            mask = cells[i]
+            digits = digits_of.get(mask)
+            if digits is None:
+                digits = digits_of[mask] = tuple(d for d, bit in enumerate(self.tables.digit_bits) if mask & bit)
+            for d in digits:
+                places[d] |= 1 << k
+        return places
+
+    def only_choice(self, cells, u, singles, dirty, push):
+        """Assign the digits that have a single place left in the unit; False on contradiction"""
+        unit = self.tables.unit_cells[u]
+        once = twice = 0
+        for i in unit:
+            mask = cells[i]
+            twice |= once & mask
+            once |= mask
+        if once != self.all_digits:
+            return False
+        hidden = once & ~twice
+        if hidden:
+            member_units = self.cell_units
+            popcount = self.popcount
+            for i in unit:
+                mask = cells[i] & hidden
+                if mask and mask != cells[i]:
+                    if popcount[mask] > 1:
+                        return False
+                    push(i)
+                    push(cells[i])
+                    cells[i] = mask
+                    singles.append(i)
+                    dirty.update(member_units[i])
+                    if self.recorder.enabled:
+                        record_assignment(cells, self.tables, i, self.recorder)
+        return True
+
+    def naked_twins(self, cells, u, singles, dirty, push):
+        """Clear the digits of each naked pair from the rest of the unit; False on contradiction"""
+        unit = self.tables.unit_cells[u]
+        pairs = set()
+        member_units = self.cell_units
+        popcount = self.popcount
+        for i in unit:
+            mask = cells[i]
+            if popcount[mask] != 2:
+                continue
+            if mask not in pairs:
+                pairs.add(mask)
+                continue
+            for p in unit:
+                old = cells[p]
+                if old & mask and old != mask:
+                    new = old & ~mask
+                    if not new:
+                        return False
+                    push(p)
+                    push(old)
+                    cells[p] = new
+                    dirty.update(member_units[p])
+                    if popcount[new] == 1:
+                        singles.append(p)
+                        if self.recorder.enabled:
+                            record_assignment(cells, self.tables, p, self.recorder)
+        return True
+
+    def naked_triples(self, cells, u, singles, dirty, push):
+        """Clear the digits of three boxes with three candidates in all from the rest
+        of the unit; False on contradiction
+        """
+        unit = self.tables.unit_cells[u]
+        popcount = self.popcount
+        candidates = [i for i in unit if 1 < popcount[cells[i]] <= 3]
+        for group in combinations(candidates, 3):
+            digits = cells[group[0]] | cells[group[1]] | cells[group[2]]
+            if popcount[digits] > 3:
+                continue
+            if popcount[digits] < 3:
+                return False  # three boxes, fewer than three digits
+            for i in unit:
+                if i not in group and not self.remove(cells, i, digits, singles, dirty, push):
+                    return False
+        return True
+
+    def hidden_subsets(self, cells, u, n, singles, dirty, push):
+        """Restrict the boxes of n digits that share n places in the unit to those digits"""
+        unit = self.tables.unit_cells[u]
+        popcount = self.popcount
+        places = zip(self.tables.digit_bits, self.places(cells, unit))
+        candidates = [(bit, where) for bit, where in places if 2 <= popcount[where] <= n]
+        for group in combinations(candidates, n):
+            digits = where = 0
+            for bit, positions in group:
+                digits |= bit
+                where |= positions
+            if popcount[where] > n:
+                continue
+            if popcount[where] < n:
+                return False  # n digits, fewer than n places
+            for k, i in enumerate(unit):
+                if where >> k & 1 and not self.remove(cells, i, ~digits & self.all_digits, singles, dirty, push):
+                    return False
+        return True
+
+    def hidden_pairs(self, cells, u, singles, dirty, push):
+        """Restrict two boxes to the two digits that have no other place in the unit"""
+        return self.hidden_subsets(cells, u, 2, singles, dirty, push)
+
+    def hidden_triples(self, cells, u, singles, dirty, push):
+        """Restrict three boxes to the three digits that have no other place in the unit"""
+        return self.hidden_subsets(cells, u, 3, singles, dirty, push)
+
+    def confine(self, cells, u, singles, dirty, push):
+        """Clear the digits that are confined to the intersection of unit u with
+        another unit from the rest of that other unit
+        """
+        for shared, outside, rest in self.tables.intersections[u]:
+            inside = elsewhere = 0
+            for i in shared:
+                inside |= cells[i]
+            for i in outside:
+                elsewhere |= cells[i]
+            confined = inside & ~elsewhere
+            if confined:
+                for i in rest:
+                    if not self.remove(cells, i, confined, singles, dirty, push):
+                        return False
+        return True
+
+    def pointing_pairs(self, cells, u, singles, dirty, push):
+        """Digits confined to one row, column or diagonal inside a region leave the rest of it"""
+        if u not in self.tables.region_ids:
+            return True
+        return self.confine(cells, u, singles, dirty, push)
+
+    def box_line(self, cells, u, singles, dirty, push):
+        """Digits confined to one region inside a row, column or diagonal leave the rest of the region"""
+        if u in self.tables.region_ids:
+            return True
+        return self.confine(cells, u, singles, dirty, push)
+
+    def x_wing(self, cells, u, singles, dirty, push):
+        """Find the X-Wings of a dirty row (or column): a digit with the same two places
+        in another row is cleared from the rest of the two columns of those places
+        """
+        tables = self.tables
+        if u in tables.row_ids:
+            parallel, cross = tables.row_ids, tables.column_ids
+        elif u in tables.column_ids:
+            parallel, cross = tables.column_ids, tables.row_ids
+        else:
+            return True
+        unitlist = tables.unit_cells
+        line = unitlist[u]
+        wings = [(d, where) for d, where in enumerate(self.places(cells, line)) if self.popcount[where] == 2]
+        if not wings:
+            return True
+        for v in parallel:
+            if v == u:
+                continue
+            places = self.places(cells, unitlist[v])
+            for d, where in wings:
+                if places[d] != where:
+                    continue
+                bit = tables.digit_bits[d]
+                base = set(line).union(unitlist[v])
+                for k in range(tables.size):
+                    if where >> k & 1:
+                        for i in unitlist[cross[k]]:
+                            if i not in base and not self.remove(cells, i, bit, singles, dirty, push):
+                                return False
+        return True
+
+    def reduce(self, cells, trail=None):
+        """Propagate all constraints of the board until nothing changes any more.
+
+        Returns the (modified) cells, or False as soon as a contradiction is found.
+        """
+        if 0 in cells:
+            return False
+        popcount = self.tables.popcount
+        singles = [i for i, mask in enumerate(cells) if popcount[mask] == 1]
+        dirty = set(range(len(self.tables.unit_cells)))
+        return self.propagate(cells, singles, dirty, [] if trail is None else trail)
+
+    def assign(self, cells, i, bit, trail):
+        """Assign a digit to box i and propagate it; returns False on contradiction"""
+        trail.append(i)
+        trail.append(cells[i])
+        cells[i] = bit
+        if self.recorder.enabled:
+            record_assignment(cells, self.tables, i, self.recorder)
+        # only the assigned box changed, so only its events need propagating
+        return self.propagate(cells, [i], set(self.tables.cell_units[i]), trail)
+
+    def iter_solutions(self, cells):
+        """Depth first search over the box with the fewest candidates, yielding every solution.
+
+        The board is changed in place. Every change is logged on an undo trail, so
+        backtracking rewinds the trail instead of discarding copies of the board,
+        and the explicit stack of choice points keeps deep searches away from the
+        recursion limit.
+
+        Each solution is yielded as the cells array itself, which keeps changing when
+        the iteration resumes; copy it if it has to outlive the next step.
+        """
+        if self.reduce(cells) is False:
+            return
+        stats = self.stats
+        tracer = self.tracer
+        trace = tracer.enabled
+        budget = self.budget
+        trail = []
+        # choice points: [box, candidate bits in order, index of the next one, trail length
+        # before the box was assigned]
+        stack = []
+        while True:
+            best = self.choose_box(cells)
+            if best < 0:
+                if trace:
+                    tracer.solution(len(stack))
+                yield cells  # every box is solved
+            else:
+                if trace:
+                    tracer.choose(len(stack) + 1, self.tables.boxes[best], self.popcount[cells[best]])
+                stack.append([best, self.order_values(cells, best), 0, len(trail)])
+            while stack:
+                frame = stack[-1]
+                box, order, k, mark = frame
+                rewind(cells, trail, mark)
+                if k == len(order):
+                    stack.pop()
+                    continue
+                bit = order[k]
+                frame[2] = k + 1
+                if budget is not None:
+                    budget.charge()
+                if stats is not None:
+                    stats.nodes += 1
+                if trace:
+                    tracer.node(len(stack), self.tables.boxes[box], self.tables.symbol_of[bit])
+                if self.assign(cells, box, bit, trail) is not False:
+                    break
+                if stats is not None:
+                    stats.backtracks += 1
+            else:
+                return
+
+
+def propagate(cells, tables, singles, dirty, trail, recorder=NULL_RECORDER):
+    """Propagate the default pipeline from the given events, see Solver.propagate"""
+    return Solver(tables, recorder=recorder).propagate(cells, singles, dirty, trail)
+
+
+def reduce_puzzle(cells, tables, recorder=NULL_RECORDER):
+    """Propagate all constraints of the board until nothing changes any more.
+
+    Returns the (modified) cells, or False as soon as a contradiction is found.
+    """
+    return Solver(tables, recorder=recorder).reduce(cells)
+
+
+def rewind(cells, trail, mark):
+    """Undo every change recorded on the trail after position mark"""
+    pop = trail.pop
+    while len(trail) > mark:
+        old = pop()
+        cells[pop()] = old
+
+
+def choose_box(cells, popcount):
+    """Index of the unsolved box with the fewest candidates (lowest index on ties), or -1"""
+    best = -1
+    best_count = len(cells)
+    for i, mask in enumerate(cells):
+        count = popcount[mask]
+        if 1 < count < best_count:
+            best, best_count = i, count
+            if count == 2:
+                break
+    return best
+
+
+def choose_box_degree(cells, tables, bonus):
+    """Index of the unsolved box with the fewest candidates, ties broken by the
+    highest degree (unsolved peers plus the box's bonus), or -1
+    """
+    popcount = tables.popcount
+    best_count = min((count for count in map(popcount.__getitem__, cells) if count > 1), default=0)
+    if not best_count:
+        return -1
+    peers = tables.cell_peers
+    best, best_degree = -1, -1
+    for i, mask in enumerate(cells):
+        if popcount[mask] == best_count:
+            degree = bonus[i]
+            for p in peers[i]:
+                if popcount[cells[p]] > 1:
+                    degree += 1
+            if degree > best_degree:
+                best, best_degree = i, degree
+    return best
+
+
+def diagonal_bonus(tables):
+    """The mrv_degree tie-break bonus of each box: DIAGONAL_WEIGHT per diagonal it is on"""
+    bonus = [0] * len(tables.boxes)
+    for unit in tables.diagonal_units:
+        for box in unit:
+            bonus[tables.index[box]] += DIAGONAL_WEIGHT
+    return tuple(bonus)
+
+
+def least_constraining(cells, tables, i):
+    """The candidate bits of box i, the ones left as a candidate in the fewest peers first"""
+    mask = cells[i]
+    peers = tables.cell_peers[i]
+    bits = [bit for bit in tables.digit_bits if mask & bit]
+    return sorted(bits, key=lambda bit: sum(1 for p in peers if cells[p] & bit))
+
+
+def iter_solutions(cells, tables, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None,
+                   tracer=NULL_TRACER, branching=DEFAULT_BRANCHING, budget=None):
+    """Yield every solution of the board, see Solver.iter_solutions"""
+    return Solver(tables, pipeline, recorder, stats, tracer, branching, budget).iter_solutions(cells)
+
+
+def search(cells, tables, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None, tracer=NULL_TRACER,
+           branching=DEFAULT_BRANCHING, budget=None):
+    """Return the first solution found by iter_solutions(), or False if there is none"""
+    return next(iter_solutions(cells, tables, recorder, pipeline, stats, tracer, branching, budget), False)
+
+
+def count_solutions(cells, tables, limit=None, pipeline=DEFAULT_PIPELINE):
+    """Count the solutions of the board, stopping once limit of them are found"""
+    count = 0
+    for _ in iter_solutions(cells, tables, pipeline=pipeline):
+        count += 1
+        if limit is not None and count >= limit:
+            break
+    return count
+
+
+def solve(grid, tables, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None, tracer=NULL_TRACER,
+          branching=DEFAULT_BRANCHING, budget=None):
+    """Solve a grid string with the bitmask engine.
+
+    Assignments are only turned into grid strings for the recorder when it is
+    enabled, and strategies are only timed when a SolveStats object is given.
+
+    Returns
+    -------
+    dict or False
+        The dictionary representation of the solved grid, or False if no solution exists.
+    """
+    cells = search(grid2cells(grid, tables), tables, recorder, pipeline, stats, tracer, branching, budget)
+    if cells is False:
+        return False
+    return cells2values(cells, tables)
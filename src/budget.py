@@ -0,0 +1,122 @@
+"""Search budgets: timeouts, node limits and cooperative cancellation.
+
+A Budget is charged once per search node by the engines, and raises
+BudgetExceeded as soon as the solve runs out of time or nodes, or its
+CancellationToken is cancelled. Checks only happen at search nodes, so a solve
+stops within one constraint propagation of the limit being hit.
+
+solve(grid, timeout=..., max_nodes=..., token=...) turns the outcome into a
+SolveResult. The token can be cancelled from any thread; solve_async() runs a
+solve in an executor and cancels it when the awaiting task is cancelled.
+"""
+import threading
+from collections import namedtuple
+from functools import partial
+from time import perf_counter
+
+SOLVED = 'solved'
+UNSOLVABLE = 'unsolvable'
+BUDGET_EXCEEDED = 'budget_exceeded'
+
+
+class BudgetExceeded(Exception):
+    """Raised inside a search when its budget runs out
+    Parameters
+    ----------
+    reason(string)
+        'timeout', 'max_nodes' or 'cancelled'
+    """
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class CancellationToken:
+    """A flag that stops the solves it is passed to, settable from any thread
+    Parameters
+    ----------
+    event(threading.Event or multiprocessing.Event)
+        the flag itself; a multiprocessing.Event shares it between processes
+    """
+    def __init__(self, event=None):
+        self._event = event if event is not None else threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def __repr__(self):
+        return 'CancellationToken(cancelled={})'.format(self.cancelled)
+
+
+class Budget:
+    """The limits of one solve
+    Parameters
+    ----------
+    timeout(float)
+        seconds the solve may run for, from the creation of the budget
+    max_nodes(int)
+        search nodes the solve may try
+    token(CancellationToken)
+        stops the solve once cancelled
+    """
+    def __init__(self, timeout=None, max_nodes=None, token=None, clock=perf_counter):
+        self.clock = clock
+        self.deadline = None if timeout is None else clock() + timeout
+        self.max_nodes = max_nodes
+        self.token = token
+        self.nodes = 0
+
+    def check(self):
+        """Raise BudgetExceeded if the time is up or the token is cancelled"""
+        if self.token is not None and self.token.cancelled:
+            raise BudgetExceeded('cancelled')
+        if self.deadline is not None and self.clock() > self.deadline:
+            raise BudgetExceeded('timeout')
+
+    def charge(self):
+        """check() the budget, then count one search node against it. nodes only
+        counts the nodes the search was allowed to try.
+        """
+        if self.max_nodes is not None and self.nodes >= self.max_nodes:
+            raise BudgetExceeded('max_nodes')
+        self.check()
+        self.nodes += 1
+
+
+class SolveResult(namedtuple('SolveResult', ['status', 'values', 'stats', 'reason', 'seconds', 'nodes'])):
+    """The outcome of a budgeted solve
+    status: SOLVED, UNSOLVABLE or BUDGET_EXCEEDED
+    values: the solved dictionary, or None
+    stats: the SolveStats passed to the solve, partial when the budget ran out, or None
+    reason: why the budget ran out ('timeout', 'max_nodes' or 'cancelled'), or None
+    seconds: wall time of the solve
+    nodes: the search nodes tried, counted by the budget
+    A result is truthy only when the puzzle was solved.
+    """
+    __slots__ = ()
+
+    def __bool__(self):
+        return self.status == SOLVED
+
+
+async def solve_async(grid, token=None, executor=None, **options):
+    """Solve a grid in an executor (the event loop's default thread pool unless
+    given) without blocking the event loop, and return its SolveResult.
+    Cancelling the awaiting task cancels the solve too. options are passed on to
+    solution.solve(), e.g. timeout or max_nodes.
+    """
+    # asyncio takes longer to import than the whole solver, so only async callers pay for it
+    import asyncio
+    import solution
+    token = token or CancellationToken()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor, partial(solution.solve, grid, token=token, **options))
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        token.cancel()
+        raise
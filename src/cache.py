@@ -0,0 +1,204 @@
+"""Solution cache keyed by the canonical form of a grid.
+
+Two puzzles that differ by a symmetry of the board have the same solution up to
+that symmetry, so the cache stores one entry per symmetry class. The symmetries
+used all keep the set of units intact:
+
+- the 8 rotations and reflections of the square (transpose, anti-transpose,
+  180 degree rotation, ...), which map the two diagonals onto each other;
+- the same permutation applied to rows and columns, when it keeps the bands of
+  regions together and commutes with the mirror r -> size - 1 - r, so that both
+  diagonals are kept too (24 of them on a 9x9 board);
+- digit relabeling.
+
+The canonical form is the smallest grid string, after relabeling the digits in
+order of first appearance, over all the geometric transforms. A cache hit maps
+the stored solution back through the inverse transform and relabeling.
+"""
+import dbm
+from collections import OrderedDict
+from itertools import permutations, product
+from operator import itemgetter
+
+import bitboard
+from topology import get_topology
+
+# grids up to this size also get the row/column permutations; the group grows too
+# fast beyond it for an exhaustive canonical form to pay off
+MAX_PERMUTED_SIZE = 9
+
+_symmetries = {}
+
+
+def _square_transforms(size):
+    """The 8 rotations and reflections, as functions of (row, col)"""
+    last = size - 1
+    return (lambda r, c: (r, c), lambda r, c: (c, r),
+            lambda r, c: (last - c, last - r), lambda r, c: (last - r, last - c),
+            lambda r, c: (r, last - c), lambda r, c: (last - r, c),
+            lambda r, c: (c, last - r), lambda r, c: (last - c, r))
+
+
+def _mirror_permutations(size):
+    """Row (and column) permutations that keep the bands of square regions together
+    and commute with the mirror r -> size - 1 - r
+    """
+    side = int(round(size ** 0.5))
+    bands = [list(range(b * side, (b + 1) * side)) for b in range(side)]
+    result = []
+    for band_order in permutations(range(side)):
+        for within in product(permutations(range(side)), repeat=side):
+            perm = [bands[band_order[b]][within[b][k]] for b in range(side) for k in range(side)]
+            if all(perm[size - 1 - r] == size - 1 - perm[r] for r in range(size)):
+                result.append(perm)
+    return result
+
+
+def symmetries(topology):
+    """Return the geometric symmetries of a topology as index permutations.
+    Each permutation perm maps a grid to the transformed grid
+    ''.join(grid[i] for i in perm).
+    """
+    if topology in _symmetries:
+        return _symmetries[topology]
+    size = topology.size
+    if topology.regions is not None:
+        # a custom layout has no general symmetry
+        perms = [tuple(range(size * size))]
+    else:
+        lines = _mirror_permutations(size) if size <= MAX_PERMUTED_SIZE else [list(range(size))]
+        perms = set()
+        for transform in _square_transforms(size):
+            for line in lines:
+                perms.add(tuple(size * a + b for a, b in
+                                (transform(line[r], line[c]) for r in range(size) for c in range(size))))
+        perms = sorted(perms)
+    _symmetries[topology] = perms
+    return perms
+
+
+def _relabel_table(grid, symbols):
+    """Translation table that renames digits in order of first appearance"""
+    order = ''.join(dict.fromkeys(grid.replace('.', '')))
+    order += ''.join(symbol for symbol in symbols if symbol not in order)
+    return str.maketrans(order, symbols)
+
+
+class Canonical:
+    """The canonical form of a grid and the symmetry that leads to it
+    Parameters
+    ----------
+    grid(string)
+        a string representing a sudoku grid
+    topology(Topology)
+        the board variant, 9x9 diagonal sudoku by default
+    """
+    def __init__(self, grid, topology=None):
+        topology = topology or get_topology()
+        symbols = topology.symbols
+        # reject malformed grids the way the engines do, so that a hit and a miss behave the same
+        bitboard.grid2cells(grid, topology)
+        grid = grid.replace('0', '.')
+        best = None
+        for perm in symmetries(topology):
+            transformed = ''.join(itemgetter(*perm)(grid))
+            table = _relabel_table(transformed, symbols)
+            key = transformed.translate(table)
+            if best is None or key < best:
+                best, self.perm, self.table = key, perm, table
+        self.key = best
+        self.topology = topology
+
+    def to_caller(self, grid):
+        """Map a grid in canonical orientation back to the caller's orientation"""
+        inverse = [0] * len(self.perm)
+        for j, i in enumerate(self.perm):
+            inverse[i] = j
+        back = {v: k for k, v in self.table.items()}
+        return ''.join(itemgetter(*inverse)(grid.translate(back)))
+
+    def from_caller(self, grid):
+        """Map a grid in the caller's orientation to the canonical orientation"""
+        return ''.join(itemgetter(*self.perm)(grid)).translate(self.table)
+
+
+class SolutionCache:
+    """LRU cache of solutions, keyed by canonical grid form
+    Parameters
+    ----------
+    maxsize(int)
+        the number of solutions kept in memory
+    path(string)
+        optional dbm file that backs the cache on disk. Solutions evicted from
+        memory stay on disk and are read back on a later miss.
+    topology(Topology)
+        the board variant of the cached grids, 9x9 diagonal sudoku by default
+    """
+    def __init__(self, maxsize=4096, path=None, topology=None):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.topology = topology or get_topology()
+        self.entries = OrderedDict()
+        self.store = dbm.open(path, 'c') if path is not None else None
+        self.hits = 0  # lookups answered from memory or disk
+        self.disk_hits = 0  # the subset of hits that were read from disk
+        self.misses = 0  # lookups that had to solve the puzzle
+        self.evictions = 0  # entries dropped from memory to respect maxsize
+
+    def _get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        if self.store is not None and key in self.store:
+            self.disk_hits += 1
+            value = self.store[key].decode('ascii') or False
+            self._put(key, value, write=False)
+            return value
+        return None
+
+    def _put(self, key, value, write=True):
+        self.entries[key] = value
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        if write and self.store is not None:
+            self.store[key] = value or ''
+
+    def get_or_solve(self, grid, solve):
+        """Return the solved grid string of grid (or False if it has no solution),
+        calling solve(grid) only when no symmetric variant of the puzzle is cached
+        """
+        canonical = Canonical(grid, self.topology)
+        value = self._get(canonical.key)
+        if value is not None:
+            self.hits += 1
+            return value and canonical.to_caller(value)
+        self.misses += 1
+        solved = solve(grid)
+        self._put(canonical.key, solved and canonical.from_caller(solved))
+        return solved
+
+    def counters(self):
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'evictions': self.evictions, 'size': len(self.entries)}
+
+    def clear(self):
+        """Drop the in-memory entries and reset the counters (the disk store is kept)"""
+        self.entries.clear()
+        self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return 'SolutionCache(maxsize={}, hits={hits}, misses={misses}, evictions={evictions})'.format(
+            self.maxsize, **self.counters())
@@ -0,0 +1,233 @@
+"""Exact-cover backend: Knuth's Algorithm X with Dancing Links.
+
+A sudoku of any Topology is an exact cover problem. Each (box, digit) candidate
+is a row, and it covers one column for its box ("the box holds exactly one
+digit") plus one column per member unit ("each digit appears exactly once in
+the unit"). Diagonal sudoku simply adds the (diagonal, digit) columns of its
+two diagonal units.
+
+The matrix is stored as parallel integer lists (left, right, up, down, column)
+instead of node objects, and the search keeps its own stack of chosen rows, so
+no Python recursion is involved and covering a column only relinks integers.
+"""
+import bitboard
+from topology import get_topology
+from tracing import NULL_TRACER
+from utils import NULL_RECORDER
+
+
+class ExactCover:
+    """The Dancing Links matrix of one puzzle
+    Parameters
+    ----------
+    grid(string)
+        a string representing a sudoku grid ('.' or '0' for empty boxes). A grid
+        of the wrong length or with other characters raises ValueError.
+    topology(Topology)
+        the board variant, 9x9 diagonal sudoku by default
+    """
+    def __init__(self, grid, topology=None):
+        topology = topology or get_topology()
+        self.topology = topology
+        size = topology.size
+        n_boxes = len(topology.boxes)
+        # the same checks as the other engines
+        masks = bitboard.grid2cells(grid, topology)
+        # column ids: one per box, then one per (unit, digit); 0 is the root header
+        n_columns = n_boxes + len(topology.unit_cells) * size
+        self.left = list(range(-1, n_columns))
+        self.right = list(range(1, n_columns + 2))
+        self.left[0] = n_columns
+        self.right[n_columns] = 0
+        self.up = list(range(n_columns + 1))
+        self.down = list(range(n_columns + 1))
+        self.column = list(range(n_columns + 1))
+        self.size = [0] * (n_columns + 1)
+        self.row_of = [None] * (n_columns + 1)
+
+        for i, mask in enumerate(masks):
+            for d, bit in enumerate(topology.digit_bits):
+                if not mask & bit:
+                    continue
+                columns = [1 + i] + [1 + n_boxes + u * size + d for u in topology.cell_units[i]]
+                self._add_row((i, d), columns)
+
+    def _add_row(self, row, columns):
+        first = len(self.column)
+        for k, col in enumerate(columns):
+            node = first + k
+            self.column.append(col)
+            self.row_of.append(row)
+            # insert at the bottom of the column
+            self.up.append(self.up[col])
+            self.down.append(col)
+            self.down[self.up[col]] = node
+            self.up[col] = node
+            self.size[col] += 1
+            # link into the row, which is circular
+            self.left.append(first + k - 1 if k else first + len(columns) - 1)
+            self.right.append(first + k + 1 if k < len(columns) - 1 else first)
+
+    def cover(self, c):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        right[left[c]] = right[c]
+        left[right[c]] = left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, c):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = c
+        left[right[c]] = c
+
+    def select(self, r):
+        """Cover the other columns of row node r (its own column is already covered)"""
+        right = self.right
+        j = right[r]
+        while j != r:
+            self.cover(self.column[j])
+            j = right[j]
+
+    def deselect(self, r):
+        left = self.left
+        j = left[r]
+        while j != r:
+            self.uncover(self.column[j])
+            j = left[j]
+
+    def choose_column(self):
+        """The uncovered column with the fewest rows (Knuth's S heuristic)"""
+        right, size = self.right, self.size
+        c = right[0]
+        best, best_size = c, size[c]
+        while c != 0 and best_size > 1:
+            if size[c] < best_size:
+                best, best_size = c, size[c]
+            c = right[c]
+        return best
+
+    def column_name(self, c):
+        """A readable name of column c: its box, or 'unit:symbol' for (unit, digit) columns"""
+        topology = self.topology
+        n_boxes = len(topology.boxes)
+        if c <= n_boxes:
+            return topology.boxes[c - 1]
+        u, d = divmod(c - 1 - n_boxes, topology.size)
+        unit = topology.unitlist[u]
+        return '{}-{}:{}'.format(unit[0], unit[-1], topology.symbols[d])
+
+    def _trace_node(self, tracer, depth, r):
+        i, d = self.row_of[r]
+        tracer.node(depth, self.topology.boxes[i], self.topology.symbols[d])
+
+    def iter_solutions(self, stats=None, tracer=NULL_TRACER, budget=None):
+        """Yield every exact cover, as the list of chosen (box index, digit index) rows.
+        Adds node and backtrack counts to stats (a SolveStats) when one is given.
+        The tracer sees each chosen column as a choice point, and the budget is
+        charged for every row tried.
+        """
+        down, column = self.down, self.column
+        trace = tracer.enabled
+        stack = []
+        while True:
+            backtrack = True
+            if self.right[0] == 0:
+                if trace:
+                    tracer.solution(len(stack))
+                yield [self.row_of[r] for r in stack]
+            else:
+                c = self.choose_column()
+                if trace:
+                    tracer.choose(len(stack) + 1, self.column_name(c), self.size[c])
+                self.cover(c)
+                r = down[c]
+                if r != c:
+                    if budget is not None:
+                        budget.charge()
+                    stack.append(r)
+                    self.select(r)
+                    backtrack = False
+                    if stats is not None:
+                        stats.nodes += 1
+                    if trace:
+                        self._trace_node(tracer, len(stack), r)
+                else:
+                    self.uncover(c)
+            while backtrack:
+                if not stack:
+                    return
+                r = stack.pop()
+                self.deselect(r)
+                if stats is not None:
+                    stats.backtracks += 1
+                c = column[r]
+                r = down[r]
+                if r != c:
+                    if budget is not None:
+                        budget.charge()
+                    stack.append(r)
+                    self.select(r)
+                    backtrack = False
+                    if stats is not None:
+                        stats.nodes += 1
+                    if trace:
+                        self._trace_node(tracer, len(stack), r)
+                else:
+                    self.uncover(c)
+
+
+def rows2grid(rows, topology):
+    """Convert the rows of an exact cover into a solved grid string"""
+    grid = ['.'] * len(topology.boxes)
+    for i, d in rows:
+        grid[i] = topology.symbols[d]
+    return ''.join(grid)
+
+
+def solve(grid, topology=None, recorder=NULL_RECORDER, stats=None, tracer=NULL_TRACER, budget=None):
+    """Solve a grid with Dancing Links.
+    Returns
+    -------
+    dict or False
+        The dictionary representation of the solved grid, or False if no solution exists.
+    """
+    topology = topology or get_topology()
+    rows = next(ExactCover(grid, topology).iter_solutions(stats, tracer, budget), None)
+    if rows is None:
+        return False
+    if recorder.enabled:
+        # only the path to the solution exists to record: replay it in selection order
+        current = [symbol if symbol in topology.mask_of else '.' for symbol, _ in zip(grid, topology.boxes)]
+        for i, d in rows:
+            if current[i] == '.':
+                prev = ''.join(current)
+                current[i] = topology.symbols[d]
+                recorder.record(prev, ''.join(current), (topology.boxes[i], current[i]))
+    solved = rows2grid(rows, topology)
+    return dict(zip(topology.boxes, solved))
+
+
+def count_solutions(grid, topology=None, limit=None):
+    """Count the exact covers of a grid, stopping once limit of them are found"""
+    count = 0
+    for _ in ExactCover(grid, topology).iter_solutions():
+        count += 1
+        if limit is not None and count >= limit:
+            break
+    return count
@@ -0,0 +1,186 @@
+"""Generate diagonal sudokus with a unique solution and grade their difficulty.
+
+Usage: python generator.py [-n COUNT] [-j WORKERS] [--seed SEED] [--rate PER_SECOND] [--level LEVEL]
+
+Each line of output holds a puzzle grid, its level and the number of search
+nodes needed to solve it.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from functools import partial
+
+import bitboard
+import solution
+from strategies import SolveStats
+
+# strategies in the order the solver applies them; a puzzle's level is the last one it needs
+LEVELS = ('eliminate', 'only_choice', 'naked_twins', 'search')
+STRATEGIES = (bitboard.eliminate, bitboard.only_choice, bitboard.naked_twins)
+
+Grade = namedtuple('Grade', ['level', 'strategies', 'nodes'])
+
+
+def random_solution(rng):
+    """Build a random solved diagonal sudoku by assigning random candidates to a few
+    random boxes and completing the board with search
+    Parameters
+    ----------
+    rng(random.Random)
+        the source of randomness
+    Returns
+    -------
+    string
+        The solved grid
+    """
+    tables = solution.tables
+    while True:
+        cells = bitboard.grid2cells('.' * len(tables.boxes), tables)
+        trail = []
+        for i in rng.sample(range(len(cells)), 11):
+            mask = cells[i]
+            if tables.popcount[mask] == 1:
+                continue
+            mark = len(trail)
+            trail.append(i)
+            trail.append(mask)
+            cells[i] = rng.choice([bit for bit in tables.digit_bits if mask & bit])
+            if bitboard.propagate(cells, tables, [i], set(tables.cell_units[i]), trail) is False:
+                bitboard.rewind(cells, trail, mark)
+        if bitboard.search(cells, tables):
+            return bitboard.cells2grid(cells, tables)
+
+
+def make_puzzle(solved, rng, level=None):
+    """Remove clues from a solved grid, in random order, as long as the puzzle
+    keeps a unique solution (and, when a level is given, as long as it stays
+    solvable without strategies beyond that level). Removing any remaining clue
+    would break one of those conditions.
+    """
+    grid = list(solved)
+    hardest = LEVELS.index(level) if level is not None else len(LEVELS) - 1
+    for i in rng.sample(range(len(grid)), len(grid)):
+        digit, grid[i] = grid[i], '.'
+        puzzle = ''.join(grid)
+        if not solution.has_unique_solution(puzzle) or (
+                hardest < len(LEVELS) - 1 and LEVELS.index(grade(puzzle).level) > hardest):
+            grid[i] = digit
+    return ''.join(grid)
+
+
+def grade(grid):
+    """Grade a puzzle by the strategies it needs and the search effort it takes
+    Parameters
+    ----------
+    grid(string)
+        a string representing a sudoku grid with a unique solution
+    Returns
+    -------
+    Grade
+        level: the hardest strategy needed (one of LEVELS)
+        strategies: the names of all the strategies needed, in the order they are applied
+        nodes: the number of search nodes tried (0 unless the level is 'search')
+    """
+    tables = solution.tables
+    cells = bitboard.grid2cells(grid, tables)
+    for n in range(1, len(STRATEGIES) + 1):
+        reduced = cells[:]
+        while True:
+            before = reduced[:]
+            for strategy in STRATEGIES[:n]:
+                strategy(reduced, tables)
+            if reduced == before:
+                break
+        if bitboard.count_solved(reduced, tables) == len(reduced):
+            return Grade(LEVELS[n - 1], LEVELS[:n], 0)
+    stats = SolveStats()
+    bitboard.search(cells, tables, stats=stats)
+    return Grade('search', LEVELS, stats.nodes)
+
+
+def generate(seed=None, level=None):
+    """Generate one puzzle with a unique solution
+    Parameters
+    ----------
+    seed(int)
+        seed for the random generator, so that a puzzle can be reproduced
+    level(string)
+        only return a puzzle of this level (one of LEVELS); any level by default
+    Returns
+    -------
+    tuple
+        The puzzle grid and its Grade
+    """
+    if level is not None and level not in LEVELS:
+        raise ValueError("Unknown level '{}', expected one of {}".format(level, LEVELS))
+    rng = random.Random(seed)
+    while True:
+        puzzle = make_puzzle(random_solution(rng), rng, level)
+        puzzle_grade = grade(puzzle)
+        if level is None or puzzle_grade.level == level:
+            return puzzle, puzzle_grade
+
+
+def generate_many(count, workers=None, seed=None, rate=None, level=None):
+    """Generate puzzles across a pool of worker processes
+    Parameters
+    ----------
+    count(int)
+        the number of puzzles to generate
+    workers(int)
+        number of worker processes, defaults to the number of CPUs
+    seed(int)
+        base seed; puzzle i is generate(seed + i), so a run can be reproduced
+    rate(float)
+        target throughput in puzzles per second; output is paced so it does not
+        exceed this rate. Without it, puzzles are yielded as fast as the workers
+        produce them.
+    level(string)
+        only generate puzzles of this level
+    Yields
+    ------
+    tuple
+        (puzzle grid, Grade) pairs, as soon as they are generated
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    make_one = partial(generate, level=level)
+    seeds = range(seed, seed + count)
+    interval = 1.0 / rate if rate else 0.0
+    start = time.monotonic()
+    if workers <= 1:
+        results = map(make_one, seeds)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap_unordered(make_one, seeds)
+    try:
+        for n, result in enumerate(results):
+            delay = start + n * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            yield result
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate diagonal sudokus with a unique solution.")
+    parser.add_argument('-n', '--count', type=int, default=10, help="number of puzzles to generate")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--seed', type=int, default=None, help="base random seed")
+    parser.add_argument('--rate', type=float, default=None, help="target throughput in puzzles per second")
+    parser.add_argument('--level', choices=LEVELS, default=None, help="only keep puzzles of this level")
+    args = parser.parse_args(argv)
+    for puzzle, puzzle_grade in generate_many(args.count, args.workers, args.seed, args.rate, args.level):
+        sys.stdout.write('{} {} {}\n'.format(puzzle, puzzle_grade.level, puzzle_grade.nodes))
+
+if __name__ == "__main__":
+    main()
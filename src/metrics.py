@@ -0,0 +1,8 @@
+"""Summary statistics shared by the benchmark and the solving service."""
+
+
+def percentile(values, q):
+    """The q-th percentile (0-100) of a list of values, by the nearest-rank method"""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return ordered[int(rank) - 1]
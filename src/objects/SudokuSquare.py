@@ -2,23 +2,43 @@ import pygame
 
 from pygame import *
 
-def AAfilledRoundedRect(surface,rect,color,radius=0.4):
+# the look of a square; tiles and glyphs are rendered once per process and reused
+FONT_NAME = 'opensans'
+FONT_SIZE = 21
+TILE_SIZE = (45, 40)
+TEXT_OFFSET = (17, 4)
+FILLED_COLOR = (2, 204, 186)
+EMPTY_COLOR = (255, 255, 255)
+TEXT_COLOR = (255, 255, 255)
+
+_fonts = {}
+_glyphs = {}
+_tiles = {}
+
+
+def clear_caches():
+    """Forget the cached fonts, glyphs and tiles, e.g. after pygame.quit()"""
+    _fonts.clear()
+    _glyphs.clear()
+    _tiles.clear()
+
+
+def roundedRectSurface(size,color,radius=0.4):
 
     """
-    AAfilledRoundedRect(surface,rect,color,radius=0.4)
+    roundedRectSurface(size,color,radius=0.4)
 
-    surface : destination
-    rect    : rectangle
+    size    : (width, height)
     color   : rgb or rgba
     radius  : 0 <= radius <= 1
+
+    Returns an antialiased, filled rounded rectangle on a transparent surface
     """
 
-    rect         = Rect(rect)
+    rect         = Rect((0,0),size)
     color        = Color(*color)
     alpha        = color.a
     color.a      = 0
-    pos          = rect.topleft
-    rect.topleft = 0,0
     rectangle    = Surface(rect.size,SRCALPHA)
 
     circle       = Surface([min(rect.size)*3]*2,SRCALPHA)
@@ -39,22 +59,53 @@ def AAfilledRoundedRect(surface,rect,color,radius=0.4):
     rectangle.fill(color,special_flags=BLEND_RGBA_MAX)
     rectangle.fill((255,255,255,alpha),special_flags=BLEND_RGBA_MIN)
 
-    return surface.blit(rectangle,pos)
+    return rectangle
+
+def AAfilledRoundedRect(surface,rect,color,radius=0.4):
+
+    """
+    AAfilledRoundedRect(surface,rect,color,radius=0.4)
+
+    surface : destination
+    rect    : rectangle
+    color   : rgb or rgba
+    radius  : 0 <= radius <= 1
+    """
+
+    rect = Rect(rect)
+    return surface.blit(roundedRectSurface(rect.size,color,radius),rect.topleft)
+
+def get_font(name=FONT_NAME, size=FONT_SIZE):
+    """Load a system font once, SysFont scans the installed fonts on every call"""
+    key = (name, size)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.SysFont(name, size)
+    return _fonts[key]
+
+def glyph(number, color=TEXT_COLOR):
+    """The rendered text of a number ("" for none), cached by number and color"""
+    key = (number, color)
+    if key not in _glyphs:
+        _glyphs[key] = get_font().render(number, 1, color)
+    return _glyphs[key]
+
+def tile(color, size=TILE_SIZE):
+    """The rounded tile behind a number, cached by color and size"""
+    key = (color, size)
+    if key not in _tiles:
+        surface = roundedRectSurface(size, color)
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha()
+        _tiles[key] = surface
+    return _tiles[key]
 
 class SudokuSquare:
     """A sudoku square class."""
     def __init__(self, number=None, offsetX=0, offsetY=0, edit="Y", xLoc=0, yLoc=0):
-        if number != None:
-            number = str(number)
-            self.color = (2, 204, 186)
-        else:
-            number = ""
-            self.color = (255, 255, 255)
-        # print("FONTS", pygame.font.get_fonts())
-        self.font = pygame.font.SysFont('opensans', 21)
-        self.text = self.font.render(number, 1, (255, 255, 255))
-        self.textpos = self.text.get_rect()
-        self.textpos = self.textpos.move(offsetX + 17, offsetY + 4)
+        self.font = get_font()
+        self.offsetX = offsetX
+        self.offsetY = offsetY
+        self.setNumber(number)
 
         # self.collide = pygame.Surface((25, 22))
         # self.collide = self.collide.convert()
@@ -67,15 +118,29 @@ class SudokuSquare:
         self.edit = edit
         self.xLoc = xLoc
         self.yLoc = yLoc
-        self.offsetX = offsetX
-        self.offsetY = offsetY
 
-    def draw(self):
-        screen = pygame.display.get_surface()
-        AAfilledRoundedRect(screen, (self.offsetX, self.offsetY, 45, 40), self.color)
+    def setNumber(self, number):
+        """Show another number (None for an empty square); draw() to see it"""
+        if number != None:
+            number = str(number)
+            self.color = FILLED_COLOR
+        else:
+            number = ""
+            self.color = EMPTY_COLOR
+        self.text = glyph(number)
+        self.textpos = self.text.get_rect().move(self.offsetX + TEXT_OFFSET[0], self.offsetY + TEXT_OFFSET[1])
+
+    def rect(self):
+        """The area draw() paints over"""
+        return Rect((self.offsetX, self.offsetY), TILE_SIZE).union(self.textpos)
+
+    def draw(self, surface=None):
+        screen = surface or pygame.display.get_surface()
+        screen.blit(tile(self.color), (self.offsetX, self.offsetY))
 
         # screen.blit(self.collide, self.collideRect)
         screen.blit(self.text, self.textpos)
+        return self.rect()
 
 
     def checkCollide(self, collision):
@@ -104,7 +169,7 @@ class SudokuSquare:
             number = ""
         
         if self.edit == "Y":
-            self.text = self.font.render(number, 1, (0, 0, 0))
+            self.text = glyph(number, (0, 0, 0))
             self.draw()
             return 0
         else:
@@ -0,0 +1,291 @@
+"""Compact binary boards and a memory-mapped file of fixed-size records.
+
+Usage: python packed.py pack puzzles.txt archive.sdk [--size N] [--no-diagonals]
+       python packed.py solve archive.sdk [-j WORKERS] [--chunksize N] [--engine ENGINE]
+       python packed.py unpack archive.sdk [-o solutions.txt]
+
+Two encodings:
+
+- pack_grid()/unpack_grid(): 4 bits per box, 0 for an empty box and d for the
+  d-th symbol, two boxes per byte. A 9x9 grid, solved or not, takes 41 bytes
+  instead of the 81 characters of a grid string or the few KiB of a dictionary.
+- pack_cells()/unpack_cells(): the candidate masks of a partial state (see
+  bitboard.py), size bits per box. A 9x9 state takes 92 bytes.
+
+A BoardFile is a header followed by one fixed-size record per puzzle: a status
+byte, the packed puzzle and the packed solution. Record i starts at a known
+offset, so the file is memory-mapped and workers read puzzles and write
+solutions in place: no board is copied or pickled between processes, and
+files with tens of millions of records are never loaded whole.
+"""
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+from functools import lru_cache, partial
+
+import reader
+import solution
+from topology import get_topology
+
+MAGIC = b'SDKP'
+VERSION = 1
+# magic, version, board size, flags, record size
+HEADER = struct.Struct('<4sBBBxI')
+DIAGONALS = 0x01
+# record status byte
+PENDING, SOLVED, UNSOLVABLE = 0, 1, 2
+# the largest board whose symbols fit in 4 bits
+MAX_PACKED_SIZE = 15
+
+
+def grid_bytes(topology):
+    """Bytes taken by a packed grid"""
+    return (len(topology.boxes) + 1) // 2
+
+
+def cells_bytes(topology):
+    """Bytes taken by packed candidate masks"""
+    return (len(topology.boxes) * topology.size + 7) // 8
+
+
+@lru_cache(maxsize=None)
+def _pair_tables(symbols):
+    # every two-box string <-> its byte, so that packing never goes bit by bit
+    codes = {symbol: k for k, symbol in enumerate(symbols, 1)}
+    codes.update({empty: 0 for empty in reader.EMPTY})
+    pack = {a + b: codes[a] | codes[b] << 4 for a in codes for b in codes}
+    names = '.' + symbols + '?' * (15 - len(symbols))
+    unpack = [names[byte & 0xF] + names[byte >> 4] for byte in range(256)]
+    return pack, unpack
+
+
+def pack_grid(grid, topology=None):
+    """Pack a grid string ('.' or '0' for empty boxes) into bytes, 4 bits per box"""
+    topology = topology or solution.tables
+    if topology.size > MAX_PACKED_SIZE:
+        raise ValueError("4-bit packing holds boards up to {0}x{0}, not {1}x{1}".format(
+            MAX_PACKED_SIZE, topology.size))
+    if len(grid) != len(topology.boxes):
+        raise ValueError("expected a grid of {} characters, got {}".format(len(topology.boxes), len(grid)))
+    pack = _pair_tables(topology.symbols)[0]
+    if len(grid) % 2:
+        grid += '.'
+    try:
+        return bytes([pack[grid[k:k + 2]] for k in range(0, len(grid), 2)])
+    except KeyError as e:
+        raise ValueError("unexpected characters in grid: {}".format(e.args[0])) from None
+
+
+def unpack_grid(data, topology=None):
+    """Unpack the bytes of pack_grid() into a grid string, '.' for empty boxes"""
+    topology = topology or solution.tables
+    unpack = _pair_tables(topology.symbols)[1]
+    return ''.join([unpack[byte] for byte in data])[:len(topology.boxes)]
+
+
+def pack_cells(cells, topology=None):
+    """Pack the candidate masks of a partial state into bytes, size bits per box"""
+    topology = topology or solution.tables
+    packed, width = 0, topology.size
+    for mask in reversed(cells):
+        packed = packed << width | mask
+    return packed.to_bytes(cells_bytes(topology), 'little')
+
+
+def unpack_cells(data, topology=None):
+    """Unpack the bytes of pack_cells() into a flat array of candidate masks"""
+    import bitboard
+    topology = topology or solution.tables
+    packed, width = int.from_bytes(data, 'little'), topology.size
+    return bitboard.new_cells(topology, ((packed >> width * i) & topology.all_digits
+                                         for i in range(len(topology.boxes))))
+
+
+class BoardFile:
+    """A memory-mapped file of (status, puzzle, solution) records
+    Parameters
+    ----------
+    path(string)
+        a file written by BoardFile.create()
+    writable(bool)
+        whether set_result() may write to the file
+    """
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size or header[:4] != MAGIC:
+            raise ValueError("{} is not a board file".format(path))
+        _, version, size, flags, self.record_size = HEADER.unpack(header)
+        if version != VERSION:
+            raise ValueError("{} has board file version {}, expected {}".format(path, version, VERSION))
+        self.topology = get_topology(size, bool(flags & DIAGONALS))
+        self.grid_size = grid_bytes(self.topology)
+        if self.record_size != 1 + 2 * self.grid_size:
+            raise ValueError("{} has records of {} bytes, expected {}".format(
+                path, self.record_size, 1 + 2 * self.grid_size))
+        body = os.path.getsize(path) - HEADER.size
+        if body % self.record_size:
+            raise ValueError("{} ends with a truncated record".format(path))
+        self.count = body // self.record_size
+        self.file = open(path, 'r+b' if writable else 'rb')
+        self.map = None
+        if self.count:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+
+    @staticmethod
+    def create(path, grids, topology=None):
+        """Write a board file of pending records for an iterable of grid strings,
+        which is consumed lazily. Returns the number of records written.
+        """
+        topology = topology or solution.tables
+        if topology.regions is not None:
+            raise ValueError("board files do not store custom region layouts")
+        grid_size = grid_bytes(topology)
+        empty = bytes(grid_size)
+        count = 0
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, topology.size, DIAGONALS if topology.diagonals else 0,
+                                1 + 2 * grid_size))
+            for grid in grids:
+                f.write(bytes([PENDING]) + pack_grid(grid, topology) + empty)
+                count += 1
+        return count
+
+    def __len__(self):
+        return self.count
+
+    def _offset(self, i):
+        if not 0 <= i < self.count:
+            raise IndexError("record {} out of range for {} records".format(i, self.count))
+        return HEADER.size + i * self.record_size
+
+    def status(self, i):
+        return self.map[self._offset(i)]
+
+    def puzzle(self, i):
+        """The grid string of record i"""
+        start = self._offset(i) + 1
+        return unpack_grid(self.map[start:start + self.grid_size], self.topology)
+
+    def result(self, i):
+        """The solved grid string of record i, False if it is unsolvable, None if it is pending"""
+        start = self._offset(i)
+        status = self.map[start]
+        if status == PENDING:
+            return None
+        if status == UNSOLVABLE:
+            return False
+        start += 1 + self.grid_size
+        return unpack_grid(self.map[start:start + self.grid_size], self.topology)
+
+    def set_result(self, i, solved):
+        """Store the solved grid string of record i, or False if it is unsolvable"""
+        if not self.writable:
+            raise ValueError("{} was opened read-only".format(self.path))
+        start = self._offset(i)
+        if solved:
+            packed = pack_grid(solved, self.topology)
+            self.map[start + 1 + self.grid_size:start + self.record_size] = packed
+            self.map[start] = SOLVED
+        else:
+            self.map[start] = UNSOLVABLE
+
+    def __iter__(self):
+        """Yield (puzzle, result) pairs, see result()"""
+        for i in range(self.count):
+            yield self.puzzle(i), self.result(i)
+
+    def flush(self):
+        if self.map is not None and self.writable:
+            self.map.flush()
+
+    def close(self):
+        if self.map is not None:
+            self.flush()
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def solve_range(span, path, engine='bitmask'):
+    """Solve the pending records start <= i < stop of a board file in place.
+    Returns the number of records solved.
+    """
+    start, stop = span
+    solved = 0
+    with BoardFile(path, writable=True) as boards:
+        for i in range(start, stop):
+            if boards.status(i) != PENDING:
+                continue
+            values = solution.solve(boards.puzzle(i), engine=engine, topology=boards.topology)
+            boards.set_result(i, values and ''.join(values[box] for box in boards.topology.boxes))
+            solved += bool(values)
+    return solved
+
+
+def solve_file(path, workers=None, chunksize=1024, engine='bitmask'):
+    """Solve every pending record of a board file, workers processes each mapping
+    the file and handling chunksize records at a time. Records that are already
+    solved are skipped, so an interrupted run can be resumed.
+    Returns the number of records solved by this run.
+    """
+    with BoardFile(path) as boards:
+        count = len(boards)
+    spans = [(start, min(start + chunksize, count)) for start in range(0, count, chunksize)]
+    work = partial(solve_range, path=path, engine=engine)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return sum(map(work, spans))
+    with multiprocessing.Pool(workers) as pool:
+        return sum(pool.imap_unordered(work, spans))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pack, solve and unpack memory-mapped board files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack = commands.add_parser('pack', help="write the grids of a puzzle file to a new board file")
+    pack.add_argument('puzzles', help="plain or gzip-compressed puzzle file ('-' for stdin)")
+    pack.add_argument('boards', help="the board file to write")
+    pack.add_argument('--size', type=int, default=9, help="board size")
+    pack.add_argument('--no-diagonals', dest='diagonals', action='store_false', help="the diagonals are not units")
+    solve = commands.add_parser('solve', help="solve the pending records of a board file in place")
+    solve.add_argument('boards')
+    solve.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    solve.add_argument('--chunksize', type=int, default=1024, help="records handled by a worker at a time")
+    solve.add_argument('--engine', default='bitmask', choices=sorted(solution.ENGINES))
+    unpack = commands.add_parser('unpack', help="write the results of a board file as grid strings")
+    unpack.add_argument('boards')
+    unpack.add_argument('-o', '--output', default='-', help="where to write the results (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'pack':
+        topology = get_topology(args.size, args.diagonals)
+        count = BoardFile.create(args.boards, reader.read_grids(args.puzzles, topology, sys.stderr), topology)
+        print("{} records written to {}".format(count, args.boards), file=sys.stderr)
+    elif args.command == 'solve':
+        solved = solve_file(args.boards, args.workers, args.chunksize, args.engine)
+        print("{} records solved".format(solved), file=sys.stderr)
+    else:
+        outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+        try:
+            with BoardFile(args.boards) as boards:
+                for _, result in boards:
+                    outfile.write((result or ('pending' if result is None else 'unsolvable')) + '\n')
+        finally:
+            if outfile is not sys.stdout:
+                outfile.close()
+
+if __name__ == "__main__":
+    main()
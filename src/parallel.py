@@ -0,0 +1,266 @@
+"""Search a single hard puzzle on several cores at once.
+
+Usage: python parallel.py GRID [-j WORKERS] [--levels N] [--timeout SECONDS]
+
+search() tries the branches of a choice point one after another, so one slow
+puzzle keeps a single core busy. A ParallelSolver reduces the puzzle in the
+calling process and expands the first one or two levels of the search tree
+breadth first (split()), stopping early once there are as many subtrees as
+workers. Each subtree is then searched by the bitmask engine in a pool of
+worker processes. The first solution found, or the last subtree coming back
+empty, decides the puzzle, and a CancellationToken shared by every worker
+stops the searches that are still running at their next search node.
+
+The pool is started once and reused for every puzzle. Puzzles that are solved
+by propagation alone, or while the tree is split, never reach it. On a puzzle
+with several solutions, the one returned is whichever a worker finds first.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from time import perf_counter
+
+import bitboard
+import solution
+from budget import BUDGET_EXCEEDED, SOLVED, UNSOLVABLE, Budget, BudgetExceeded, CancellationToken, SolveResult
+from strategies import DEFAULT_BRANCHING, DEFAULT_PIPELINE, SolveStats, check_branching, check_pipeline
+from topology import get_topology
+from utils import values2grid
+
+# the state of a worker process, set once by init_worker()
+_worker = {}
+
+
+def split(solver, cells, levels=2, width=1):
+    """Expand the first levels of the search tree of a board breadth first
+    Parameters
+    ----------
+    solver(bitboard.Solver)
+        the pipeline and branching to expand the tree with; its stats and budget
+        are charged for the nodes tried here
+    cells(array)
+        the board, changed in place
+    levels(int)
+        the largest number of choice points to expand
+    width(int)
+        stop expanding once there are at least this many subtrees
+    Returns
+    -------
+    tuple
+        (solution, []) if the board is solved while splitting it, otherwise
+        (None, subtrees): the reduced boards left to search, in the order the
+        sequential search would visit them. No subtrees means no solution.
+    """
+    if solver.reduce(cells) is False:
+        return None, []
+    stats, budget = solver.stats, solver.budget
+    frontier = [cells]
+    for level in range(levels + 1):
+        choices = []
+        for board in frontier:
+            box = solver.choose_box(board)
+            if box < 0:
+                return board, []
+            choices.append((board, box))
+        if level == levels or len(frontier) >= width:
+            return None, frontier
+        frontier = []
+        for board, box in choices:
+            for bit in solver.order_values(board, box):
+                if budget is not None:
+                    budget.charge()
+                if stats is not None:
+                    stats.nodes += 1
+                child = array(board.typecode, board)
+                if solver.assign(child, box, bit, []) is not False:
+                    frontier.append(child)
+                elif stats is not None:
+                    stats.backtracks += 1
+        if not frontier:
+            return None, []
+
+
+def add_stats(total, part):
+    """Add the counters of part, the SolveStats of a subtree, to total"""
+    total.nodes += part.nodes
+    total.backtracks += part.backtracks
+    total.propagations += part.propagations
+    for name, counters in part.strategies.items():
+        into = total.strategy(name)
+        into.calls += counters.calls
+        into.seconds += counters.seconds
+        into.eliminated += counters.eliminated
+        into.contradictions += counters.contradictions
+
+
+def init_worker(event, size, diagonals, regions, pipeline, branching):
+    """Set up a worker process; the topology is rebuilt here rather than pickled"""
+    _worker['topology'] = get_topology(size, diagonals, regions)
+    _worker['pipeline'] = pipeline
+    _worker['branching'] = branching
+    _worker['token'] = CancellationToken(event)
+
+
+def search_subtree(cells):
+    """Search one subtree in a worker process
+    Returns
+    -------
+    tuple
+        the solved grid string, False if the subtree has no solution or None if
+        the search was cancelled, and the SolveStats of the search
+    """
+    topology = _worker['topology']
+    stats = SolveStats(_worker['pipeline'])
+    budget = Budget(token=_worker['token'])
+    try:
+        found = bitboard.search(cells, topology, pipeline=_worker['pipeline'], stats=stats,
+                                branching=_worker['branching'], budget=budget)
+    except BudgetExceeded:
+        return None, stats
+    return found and bitboard.cells2grid(found, topology), stats
+
+
+class ParallelSolver:
+    """A pool of worker processes that search the subtrees of one puzzle at a time
+    Parameters
+    ----------
+    workers(int)
+        worker processes, defaults to the number of CPUs
+    topology(Topology)
+        the board variant, 9x9 diagonal sudoku by default
+    pipeline(tuple)
+        the strategies to apply, see strategies.py
+    branching(Branching)
+        the variable and value orders of the search, see strategies.py
+    levels(int)
+        the largest number of choice points expanded before handing the
+        subtrees to the workers
+    """
+    def __init__(self, workers=None, topology=None, pipeline=DEFAULT_PIPELINE, branching=DEFAULT_BRANCHING,
+                 levels=2):
+        self.workers = workers or os.cpu_count() or 1
+        self.topology = topology or solution.tables
+        self.pipeline = check_pipeline(pipeline)
+        self.branching = check_branching(branching)
+        self.levels = levels
+        # set to cancel the running subtrees; cleared only once all of them have stopped
+        self.event = multiprocessing.Event()
+        self.executor = ProcessPoolExecutor(
+            self.workers, initializer=init_worker,
+            initargs=(self.event, self.topology.size, self.topology.diagonals, self.topology.regions,
+                      self.pipeline, self.branching))
+        # the event is shared by every subtree, so puzzles are searched one at a time
+        self.lock = threading.Lock()
+
+    def solve(self, grid, stats=None, timeout=None):
+        """Solve a grid string, searching its subtrees in parallel
+        Parameters
+        ----------
+        stats(SolveStats)
+            receives the counters of the split and of every subtree searched,
+            including the ones cancelled part way
+        timeout(float)
+            stop searching after this many seconds
+        Returns
+        -------
+        dict or False
+            The dictionary representation of the solved grid, or False if no
+            solution exists.
+        SolveResult
+            Instead of the above when timeout is given, see solution.solve()
+        """
+        started = perf_counter()
+        if timeout is not None and stats is None:
+            stats = SolveStats(self.pipeline)
+        budget = None if timeout is None else Budget(timeout)
+        solver = bitboard.Solver(self.topology, self.pipeline, stats=stats, branching=self.branching, budget=budget)
+        try:
+            found, subtrees = split(solver, bitboard.grid2cells(grid, self.topology), self.levels, self.workers)
+            found = bitboard.cells2grid(found, self.topology) if found is not None else False
+            if subtrees:
+                found = self.search(subtrees, stats, budget)
+        except BudgetExceeded as exceeded:
+            return SolveResult(BUDGET_EXCEEDED, None, stats, exceeded.reason, perf_counter() - started,
+                               stats.nodes)
+        values = found and dict(zip(self.topology.boxes, found))
+        if timeout is None:
+            return values
+        return SolveResult(SOLVED if values else UNSOLVABLE, values or None, stats, None, perf_counter() - started,
+                           stats.nodes)
+
+    def search(self, subtrees, stats=None, budget=None):
+        """Search the subtrees in the pool and return the first solved grid string, or False"""
+        with self.lock:
+            self.event.clear()
+            pending = {self.executor.submit(search_subtree, cells) for cells in subtrees}
+            finished = []  # futures that are done but not read yet
+            try:
+                while pending:
+                    seconds = None if budget is None else max(0.0, budget.deadline - budget.clock())
+                    done, pending = wait(pending, seconds, FIRST_COMPLETED)
+                    if not done:
+                        raise BudgetExceeded('timeout')
+                    finished = list(done)
+                    while finished:
+                        found, part = finished.pop().result()
+                        if stats is not None:
+                            add_stats(stats, part)
+                        if found:
+                            return found
+                return False
+            finally:
+                # cancel the rest and wait for them, so that the next puzzle starts with a clear event
+                self.event.set()
+                for future in pending:
+                    future.cancel()
+                wait(pending)
+                # a subtree that failed is skipped here: the outcome is already decided, and
+                # its error must not replace the result or the exception on its way out
+                for future in list(pending) + finished:
+                    if stats is not None and not future.cancelled() and future.exception() is None:
+                        add_stats(stats, future.result()[1])
+
+    def close(self):
+        self.event.set()
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def solve_parallel(grid, workers=None, timeout=None, **options):
+    """Solve one grid with a ParallelSolver started for it; options are passed
+    to ParallelSolver. Keep a ParallelSolver around instead to reuse its pool.
+    """
+    with ParallelSolver(workers, **options) as solver:
+        return solver.solve(grid, timeout=timeout)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve one diagonal sudoku on several cores.")
+    parser.add_argument('grid', help="the puzzle, 81 characters with '.' for empty boxes")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--levels', type=int, default=2, help="choice points expanded before the pool takes over")
+    parser.add_argument('--timeout', type=float, default=None, help="stop searching after this many seconds")
+    args = parser.parse_args(argv)
+
+    with ParallelSolver(args.workers, levels=args.levels) as solver:
+        stats = SolveStats(solver.pipeline)
+        started = perf_counter()
+        result = solver.solve(args.grid, stats, args.timeout)
+        seconds = perf_counter() - started
+    if args.timeout is None:
+        print(values2grid(result) if result else UNSOLVABLE)
+    else:
+        print(values2grid(result.values) if result else result.status)
+    print("{:.1f} ms, {} nodes".format(seconds * 1000, stats.nodes), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
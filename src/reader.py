@@ -0,0 +1,203 @@
+"""Streaming reader and validator for puzzle files.
+
+Usage: python reader.py puzzles.txt.gz [-o grids.txt] [--errors report.tsv] [--size N] [--no-diagonals]
+
+Reads plain or gzip-compressed files lazily, one line at a time, so memory use
+does not grow with the size of the corpus. Two layouts are recognized, and can
+be mixed in one file:
+
+- one grid per line: size * size cells, optionally followed by whitespace and
+  anything else (e.g. the level column written by generator.py);
+- one grid over size lines of size cells each, as printed by utils.display().
+  Separator characters (| + - =) and whitespace inside the lines are ignored.
+
+Empty boxes can be written as '.' or '0'. Blank lines and lines starting with '#'
+are skipped. Each grid goes through a generator pipeline (lines -> records ->
+validated records) and is rejected, with a line number and a reason, if it is
+malformed or if its givens already contradict each other. Rejected records are
+written to a sidecar report instead of stopping the run.
+"""
+import argparse
+import gzip
+import sys
+from collections import namedtuple
+
+from topology import get_topology
+
+EMPTY = '.0'
+SEPARATORS = '|+-='
+GZIP_MAGIC = b'\x1f\x8b'
+
+# error is None for records that passed validation
+Record = namedtuple('Record', ['lineno', 'grid', 'error'])
+
+
+def open_text(path):
+    """Open a plain or gzip-compressed text file ('-' for stdin)"""
+    if path == '-':
+        return sys.stdin
+    with open(path, 'rb') as f:
+        compressed = f.read(2) == GZIP_MAGIC
+    if compressed:
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def iter_lines(path):
+    """Yield (line number, line) pairs of a file, starting at 1"""
+    f = open_text(path)
+    try:
+        yield from enumerate(f, 1)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _incomplete(start, rows, size):
+    return Record(start, ''.join(rows), 'incomplete grid: {} of {} rows'.format(len(rows), size))
+
+
+def parse(lines, topology=None):
+    """Group (line number, line) pairs into Records of raw grid strings.
+    Records that do not have the right shape carry an error message instead.
+    """
+    topology = topology or get_topology()
+    size, n_cells = topology.size, len(topology.boxes)
+    strip_separators = str.maketrans('', '', SEPARATORS + ' \t\r\n')
+    pending, start = [], None
+    for lineno, line in lines:
+        stripped = line.strip()
+        if stripped.startswith('#'):
+            continue
+        if not stripped:
+            if pending:
+                yield _incomplete(start, pending, size)
+                pending = []
+            continue
+        first = stripped.split(None, 1)[0]
+        if len(first) == n_cells:
+            if pending:
+                yield _incomplete(start, pending, size)
+                pending = []
+            yield Record(lineno, first, None)
+            continue
+        cells = stripped.translate(strip_separators)
+        if not cells:
+            continue  # a separator line of a multi-line grid
+        if len(cells) == size:
+            if not pending:
+                start = lineno
+            pending.append(cells)
+            if len(pending) == size:
+                yield Record(start, ''.join(pending), None)
+                pending = []
+            continue
+        if pending:
+            yield _incomplete(start, pending, size)
+            pending = []
+        yield Record(lineno, stripped, 'expected {} cells on a line, or {} rows of {}, got {}'.format(
+            n_cells, size, size, len(cells)))
+    if pending:
+        yield _incomplete(start, pending, size)
+
+
+def contradiction(grid, topology):
+    """Return the reason why the givens of a grid contradict each other, or None.
+    Only cheap checks are made: a digit given twice in a unit, or an empty box whose
+    peers already hold every digit.
+    """
+    mask_of = topology.mask_of
+    cells = [mask_of.get(symbol, 0) for symbol in grid]
+    for unit in topology.unit_cells:
+        seen = 0
+        for i in unit:
+            if cells[i] & seen:
+                unit_name = '{}-{}'.format(topology.boxes[unit[0]], topology.boxes[unit[-1]])
+                return "digit {} given twice in unit {}".format(grid[i], unit_name)
+            seen |= cells[i]
+    for i, mask in enumerate(cells):
+        if not mask:
+            taken = 0
+            for p in topology.cell_peers[i]:
+                taken |= cells[p]
+            if taken == topology.all_digits:
+                return "no digit left for box {}".format(topology.boxes[i])
+    return None
+
+
+def validate(records, topology=None, contradictions=True):
+    """Normalize the grids of Records ('.' for empty boxes, upper-case symbols)
+    and flag the ones with unexpected characters or, when contradictions is set,
+    contradictory givens
+    """
+    topology = topology or get_topology()
+    normalize = str.maketrans({empty: '.' for empty in EMPTY})
+    allowed = set(topology.symbols) | {'.'}
+    for record in records:
+        if record.error is not None:
+            yield record
+            continue
+        grid = record.grid.upper().translate(normalize)
+        unexpected = set(grid) - allowed
+        if unexpected:
+            yield record._replace(error='unexpected characters: {}'.format(''.join(sorted(unexpected))))
+            continue
+        error = contradiction(grid, topology) if contradictions else None
+        yield Record(record.lineno, grid, error)
+
+
+def write_error(report, record):
+    """Write a rejected Record to a report as a tab-separated line"""
+    report.write('{}\t{}\t{}\n'.format(record.lineno, record.error, record.grid[:200]))
+
+
+def read_grids(path, topology=None, errors=None, contradictions=True):
+    """Lazily read the valid grids of a puzzle file
+    Parameters
+    ----------
+    path(string)
+        a plain or gzip-compressed file ('-' for stdin)
+    topology(Topology)
+        the board variant, 9x9 diagonal sudoku by default
+    errors(file)
+        where to write rejected records, one tab-separated line (line number,
+        reason, text) each. Rejected records are dropped silently without it.
+    contradictions(bool)
+        whether to reject grids whose givens contradict each other
+    Yields
+    ------
+    string
+        The normalized grid strings, '.' for empty boxes
+    """
+    topology = topology or get_topology()
+    for record in validate(parse(iter_lines(path), topology), topology, contradictions):
+        if record.error is None:
+            yield record.grid
+        elif errors is not None:
+            write_error(errors, record)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and normalize a file of sudoku grids.")
+    parser.add_argument('puzzles', help="plain or gzip-compressed puzzle file ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="where to write the valid grids (default: stdout)")
+    parser.add_argument('--errors', default='-', help="where to write rejected records (default: stderr)")
+    parser.add_argument('--size', type=int, default=9, help="board size")
+    parser.add_argument('--no-diagonals', dest='diagonals', action='store_false',
+                        help="the diagonals are not units")
+    args = parser.parse_args(argv)
+
+    topology = get_topology(args.size, args.diagonals)
+    outfile = sys.stdout if args.output == '-' else open(args.output, 'w')
+    report = sys.stderr if args.errors == '-' else open(args.errors, 'w')
+    try:
+        for grid in read_grids(args.puzzles, topology, report):
+            outfile.write(grid + '\n')
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+        if report is not sys.stderr:
+            report.close()
+
+if __name__ == "__main__":
+    main()
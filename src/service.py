@@ -0,0 +1,411 @@
+"""Local asyncio solving service: HTTP or JSON lines on stdin/stdout.
+
+Usage: python service.py --http 127.0.0.1:8080 [-j WORKERS] [--batch-size N] [--batch-delay SECONDS]
+                         [--max-queue N] [--engine ENGINE] [--timeout SECONDS] [--max-nodes N]
+       python service.py --stdio [...]
+       python service.py --load-test 127.0.0.1:8080 puzzles.txt [-c CONNECTIONS]
+
+Requests are validated in the event loop (see reader.py), queued, and grouped
+into micro-batches of up to --batch-size grids: the batcher waits at most
+--batch-delay seconds for a batch to fill up. Batches are solved in a pool of
+worker processes, so the event loop never runs a search itself, and at most
+two batches per worker are in flight at a time.
+
+Backpressure: the queue holds at most --max-queue requests. Over HTTP, a
+request that finds the queue full gets a 503 response right away. On stdin,
+the service stops reading lines while --max-queue requests are pending.
+
+HTTP endpoints (JSON bodies, keep-alive connections):
+    POST /solve    {"grid": "4.....8.5.3..."} -> {"status": "solved", "solution": "417369825..."}
+    GET  /metrics  queue depth, batches, request counts and latency percentiles
+
+JSON lines: each input line is a grid string or {"id": ..., "grid": ...}, and
+each output line is the response with the same id, in completion order. The
+line {"op": "metrics"} is answered with the metrics.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from time import perf_counter
+
+import reader
+import solution
+from budget import SOLVED, UNSOLVABLE
+from metrics import percentile
+from utils import values2grid
+
+INVALID = 'invalid'
+# latencies kept for the metrics percentiles
+LATENCY_WINDOW = 10000
+
+
+class QueueFull(Exception):
+    """Raised by SolveService.solve(wait=False) when the request queue is full"""
+
+
+def solve_requests(grids, engine='bitmask', timeout=None, max_nodes=None):
+    """Solve a micro-batch of validated grids in a worker process
+    Returns
+    -------
+    list
+        (status, solved grid string or None) for each grid
+    """
+    results = []
+    for grid in grids:
+        if timeout is None and max_nodes is None:
+            values = solution.solve(grid, engine=engine)
+            status = SOLVED if values else UNSOLVABLE
+        else:
+            result = solution.solve(grid, engine=engine, timeout=timeout, max_nodes=max_nodes)
+            status, values = result.status, result.values
+        results.append((status, values and values2grid(values)))
+    return results
+
+
+class SolveService:
+    """Queue, micro-batcher and worker pool behind the HTTP and JSON-lines front ends
+    Parameters
+    ----------
+    workers(int)
+        worker processes, defaults to the number of CPUs
+    batch_size(int)
+        the largest number of grids sent to a worker at once
+    batch_delay(float)
+        seconds the batcher waits for more requests before sending a batch that
+        is not full
+    max_queue(int)
+        the largest number of requests waiting for a batch
+    engine(string)
+        the solver backend, see solution.ENGINES
+    timeout(float)
+        per-puzzle search budget in seconds; puzzles that exceed it get the
+        'budget_exceeded' status
+    max_nodes(int)
+        per-puzzle search budget in nodes
+    executor(concurrent.futures.Executor)
+        runs the batches instead of a new process pool
+    """
+    def __init__(self, workers=None, batch_size=32, batch_delay=0.002, max_queue=1024, engine='bitmask',
+                 timeout=None, max_nodes=None, executor=None):
+        solution.check_engine(engine)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_queue = max_queue
+        self.solve_batch = partial(solve_requests, engine=engine, timeout=timeout, max_nodes=max_nodes)
+        self.executor = executor
+        self.own_executor = executor is None
+        self.queue = None
+        self.batcher = None
+        # counters for metrics()
+        self.statuses = Counter()
+        self.rejected = 0
+        self.batches = 0
+        self.batched = 0
+        self.in_flight = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    async def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.workers)
+        self.queue = asyncio.Queue(self.max_queue)
+        self.slots = asyncio.Semaphore(2 * self.workers)
+        self.batcher = asyncio.ensure_future(self._batch_forever())
+        return self
+
+    async def close(self):
+        if self.batcher is not None:
+            self.batcher.cancel()
+            try:
+                await self.batcher
+            except asyncio.CancelledError:
+                pass
+        if self.own_executor and self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def solve(self, grid, wait=True):
+        """Solve one grid and return the response dictionary: status ('solved',
+        'unsolvable', 'budget_exceeded' or 'invalid') and the solution or an error.
+        With wait=False, raise QueueFull instead of waiting for room in the queue.
+        """
+        if not isinstance(grid, str):
+            return self._finish({'status': INVALID, 'error': 'grid must be a string'})
+        record = next(reader.validate(reader.parse([(1, grid)]), contradictions=False), None)
+        if record is None:
+            # blank or comment-only text holds no record at all
+            return self._finish({'status': INVALID, 'error': 'no grid'})
+        if record.error is not None:
+            return self._finish({'status': INVALID, 'error': record.error})
+        conflict = reader.contradiction(record.grid, solution.tables)
+        if conflict is not None:
+            # no need to bother a worker with it
+            return self._finish({'status': UNSOLVABLE, 'error': conflict})
+        if not wait and self.queue.full():
+            self.rejected += 1
+            raise QueueFull()
+        future = asyncio.get_running_loop().create_future()
+        started = perf_counter()
+        await self.queue.put((record.grid, future))
+        status, solved = await future
+        self.latencies.append(perf_counter() - started)
+        response = {'status': status}
+        if solved:
+            response['solution'] = solved
+        return self._finish(response)
+
+    def _finish(self, response):
+        self.statuses[response['status']] += 1
+        return response
+
+    async def _batch_forever(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            if self.queue.qsize() < self.batch_size - 1 and self.batch_delay:
+                await asyncio.sleep(self.batch_delay)
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            # wait for a free worker slot; meanwhile the queue fills up and pushes back
+            await self.slots.acquire()
+            self.batches += 1
+            self.batched += len(batch)
+            self.in_flight += 1
+            future = loop.run_in_executor(self.executor, self.solve_batch, [grid for grid, _ in batch])
+            future.add_done_callback(partial(self._batch_done, batch))
+
+    def _batch_done(self, batch, future):
+        self.in_flight -= 1
+        self.slots.release()
+        if future.cancelled():
+            error = asyncio.CancelledError()
+        else:
+            error = future.exception()
+        for k, (_, waiter) in enumerate(batch):
+            if waiter.done():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(future.result()[k])
+
+    def metrics(self):
+        latencies = [1000 * t for t in self.latencies]
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'max_queue': self.max_queue,
+            'in_flight_batches': self.in_flight,
+            'batches': self.batches,
+            'mean_batch_size': self.batched / self.batches if self.batches else 0.0,
+            'requests': dict(self.statuses),
+            'rejected': self.rejected,
+            'latency_ms': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                           'p99': percentile(latencies, 99)} if latencies else None,
+        }
+
+    async def handle_http(self, stream, writer):
+        """Serve the HTTP requests of one connection"""
+        try:
+            while True:
+                request_line = await stream.readline()
+                if not request_line.strip():
+                    break
+                method, path = request_line.decode('latin-1').split()[:2]
+                headers = {}
+                while True:
+                    line = await stream.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                body = await stream.readexactly(int(headers.get('content-length', 0)))
+                code, payload = await self.route(method, path, body)
+                data = json.dumps(payload).encode()
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'.format(
+                    code, HTTP_REASONS[code], len(data)).encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, method, path, body):
+        """Return the (HTTP status code, JSON payload) of a request"""
+        if path == '/metrics' and method == 'GET':
+            return 200, self.metrics()
+        if path != '/solve':
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            grid = json.loads(body)['grid']
+        except (ValueError, KeyError, TypeError):
+            return 400, {'status': INVALID, 'error': 'expected a JSON object with a "grid" key'}
+        try:
+            response = await self.solve(grid, wait=False)
+        except QueueFull:
+            return 503, {'error': 'queue full, retry later'}
+        return (400 if response['status'] == INVALID else 200), response
+
+    async def serve_lines(self, stream, write):
+        """Serve JSON-lines requests read from stream, passing each response line to write()"""
+        pending = asyncio.Semaphore(self.max_queue)
+        tasks = set()
+
+        async def answer(request):
+            try:
+                if isinstance(request, dict) and request.get('op') == 'metrics':
+                    response = self.metrics()
+                else:
+                    grid = request.get('grid') if isinstance(request, dict) else request
+                    response = await self.solve(grid)
+                    if isinstance(request, dict) and 'id' in request:
+                        response['id'] = request['id']
+                write(json.dumps(response) + '\n')
+            finally:
+                pending.release()
+
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError:
+                request = line.decode('utf-8', 'replace').strip()
+            await pending.acquire()
+            task = asyncio.ensure_future(answer(request))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                503: 'Service Unavailable'}
+
+
+async def serve_http(service, host='127.0.0.1', port=8080):
+    """Serve HTTP until cancelled"""
+    server = await asyncio.start_server(service.handle_http, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+async def serve_stdio(service):
+    """Serve JSON lines from stdin to stdout until stdin is closed"""
+    loop = asyncio.get_running_loop()
+    stream = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(stream), sys.stdin)
+
+    def write(line):
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+    await service.serve_lines(stream, write)
+
+
+async def load_test(host, port, grids, connections=16):
+    """Send every grid to a running HTTP service over several keep-alive connections
+    Returns
+    -------
+    dict
+        request count, wall time, throughput, status counts and latency percentiles
+    """
+    todo = deque(grids)
+    statuses = Counter()
+    latencies = []
+
+    async def client():
+        stream, writer = await asyncio.open_connection(host, port)
+        try:
+            while todo:
+                body = json.dumps({'grid': todo.popleft()}).encode()
+                started = perf_counter()
+                writer.write('POST /solve HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n'
+                             'Content-Length: {}\r\n\r\n'.format(host, len(body)).encode('latin-1') + body)
+                await writer.drain()
+                code = int((await stream.readline()).split()[1])
+                length = 0
+                while True:
+                    line = await stream.readline()
+                    if not line.strip():
+                        break
+                    if line.lower().startswith(b'content-length:'):
+                        length = int(line.split(b':')[1])
+                payload = json.loads(await stream.readexactly(length))
+                latencies.append(1000 * (perf_counter() - started))
+                statuses[payload.get('status', str(code))] += 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    started = perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    seconds = perf_counter() - started
+    return {'requests': len(latencies), 'seconds': seconds, 'per_second': len(latencies) / seconds,
+            'statuses': dict(statuses),
+            'latency_ms': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95),
+                           'p99': percentile(latencies, 99)} if latencies else None}
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(':')
+    return host or '127.0.0.1', int(port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve diagonal sudoku solves over HTTP or JSON lines.")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--http', metavar='HOST:PORT', help="serve HTTP on this address")
+    mode.add_argument('--stdio', action='store_true', help="serve JSON lines on stdin/stdout")
+    mode.add_argument('--load-test', metavar='HOST:PORT', help="send a puzzle file to a running service")
+    parser.add_argument('puzzles', nargs='?', help="puzzle file for --load-test")
+    parser.add_argument('-c', '--connections', type=int, default=16, help="client connections for --load-test")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=32, help="largest micro-batch sent to a worker")
+    parser.add_argument('--batch-delay', type=float, default=0.002, help="seconds to wait for a batch to fill")
+    parser.add_argument('--max-queue', type=int, default=1024, help="requests queued before pushing back")
+    parser.add_argument('--engine', default='bitmask', choices=sorted(solution.ENGINES))
+    parser.add_argument('--timeout', type=float, default=None, help="per-puzzle search budget in seconds")
+    parser.add_argument('--max-nodes', type=int, default=None, help="per-puzzle search budget in nodes")
+    args = parser.parse_args(argv)
+
+    if args.load_test:
+        if not args.puzzles:
+            parser.error("--load-test needs a puzzle file")
+        host, port = parse_address(args.load_test)
+        grids = list(reader.read_grids(args.puzzles, contradictions=False))
+        print(json.dumps(asyncio.run(load_test(host, port, grids, args.connections)), indent=2))
+        return
+
+    async def run():
+        async with SolveService(args.workers, args.batch_size, args.batch_delay, args.max_queue, args.engine,
+                                args.timeout, args.max_nodes) as service:
+            if args.stdio:
+                await serve_stdio(service)
+            else:
+                await serve_http(service, *parse_address(args.http))
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
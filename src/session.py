@@ -0,0 +1,197 @@
+"""Interactive solving sessions: one player filling in one puzzle, move by move.
+
+A Session keeps the digits placed so far and the candidates they leave (the
+pencil marks a player sees) as bitmask arrays (see bitboard.py). A move only
+updates the box it changes and that box's peers, instead of reparsing and
+re-reducing the whole grid:
+
+    game = Session(grid)
+    game.place('A2', '7')
+    game.is_still_solvable()      # False: '7' is not in A2 in the solution
+    game.undo()
+    game.next_hint()              # Hint(box='E5', digit='3', strategy='only_choice')
+
+The puzzle is solved once, when the session starts; pass a cache.SolutionCache
+to share that solve between the sessions of the same puzzle. Every move then
+updates a count of the placed digits that disagree with the solution, so
+is_still_solvable() is a single check as long as the player is on track.
+Only a player who leaves the cached solution on a puzzle that has several
+solutions triggers a search, from their own board.
+"""
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+import bitboard
+import solution
+from strategies import STRATEGY_NAMES
+
+# the strategies that justify hints, cheapest first; 'eliminate' stands for a
+# box that has a single candidate left (a naked single)
+HINT_STRATEGIES = ('eliminate', 'only_choice', 'naked_twins', 'pointing_pairs', 'box_line',
+                   'hidden_pairs', 'naked_triples', 'hidden_triples', 'x_wing')
+# the strategy of a hint that no strategy justifies, taken from the solution
+SEARCH = 'search'
+
+
+class Hint(namedtuple('Hint', ['box', 'digit', 'strategy'])):
+    """A step the player can take: the digit that goes in box, and the strategy
+    (see HINT_STRATEGIES) that deduces it, or SEARCH if none of them does
+    """
+    __slots__ = ()
+
+
+@lru_cache(maxsize=None)
+def _hint_solver(topology):
+    # shared by every session on the topology; it only lends its strategy methods
+    return bitboard.Solver(topology, STRATEGY_NAMES)
+
+
+class Session:
+    """A puzzle being solved by a player
+    Parameters
+    ----------
+    grid(string)
+        the puzzle, whose digits are the givens that the player cannot change
+    topology(Topology)
+        the board variant, 9x9 diagonal sudoku by default
+    cache(cache.SolutionCache)
+        where to look the solution up, or keep it, when the session starts
+    """
+    def __init__(self, grid, topology=None, cache=None):
+        self.topology = topology or solution.diagonal_topology()
+        self.grid = grid
+        self.digits = bitboard.new_cells(self.topology, (mask if self.topology.popcount[mask] == 1 else 0
+                                                         for mask in bitboard.grid2cells(grid, self.topology)))
+        self.givens = frozenset(i for i, bit in enumerate(self.digits) if bit)
+        self.history = []  # (box index, digit bit before the move), for undo()
+        self.cells = bitboard.new_cells(self.topology, self.digits)
+        for i in range(len(self.cells)):
+            self.cells[i] = self._candidates(i)
+        values = solution.solve(grid, topology=self.topology, cache=cache)
+        self.solution = values and bitboard.values2cells(values, self.topology)
+        self.unique = None  # whether the puzzle has a single solution, checked when first needed
+        self.wrong = 0  # placed digits that differ from self.solution
+        self.verdict = None  # the result of the last search, until the next move
+
+    def _index(self, box):
+        index = self.topology.index.get(box)
+        if index is None:
+            raise ValueError("unknown box {!r}".format(box))
+        if index in self.givens:
+            raise ValueError("{} is a given and cannot be changed".format(box))
+        return index
+
+    def _candidates(self, i):
+        """The candidates of box i: its digit, or the digits no peer holds"""
+        if self.digits[i]:
+            return self.digits[i]
+        taken = 0
+        for p in self.topology.cell_peers[i]:
+            taken |= self.digits[p]
+        return self.topology.all_digits & ~taken
+
+    def _set(self, i, bit):
+        """Put digit bit (0 to empty it) in box i, updating the candidates of its peers"""
+        old = self.digits[i]
+        self.digits[i] = bit
+        if self.solution:
+            self.wrong += (bit and bit != self.solution[i]) - (old and old != self.solution[i])
+        self.verdict = None
+        peers = self.topology.cell_peers[i]
+        if not old:
+            # a digit in an empty box only removes candidates
+            self.cells[i] = bit
+            digits, cells, keep = self.digits, self.cells, ~bit
+            for p in peers:
+                if not digits[p]:
+                    cells[p] &= keep
+        else:
+            # a removed digit may be a candidate again wherever no other peer holds it
+            self.cells[i] = self._candidates(i)
+            for p in peers:
+                self.cells[p] = self._candidates(p)
+
+    def place(self, box, digit):
+        """Put digit (a symbol, e.g. '7') in box, replacing the digit the player put there"""
+        i = self._index(box)
+        bit = self.topology.mask_of.get(digit)
+        if bit is None:
+            raise ValueError("unexpected digit {!r}".format(digit))
+        if self.digits[i] != bit:
+            self.history.append((i, self.digits[i]))
+            self._set(i, bit)
+
+    def clear(self, box):
+        """Empty a box the player filled in"""
+        i = self._index(box)
+        if self.digits[i]:
+            self.history.append((i, self.digits[i]))
+            self._set(i, 0)
+
+    def undo(self):
+        """Take back the last place() or clear(); returns its box, None if there is nothing to undo"""
+        if not self.history:
+            return None
+        i, bit = self.history.pop()
+        self._set(i, bit)
+        return self.topology.boxes[i]
+
+    def candidates(self, box):
+        """The digits box can still take given the digits of its peers, e.g. '1379'"""
+        return self.topology.mask2symbols(self.cells[self.topology.index[box]])
+
+    def values(self):
+        """The board in the dictionary representation, with the candidates of empty boxes"""
+        return bitboard.cells2values(self.cells, self.topology)
+
+    def is_solved(self):
+        return all(self.digits) and self.wrong == 0 and bool(self.solution)
+
+    def is_still_solvable(self):
+        """Whether the board can still be completed: the placed digits agree with a solution"""
+        if not self.solution:
+            return False
+        if not self.wrong:
+            return True
+        if self.unique is None:
+            self.unique = solution.has_unique_solution(self.grid, topology=self.topology)
+        if self.unique:
+            return False
+        if self.verdict is None:
+            found = bitboard.search(array(self.cells.typecode, self.cells), self.topology)
+            if found:
+                # the player is on the way to another solution: follow that one from now on
+                self.solution = array(found.typecode, found)
+                self.wrong = 0
+            self.verdict = bool(found)
+        return self.verdict
+
+    def next_hint(self):
+        """The cheapest step that the placed digits allow
+        Returns
+        -------
+        Hint or None
+            The first box that the cheapest strategy of HINT_STRATEGIES solves, or
+            a box of the solution (SEARCH) if none of them solves one. None once
+            the board is full or when it can no longer be solved.
+        """
+        if all(self.digits) or not self.is_still_solvable():
+            return None
+        topology = self.topology
+        solver = _hint_solver(topology)
+        cells = array(self.cells.typecode, self.cells)
+        # the strategies report their changes for propagation and undo, which a hint does not need
+        singles, scratch = [], []
+        for name in HINT_STRATEGIES:
+            if name != 'eliminate':
+                strategy = getattr(solver, name)
+                # every strategy is sound, so the eliminations of the cheaper ones are kept
+                if not all(strategy(cells, u, singles, set(), scratch.append) for u in range(len(topology.unit_cells))):
+                    break
+            for i, mask in enumerate(cells):
+                if not self.digits[i] and topology.popcount[mask] == 1:
+                    return Hint(topology.boxes[i], topology.symbol_of[mask], name)
+        # no strategy solves a box: give away the box with the fewest candidates
+        i = min((i for i, bit in enumerate(self.digits) if not bit), key=lambda i: topology.popcount[cells[i]])
+        return Hint(topology.boxes[i], topology.symbol_of[self.solution[i]], SEARCH)
@@ -1,18 +1,49 @@
+from itertools import combinations
+from time import perf_counter
+
 from utils import *
+from strategies import (DEFAULT_BRANCHING, DEFAULT_PIPELINE, DIAGONAL_WEIGHT, SolveStats, check_branching,
+                        check_pipeline)
+from topology import get_topology
+from tracing import NULL_TRACER
+from budget import BUDGET_EXCEEDED, SOLVED, UNSOLVABLE, Budget, BudgetExceeded, SolveResult
+import bitboard
+import dlx
+
+# The tables of the diagonal sudoku board (rows, columns, 3x3 squares and both
+# diagonals are units), as module attributes: solution.units, solution.peers, ...
+# They are looked up in diagonal_topology() on first access rather than built at
+# import time, see __getattr__. `tables` is the same topology, named for the
+# integer index tables that the bitmask engine works on.
+BOARD_TABLES = {
+    'topology': None,
+    'tables': None,
+    'row_units': 'row_units',
+    'column_units': 'column_units',
+    'square_units': 'region_units',
+    'diagonal_units': 'diagonal_units',
+    'unitlist': 'unitlist',
+    'units': 'units',
+    'peers': 'peers',
+}
 
-row_units = [cross(r, cols) for r in rows]
-column_units = [cross(rows, c) for c in cols]
-square_units = [cross(rs, cs) for rs in ('ABC','DEF','GHI') for cs in ('123','456','789')]
-diagonal_units = [[rows[i]+cols[i] for i in range(len(rows))], 
-                  [rows[i]+cols[-1-i] for i in range(len(rows))]]
+def diagonal_topology():
+    """The 9x9 diagonal sudoku topology, the board of the string engine and the
+    default of every solve. It is built on first use and shared afterwards.
+    """
+    return get_topology(9, diagonals=True)
 
-unitlist = row_units + column_units + square_units + diagonal_units
+def __getattr__(name):
+    if name in BOARD_TABLES:
+        attribute = BOARD_TABLES[name]
+        topology = diagonal_topology()
+        return topology if attribute is None else getattr(topology, attribute)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
-# Must be called after all units (including diagonals) are added to the unitlist
-units = extract_units(unitlist, boxes)
-peers = extract_peers(units, boxes)
+def __dir__():
+    return sorted(set(globals()) | set(BOARD_TABLES))
 
-def eliminate(values):
+def eliminate(values, recorder=NULL_RECORDER):
     """Eliminate values from peers of each box with a single value.
 
     Go through all the boxes, and whenever there is a box with a single value,
@@ -20,18 +51,20 @@ def eliminate(values):
 
     Args:
         values: Sudoku in dictionary form.
+        recorder: receives every assignment that solves a box.
     Returns:
         Resulting Sudoku in dictionary form after eliminating values.
     """
+    peers = diagonal_topology().peers
     solved_boxes = [k for k in values.keys() if len(values[k]) == 1]
     for box in solved_boxes:
         value = values[box]
         for peer in peers[box]:
             #values[peer] = values[peer].replace(value, '')
-            values = assign_value(values, peer, values[peer].replace(value, ''))
+            values = assign_value(values, peer, values[peer].replace(value, ''), recorder)
     return values
 
-def only_choice(values):
+def only_choice(values, recorder=NULL_RECORDER):
     """Apply the only choice strategy to a Sudoku puzzle
     The only choice strategy says that if only one box in a unit allows a certain
     digit, then that box must be assigned that digit.
@@ -47,15 +80,15 @@ def only_choice(values):
     -----
     You should be able to complete this function by copying your code from the classroom
     """
-    for unit in unitlist:
+    for unit in diagonal_topology().unitlist:
         for digit in "123456789":
             occurrences = [box for box in unit if digit in values[box]]
             if len(occurrences) == 1:
                 #values[occurrences[0]] = digit
-                values = assign_value(values, occurrences[0], digit)
+                values = assign_value(values, occurrences[0], digit, recorder)
     return values
 
-def naked_twins(values):
+def naked_twins(values, recorder=NULL_RECORDER):
     """Eliminate values using the naked twins strategy.
     The naked twins strategy says that if you have two or more unallocated boxes
     in a unit and there are only two digits that can go in those two boxes, then
@@ -83,57 +116,235 @@ def naked_twins(values):
     strategy repeatedly).
     """
     result = values.copy()
-    for unit in unitlist:
-        # retrieve all unallocated boxes in this unit
-        unsolved_boxes = [box for box in unit if len(values[box]) >= 2]
-        if len(unsolved_boxes) >= 2:
-            for i in range(len(unsolved_boxes)):
-                for j in range(i + 1, len(unsolved_boxes)):
-                    if values[unsolved_boxes[i]] == values[unsolved_boxes[j]] and len(values[unsolved_boxes[i]]) == 2 and len(values[unsolved_boxes[j]]) == 2:
-                        # for each peer in this unit, remove the naked twins values
-                        for k in [x for x in range(len(unsolved_boxes)) if x != i and x != j]:
-                            for digit in values[unsolved_boxes[i]]:
-                                result = assign_value(result, unsolved_boxes[k], result[unsolved_boxes[k]].replace(digit, ''))
+    for unit in diagonal_topology().unitlist:
+        # group the two-candidate boxes of this unit by their candidates, so twins
+        # are found in a single pass instead of comparing every pair of boxes
+        pair_counts = {}
+        for box in unit:
+            if len(values[box]) == 2:
+                pair_counts[values[box]] = pair_counts.get(values[box], 0) + 1
+        twins = [pair for pair, count in pair_counts.items() if count >= 2]
+        if not twins:
+            continue
+        # apply all the eliminations for this unit with one update per box; more than
+        # two boxes sharing a pair is a contradiction, so those boxes are not spared
+        for box in unit:
+            if len(values[box]) < 2:
+                continue
+            digits = ''.join(pair for pair in twins if values[box] != pair or pair_counts[pair] > 2)
+            if digits:
+                remaining = ''.join(digit for digit in result[box] if digit not in digits)
+                result = assign_value(result, box, remaining, recorder)
+    return result
+
+def remove_digits(values, box, digits, recorder=NULL_RECORDER):
+    """Clear the given digits from the candidates of a box"""
+    remaining = ''.join(digit for digit in values[box] if digit not in digits)
+    if remaining != values[box]:
+        values = assign_value(values, box, remaining, recorder)
+    return values
+
+def naked_triples(values, recorder=NULL_RECORDER):
+    """Eliminate values using the naked triples strategy.
+    If three unsolved boxes of a unit have only three digits between them, those
+    digits can be eliminated from the other boxes of the unit. Like naked_twins,
+    the triples are detected on the original input.
+    """
+    result = values.copy()
+    for unit in diagonal_topology().unitlist:
+        candidates = [box for box in unit if 1 < len(values[box]) <= 3]
+        for group in combinations(candidates, 3):
+            digits = set(''.join(values[box] for box in group))
+            if len(digits) == 3:
+                for box in unit:
+                    if box not in group:
+                        result = remove_digits(result, box, digits, recorder)
+    return result
+
+def hidden_subsets(values, n, recorder=NULL_RECORDER):
+    """If n digits can only go in the same n boxes of a unit, every other digit
+    can be eliminated from those boxes
+    """
+    result = values.copy()
+    for unit in diagonal_topology().unitlist:
+        places = {digit: [box for box in unit if digit in values[box]] for digit in '123456789'}
+        candidates = [digit for digit in places if 2 <= len(places[digit]) <= n]
+        for digits in combinations(candidates, n):
+            group = set().union(*(places[digit] for digit in digits))
+            if len(group) == n:
+                others = set('123456789').difference(digits)
+                for box in group:
+                    result = remove_digits(result, box, others, recorder)
+    return result
+
+def hidden_pairs(values, recorder=NULL_RECORDER):
+    """Eliminate values using the hidden pairs strategy, see hidden_subsets()"""
+    return hidden_subsets(values, 2, recorder)
+
+def hidden_triples(values, recorder=NULL_RECORDER):
+    """Eliminate values using the hidden triples strategy, see hidden_subsets()"""
+    return hidden_subsets(values, 3, recorder)
+
+def confine(values, sources, recorder=NULL_RECORDER):
+    """For every unit in sources (indices into unitlist), eliminate each digit that
+    is confined to its intersection with another unit from the rest of that unit
+    """
+    result = values.copy()
+    intersections = diagonal_topology().intersections
+    for u in sources:
+        for shared, outside, rest in intersections[u]:
+            inside = set(''.join(values[boxes[i]] for i in shared))
+            confined = inside.difference(''.join(values[boxes[i]] for i in outside))
+            if confined:
+                for i in rest:
+                    result = remove_digits(result, boxes[i], confined, recorder)
+    return result
+
+def pointing_pairs(values, recorder=NULL_RECORDER):
+    """A digit whose places in a square all lie in one row, column or diagonal can
+    be eliminated from the rest of that row, column or diagonal
+    """
+    return confine(values, diagonal_topology().region_ids, recorder)
+
+def box_line(values, recorder=NULL_RECORDER):
+    """A digit whose places in a row, column or diagonal all lie in one square can
+    be eliminated from the rest of that square
+    """
+    topology = diagonal_topology()
+    return confine(values, [u for u in range(len(topology.unitlist)) if u not in topology.region_ids], recorder)
+
+def x_wing(values, recorder=NULL_RECORDER):
+    """Eliminate values using the X-Wing strategy.
+    If a digit has the same two places in two rows, one of each pair of places
+    holds it, so it can be eliminated from the rest of the two columns. The same
+    goes with rows and columns swapped.
+    """
+    result = values.copy()
+    topology = diagonal_topology()
+    row_units, column_units = topology.row_units, topology.column_units
+    for lines, crosses in ((row_units, column_units), (column_units, row_units)):
+        for digit in '123456789':
+            wings = {}
+            for line in lines:
+                where = tuple(k for k, box in enumerate(line) if digit in values[box])
+                if len(where) == 2:
+                    wings.setdefault(where, []).append(line)
+            for where, wing in wings.items():
+                for pair in combinations(wing, 2):
+                    base = set(pair[0]).union(pair[1])
+                    for k in where:
+                        for box in crosses[k]:
+                            if box not in base:
+                                result = remove_digits(result, box, digit, recorder)
     return result
 
-def reduce_puzzle(values):
+STRATEGIES = {
+    'eliminate': eliminate,
+    'only_choice': only_choice,
+    'naked_twins': naked_twins,
+    'hidden_pairs': hidden_pairs,
+    'hidden_triples': hidden_triples,
+    'naked_triples': naked_triples,
+    'pointing_pairs': pointing_pairs,
+    'box_line': box_line,
+    'x_wing': x_wing,
+}
+
+def apply_strategy(name, values, recorder=NULL_RECORDER, stats=None):
+    """Apply the named strategy, updating its counters in stats (a SolveStats) if given
+    Returns
+    -------
+    dict
+        The values dictionary returned by the strategy
+    """
+    strategy = STRATEGIES[name]
+    if stats is None:
+        return strategy(values, recorder)
+    counter = stats.strategy(name)
+    candidates = sum(len(value) for value in values.values())
+    consistent = all(values.values())
+    started = perf_counter()
+    values = strategy(values, recorder)
+    counter.seconds += perf_counter() - started
+    counter.calls += 1
+    counter.eliminated += candidates - sum(len(value) for value in values.values())
+    if consistent and not all(values.values()):
+        counter.contradictions += 1
+    return values
+
+def reduce_puzzle(values, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None):
     """Reduce a Sudoku puzzle by repeatedly applying all constraint strategies
     Parameters
     ----------
     values(dict)
         a dictionary of the form {'box_name': '123456789', ...}
+    pipeline(tuple)
+        the names of the strategies to apply, in order (see strategies.py)
+    stats(SolveStats)
+        receives per-strategy counters, if given
     Returns
     -------
     dict or False
         The values dictionary after continued application of the constraint strategies
         no longer produces any changes, or False if the puzzle is unsolvable 
     """
+    if stats is not None:
+        stats.propagations += 1
     stalled = False
     while not stalled:
-        # Check how many boxes have a determined value
-        solved_values_before = len([box for box in values.keys() if len(values[box]) == 1])
-        # Use the Eliminate Strategy
-        values = eliminate(values)
-        # Use the Only Choice Strategy
-        values = only_choice(values)
-        # Use the Naked Twins Strategy
-        values = naked_twins(values)
-        # Check how many boxes have a determined value, to compare
-        solved_values_after = len([box for box in values.keys() if len(values[box]) == 1])
-        # If no new values were added, stop the loop.
-        stalled = solved_values_before == solved_values_after
+        # Count the candidates left; some strategies narrow boxes without solving them
+        candidates_before = sum(len(value) for value in values.values())
+        # Use each strategy of the pipeline in turn
+        for name in pipeline:
+            values = apply_strategy(name, values, recorder, stats)
+        candidates_after = sum(len(value) for value in values.values())
+        # If no candidate was eliminated, stop the loop.
+        stalled = candidates_before == candidates_after
         # Sanity check, return False if there is a box with zero available values:
         if len([box for box in values.keys() if len(values[box]) == 0]):
             return False
     return values
 
-def search(values):
+def choose_box(values, variable_order='mrv'):
+    """Choose the unsolved box to branch on: the one with the fewest candidates,
+    ties broken by box name ('mrv') or by degree ('mrv_degree', see strategies.py)
+    """
+    count, s = min((len(values[box]), box) for box in boxes if len(values[box]) > 1)
+    if variable_order == 'mrv':
+        return s
+    return max((box for box in boxes if len(values[box]) == count), key=lambda box: degree(values, box))
+
+def degree(values, box):
+    """The number of unsolved peers of a box, plus DIAGONAL_WEIGHT for each diagonal it is on"""
+    topology = diagonal_topology()
+    bonus = DIAGONAL_WEIGHT * sum(box in unit for unit in topology.diagonal_units)
+    return bonus + sum(1 for peer in topology.peers[box] if len(values[peer]) > 1)
+
+def order_values(values, box, value_order='natural'):
+    """The candidates of a box in the order to try them: increasing ('natural'), or
+    the one that is a candidate in the fewest peers first ('lcv')
+    """
+    if value_order == 'natural':
+        return values[box]
+    peers = diagonal_topology().peers[box]
+    return sorted(values[box], key=lambda digit: sum(digit in values[peer] for peer in peers))
+
+def search(values, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None, tracer=NULL_TRACER,
+           branching=DEFAULT_BRANCHING, budget=None, depth=0):
     """Apply depth first search to solve Sudoku puzzles in order to solve puzzles
     that cannot be solved by repeated reduction alone.
     Parameters
     ----------
     values(dict)
         a dictionary of the form {'box_name': '123456789', ...}
+    tracer(NullTracer or SearchTracer)
+        receives the choice points, nodes and solutions of the search
+    branching(Branching)
+        the variable and value orders of the search, see strategies.py
+    budget(budget.Budget)
+        charged for every search node; it stops the search by raising BudgetExceeded
+    depth(int)
+        the number of choice points above this call
     Returns
     -------
     dict or False
@@ -144,25 +355,128 @@ def search(values):
     and extending it to call the naked twins strategy.
     """
     # First, reduce the puzzle using the previous function
-    values = reduce_puzzle(values)
+    values = reduce_puzzle(values, recorder, pipeline, stats)
     if values is False:
         return False ## Failed earlier
     if all(len(values[box]) == 1 for box in boxes):
+        if tracer.enabled:
+            tracer.solution(depth)
         return values ## Solved!
     
     # Choose one of the unfilled squares with the fewest possibilities
-    _, s = min((len(values[box]), box) for box in boxes if len(values[box]) > 1)
+    s = choose_box(values, branching.variable)
+    if tracer.enabled:
+        tracer.choose(depth + 1, s, len(values[s]))
 
     # Now use recursion to solve each one of the resulting sudokus, and if one returns a value (not False), return that answer!
-    for value in values[s]:
+    for value in order_values(values, s, branching.value):
+        # charge the budget first, so that a node it refuses is never tried or counted
+        if budget is not None:
+            budget.charge()
         new_values = values.copy()
         #new_values[s] = value
-        new_values = assign_value(new_values, s, value)
-        result = search(new_values)
+        new_values = assign_value(new_values, s, value, recorder)
+        if stats is not None:
+            stats.nodes += 1
+        if tracer.enabled:
+            tracer.node(depth + 1, s, value)
+        result = search(new_values, recorder, pipeline, stats, tracer, branching, budget, depth + 1)
         if result:
             return result
+        if stats is not None:
+            stats.backtracks += 1
+    return False
+
+def count_search(values, limit=None):
+    """Count the solutions of a Sudoku puzzle with the same reduction and depth first
+    search as search(), but without stopping at the first solution.
+    Parameters
+    ----------
+    values(dict)
+        a dictionary of the form {'box_name': '123456789', ...}
+    limit(int)
+        stop exploring once this many solutions are found (None explores the whole tree)
+    Returns
+    -------
+    int
+        The number of solutions found, at most limit
+    """
+    values = reduce_puzzle(values)
+    if values is False:
+        return 0
+    if all(len(values[box]) == 1 for box in boxes):
+        return 1
+
+    _, s = min((len(values[box]), box) for box in boxes if len(values[box]) > 1)
+    count = 0
+    for value in values[s]:
+        new_values = values.copy()
+        new_values[s] = value
+        count += count_search(new_values, None if limit is None else limit - count)
+        if limit is not None and count >= limit:
+            break
+    return count
+
+def check_diagonal_9x9(topology, engine):
+    """Raise a ValueError for topologies that the named engine does not support"""
+    if topology is not None and topology is not diagonal_topology():
+        raise ValueError("The {} engine only solves 9x9 diagonal sudoku, use engine='bitmask' "
+                         "for {}".format(engine, topology))
+
+def solve_strings(grid, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None, topology=None,
+                  tracer=NULL_TRACER, branching=DEFAULT_BRANCHING, budget=None):
+    """Solve a grid with the string engine (the dictionary-based functions above)"""
+    check_diagonal_9x9(topology, 'string')
+    values = grid2values(grid)
+    values = search(values, recorder, pipeline, stats, tracer, branching, budget)
+    return values
+
+def solve_bitmask(grid, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None, topology=None,
+                  tracer=NULL_TRACER, branching=DEFAULT_BRANCHING, budget=None):
+    """Solve a grid with the bitmask engine (see bitboard.py)"""
+    return bitboard.solve(grid, topology or diagonal_topology(), recorder, pipeline, stats, tracer, branching, budget)
+
+def count_strings(grid, limit=None, topology=None):
+    """Count the solutions of a grid with the string engine"""
+    check_diagonal_9x9(topology, 'string')
+    return count_search(grid2values(grid), limit)
+
+def count_bitmask(grid, limit=None, topology=None):
+    """Count the solutions of a grid with the bitmask engine"""
+    topology = topology or diagonal_topology()
+    return bitboard.count_solutions(bitboard.grid2cells(grid, topology), topology, limit)
+
+def solve_dlx(grid, recorder=NULL_RECORDER, pipeline=DEFAULT_PIPELINE, stats=None, topology=None,
+              tracer=NULL_TRACER, branching=DEFAULT_BRANCHING, budget=None):
+    """Solve a grid as an exact cover problem with Dancing Links (see dlx.py).
+    The pipeline and branching are not used: the engine does no constraint
+    propagation and always branches on the column with the fewest rows.
+    """
+    return dlx.solve(grid, topology or diagonal_topology(), recorder, stats, tracer, budget)
+
+def count_dlx(grid, limit=None, topology=None):
+    """Count the solutions of a grid with Dancing Links"""
+    return dlx.count_solutions(grid, topology or diagonal_topology(), limit)
+
+ENGINES = {
+    'bitmask': solve_bitmask,
+    'dlx': solve_dlx,
+    'string': solve_strings,
+}
+
+COUNTERS = {
+    'bitmask': count_bitmask,
+    'dlx': count_dlx,
+    'string': count_strings,
+}
 
-def solve(grid):
+def check_engine(engine, registry=ENGINES):
+    """Raise a ValueError for engine names that are not in the registry"""
+    if engine not in registry:
+        raise ValueError("Unknown engine '{}', expected one of {}".format(engine, sorted(registry)))
+
+def solve(grid, engine='bitmask', recorder=None, pipeline=DEFAULT_PIPELINE, stats=None, topology=None,
+          cache=None, tracer=None, branching=DEFAULT_BRANCHING, timeout=None, max_nodes=None, token=None):
     """Find the solution to a Sudoku puzzle using search and constraint propagation
     Parameters
     ----------
@@ -170,24 +484,134 @@ def solve(grid):
         a string representing a sudoku grid.
         
         Ex. '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
+    engine(string)
+        the name of the solver backend, one of the keys of ENGINES. The 'bitmask'
+        and 'string' engines apply the same strategies and return the same board;
+        'dlx' solves the puzzle as an exact cover problem and ignores the pipeline.
+    recorder(NullRecorder, TraceRecorder or RingRecorder)
+        receives the assignments made during this solve, e.g. for reconstruct().
+        Defaults to a recorder that keeps nothing.
+    pipeline(tuple)
+        the names of the strategies to apply (see strategies.py)
+    stats(SolveStats)
+        receives per-strategy call counts, wall time, eliminated candidates and
+        contradictions, plus search node counts. Nothing is measured without it.
+    topology(Topology)
+        the board variant, e.g. topology.get_topology(16, diagonals=False). Defaults
+        to 9x9 diagonal sudoku, the only variant the string engine supports.
+    cache(cache.SolutionCache)
+        looks the puzzle up (or any symmetric variant of it) before solving and
+        keeps the solution for later calls. The recorder, stats and tracer only
+        see the solves that actually run, i.e. cache misses.
+    tracer(tracing.SearchTracer)
+        receives the choice points, nodes and solutions of the search, with
+        timestamps (see tracing.py). Nothing is traced without it.
+    branching(Branching)
+        a (variable order, value order) pair that selects how the search picks the
+        next box and orders its digits, e.g. ('mrv_degree', 'lcv'); see strategies.py
+    timeout(float)
+        stop searching after this many seconds
+    max_nodes(int)
+        stop searching after trying this many search nodes
+    token(budget.CancellationToken)
+        stop searching once the token is cancelled, e.g. from another thread
     Returns
     -------
     dict or False
         The dictionary representation of the final sudoku grid or False if no solution exists.
+    SolveResult
+        Instead of the above when timeout, max_nodes or token is given: the status
+        (SOLVED, UNSOLVABLE or BUDGET_EXCEEDED), the solution if any, the stats
+        passed in (partial if the budget ran out, None without them), the reason
+        it ran out, the wall time and the search nodes tried.
     """
-    values = grid2values(grid)
-    values = search(values)
-    return values
+    check_engine(engine)
+    pipeline = check_pipeline(pipeline)
+    branching = check_branching(branching)
+    recorder = recorder or NULL_RECORDER
+    tracer = tracer or NULL_TRACER
+    if timeout is None and max_nodes is None and token is None:
+        return run_engine(grid, engine, recorder, pipeline, stats, topology, cache, tracer, branching)
+
+    # the budget counts the nodes, so stats (and the timing it implies) stay the caller's choice
+    started = perf_counter()
+    budget = Budget(timeout, max_nodes, token)
+    try:
+        budget.check()
+        values = run_engine(grid, engine, recorder, pipeline, stats, topology, cache, tracer, branching, budget)
+    except BudgetExceeded as exceeded:
+        return SolveResult(BUDGET_EXCEEDED, None, stats, exceeded.reason, perf_counter() - started, budget.nodes)
+    return SolveResult(SOLVED if values else UNSOLVABLE, values or None, stats, None, perf_counter() - started,
+                       budget.nodes)
+
+def run_engine(grid, engine, recorder, pipeline, stats, topology, cache, tracer, branching, budget=None):
+    """Solve a grid with an engine of ENGINES, through the cache if one is given.
+    The arguments are those of solve(), already validated.
+    """
+    if cache is None:
+        return ENGINES[engine](grid, recorder, pipeline, stats, topology, tracer, branching, budget)
+    topology = topology or diagonal_topology()
+    if cache.topology is not topology:
+        raise ValueError("The cache holds {} solutions, not {}".format(cache.topology, topology))
+
+    def solve_grid(grid):
+        values = ENGINES[engine](grid, recorder, pipeline, stats, topology, tracer, branching, budget)
+        return values and ''.join(values[box] for box in topology.boxes)
+
+    solved = cache.get_or_solve(grid, solve_grid)
+    return solved and dict(zip(topology.boxes, solved))
+
+def solve_with_stats(grid, engine='bitmask', pipeline=DEFAULT_PIPELINE, topology=None, branching=DEFAULT_BRANCHING):
+    """Solve a grid and measure each strategy of the pipeline along the way
+    Returns
+    -------
+    tuple
+        The result of solve() and the SolveStats of this solve
+    """
+    stats = SolveStats(pipeline)
+    return solve(grid, engine, pipeline=pipeline, stats=stats, topology=topology, branching=branching), stats
+
+def count_solutions(grid, limit=None, engine='bitmask', topology=None):
+    """Count the solutions of a Sudoku puzzle, stopping early once limit solutions are found
+    Parameters
+    ----------
+    grid(string)
+        a string representing a sudoku grid.
+    limit(int)
+        the number of solutions after which the search stops (None counts them all).
+        With limit=2 the result tells whether the puzzle is unique.
+    engine(string)
+        the name of the solver backend, one of the keys of COUNTERS
+    topology(Topology)
+        the board variant, 9x9 diagonal sudoku by default
+    Returns
+    -------
+    int
+        The number of solutions, capped at limit
+    """
+    check_engine(engine, COUNTERS)
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1, got {}".format(limit))
+    return COUNTERS[engine](grid, limit, topology)
+
+def has_unique_solution(grid, engine='bitmask', topology=None):
+    """Return True if the grid has exactly one solution"""
+    return count_solutions(grid, limit=2, engine=engine, topology=topology) == 1
+
+# every public global, as a star import found them, plus the board tables, which
+# only become attributes on first access
+__all__ = sorted({name for name in globals() if not name.startswith('_')} | set(BOARD_TABLES))
 
 if __name__ == "__main__":
     diag_sudoku_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
     display(grid2values(diag_sudoku_grid))
-    result = solve(diag_sudoku_grid) 
+    recorder = TraceRecorder()
+    result = solve(diag_sudoku_grid, recorder=recorder)
     display(result)
 
     try:
         import PySudoku
-        PySudoku.play(grid2values(diag_sudoku_grid), result, history)
+        PySudoku.play(grid2values(diag_sudoku_grid), result, recorder.history)
 
     except SystemExit:
         pass
@@ -0,0 +1,128 @@
+"""Strategy pipeline and branching configuration, and per-solve instrumentation
+shared by the engines.
+
+A pipeline is an ordered tuple of strategy names. Both engines apply the
+strategies of a pipeline during constraint propagation, and fill in a
+SolveStats object with what each of them did when one is given.
+
+The default pipeline only has the three basic rules. These stronger rules can be
+added to it per solve. Each of them works on every unit, diagonals included:
+
+- 'hidden_pairs' / 'hidden_triples': two (three) digits that only have the
+  same two (three) boxes left in a unit clear every other digit from those boxes
+- 'naked_triples': three boxes of a unit whose candidates are three digits in
+  all clear those digits from the rest of the unit
+- 'pointing_pairs': a digit whose places in a region all lie in another unit
+  (row, column or diagonal) is cleared from the rest of that unit
+- 'box_line': a digit whose places in a row, column or diagonal all lie in one
+  region is cleared from the rest of that region
+- 'x_wing': a digit with the same two places in two rows is cleared from the
+  rest of those two columns, and the same with rows and columns swapped
+
+A Branching pair selects how the search picks the next box (variable order) and
+the order in which it tries that box's digits (value order):
+
+- 'mrv': the box with the fewest candidates, the first one on ties
+- 'mrv_degree': the box with the fewest candidates, ties broken by the most
+  unsolved peers, with DIAGONAL_WEIGHT extra for each diagonal the box is on
+- 'natural': digits in increasing order
+- 'lcv': least constraining value first, i.e. the digit that is a candidate
+  in the fewest peers
+"""
+from collections import namedtuple
+
+STRATEGY_NAMES = ('eliminate', 'only_choice', 'naked_twins', 'hidden_pairs', 'hidden_triples', 'naked_triples',
+                  'pointing_pairs', 'box_line', 'x_wing')
+DEFAULT_PIPELINE = ('eliminate', 'only_choice', 'naked_twins')
+# the rules that are not in the default pipeline
+EXTRA_STRATEGIES = STRATEGY_NAMES[len(DEFAULT_PIPELINE):]
+
+VARIABLE_ORDERS = ('mrv', 'mrv_degree')
+VALUE_ORDERS = ('natural', 'lcv')
+# how many unsolved peers being on a diagonal is worth in the mrv_degree tie-break
+DIAGONAL_WEIGHT = 2
+
+Branching = namedtuple('Branching', ['variable', 'value'])
+DEFAULT_BRANCHING = Branching('mrv', 'natural')
+
+
+def check_pipeline(pipeline):
+    """Validate a pipeline and return it as a tuple of strategy names
+    Parameters
+    ----------
+    pipeline(iterable)
+        strategy names, in the order they should be applied
+    Returns
+    -------
+    tuple
+        The pipeline
+    """
+    pipeline = tuple(pipeline)
+    for name in pipeline:
+        if name not in STRATEGY_NAMES:
+            raise ValueError("Unknown strategy '{}', expected one of {}".format(name, STRATEGY_NAMES))
+    if len(set(pipeline)) != len(pipeline):
+        raise ValueError("Strategies can only appear once in a pipeline: {}".format(pipeline))
+    # without eliminate, nothing stops two boxes of a unit from getting the same digit
+    if 'eliminate' not in pipeline:
+        raise ValueError("The pipeline must include 'eliminate'")
+    return pipeline
+
+
+def check_branching(branching):
+    """Validate a (variable order, value order) pair and return it as a Branching"""
+    branching = Branching(*branching)
+    if branching.variable not in VARIABLE_ORDERS:
+        raise ValueError("Unknown variable order '{}', expected one of {}".format(branching.variable, VARIABLE_ORDERS))
+    if branching.value not in VALUE_ORDERS:
+        raise ValueError("Unknown value order '{}', expected one of {}".format(branching.value, VALUE_ORDERS))
+    return branching
+
+
+class StrategyStats:
+    """What a single strategy did during one solve"""
+    def __init__(self):
+        self.calls = 0  # times the strategy was applied
+        self.seconds = 0.0  # wall time spent in the strategy
+        self.eliminated = 0  # candidates removed from boxes
+        self.contradictions = 0  # times it left a box or a digit with no place
+
+    def as_dict(self):
+        return {'calls': self.calls, 'seconds': self.seconds,
+                'eliminated': self.eliminated, 'contradictions': self.contradictions}
+
+    def __repr__(self):
+        return 'StrategyStats(calls={calls}, seconds={seconds:.6f}, eliminated={eliminated}, ' \
+               'contradictions={contradictions})'.format(**self.as_dict())
+
+
+class SolveStats:
+    """Counters for one solve: per-strategy stats plus the size of the search tree
+    Parameters
+    ----------
+    pipeline(tuple)
+        the strategies to keep stats for
+    """
+    def __init__(self, pipeline=DEFAULT_PIPELINE):
+        self.pipeline = tuple(pipeline)
+        self.strategies = {name: StrategyStats() for name in self.pipeline}
+        self.nodes = 0  # candidate assignments tried at choice points
+        self.backtracks = 0  # assignments that led to a contradiction
+        self.propagations = 0  # constraint propagation passes, one per search node plus the initial one
+
+    def strategy(self, name):
+        """The StrategyStats of the named strategy, created on first use for a
+        strategy outside the pipeline the stats were made for
+        """
+        counters = self.strategies.get(name)
+        if counters is None:
+            counters = self.strategies[name] = StrategyStats()
+        return counters
+
+    def as_dict(self):
+        return {'nodes': self.nodes, 'backtracks': self.backtracks, 'propagations': self.propagations,
+                'strategies': {name: stats.as_dict() for name, stats in self.strategies.items()}}
+
+    def __repr__(self):
+        return 'SolveStats(nodes={}, backtracks={}, propagations={}, strategies={})'.format(
+            self.nodes, self.backtracks, self.propagations, self.strategies)
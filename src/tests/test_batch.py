@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+import batch
+import solution
+from tests import test_solution
+
+
+class TestBatch(unittest.TestCase):
+    grids = [test_solution.TestDiagonalSudoku.diagonal_grid, '22' + '.' * 79, '.' * 81]
+
+    def test_solve_many_in_process(self):
+        results = list(batch.solve_many(self.grids, workers=1))
+        self.assertEqual(results, [solution.solve(grid) for grid in self.grids])
+
+    def test_solve_many_pool_keeps_order(self):
+        grids = self.grids * 5
+        self.assertEqual(list(batch.solve_grids(grids, workers=2, chunksize=2)),
+                         list(batch.solve_grids(grids, workers=1)))
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            puzzles = os.path.join(tmp, 'puzzles.txt')
+            output = os.path.join(tmp, 'solutions.txt')
+            with open(puzzles, 'w') as f:
+                f.write('\n'.join(self.grids[:2] + ['123', 'x' * 81] + self.grids[2:]) + '\n\n')
+            for args in (['-j', '2'], ['-j', '1']):
+                batch.main([puzzles, '-o', output, '--errors', os.path.join(tmp, 'errors.tsv')] + args)
+                with open(output) as f:
+                    lines = f.read().splitlines()
+                # one line per input record, rejected ones included
+                self.assertEqual(len(lines), 5)
+                self.assertEqual(lines[0], batch.solve_grid(self.grids[0]))
+                self.assertEqual(lines[1:4], [batch.UNSOLVABLE, batch.INVALID, batch.INVALID])
+                self.assertEqual(len(lines[4]), 81)
+            with open(os.path.join(tmp, 'errors.tsv')) as f:
+                self.assertEqual([line.split('\t')[0] for line in f], ['3', '4'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import benchmark
+import solution
+
+load_set = benchmark.load_set
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_bundled_sets(self):
+        for name in benchmark.SETS:
+            grids = benchmark.load_set(name)
+            self.assertEqual(len(grids), 25, name)
+            solvable = [bool(solution.solve(grid)) for grid in grids]
+            self.assertEqual(solvable, [name != 'unsolvable'] * len(grids), name)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 95), 95)
+        self.assertEqual(benchmark.percentile([3.0], 99), 3.0)
+
+    def test_run_set(self):
+        report = benchmark.run_set(benchmark.load_set('hard')[:3])
+        self.assertEqual((report['count'], report['solved']), (3, 3))
+        self.assertGreater(report['nodes'], 0)
+        self.assertEqual(report['propagations'], report['nodes'] + 3)
+        self.assertGreater(report['peak_kib'], 0)
+        self.assertLessEqual(report['median_ms'], report['p95_ms'])
+
+    def test_timed_solves_are_not_instrumented(self):
+        calls = []
+        solve = solution.solve
+
+        def spy(grid, **options):
+            calls.append(options.get('stats') is not None)
+            return solve(grid, **options)
+        with mock.patch.object(solution, 'solve', spy):
+            benchmark.run_set(benchmark.load_set('hard')[:2], repeat=3, memory=False)
+        # per grid: three timed solves, then one that collects the stats
+        self.assertEqual(calls, [False, False, False, True] * 2)
+
+    def test_compare_branching(self):
+        report = benchmark.compare_branching(['hard'])['hard']
+        self.assertEqual(len(report), 4)
+        self.assertEqual(report['mrv/natural']['reduction'], 0.0)
+        self.assertGreater(report['mrv_degree/natural']['reduction'], 0.2)
+
+    def test_compare_strategies(self):
+        with mock.patch.object(benchmark, 'load_set', lambda name: load_set(name)[:4]):
+            report = benchmark.compare_strategies(['adversarial'])['adversarial']
+        self.assertEqual(len(report), 2 + 2 * len(benchmark.EXTRA_STRATEGIES))
+        self.assertEqual(report['default']['reduction'], 0.0)
+        self.assertGreater(report['all']['reduction'], 0.2)
+        self.assertIn('+box_line', benchmark.format_strategies({'adversarial': report}))
+
+    def test_compare(self):
+        baseline = {'sets': {'hard': {'median_ms': 1.0, 'nodes': 100}}}
+        results = {'sets': {'hard': {'median_ms': 1.05, 'nodes': 150}, 'easy': {'median_ms': 9.0}}}
+        self.assertEqual(benchmark.compare(results, baseline, 0.1), [('hard', 'nodes', 100, 150)])
+
+    def test_startup(self):
+        report = benchmark.measure_startup(repeat=1)
+        self.assertEqual(report['heavy'], [])
+        self.assertGreater(report['import_ms'], 0)
+        self.assertGreater(report['modules'], len(report['slowest']))
+        self.assertIn('import solution', benchmark.format_startup(report))
+        times = benchmark.parse_importtime('import time: self [us] | cumulative | imported package\n'
+                                           'import time:       120 |        450 |   bitboard\n')
+        self.assertEqual(times, {'bitboard': (120, 450)})
+        baseline = {'sets': {}, 'startup': {'import_ms': 10.0}}
+        self.assertEqual(benchmark.compare({'sets': {}, 'startup': {'import_ms': 12.0}}, baseline, 0.1),
+                         [('startup', 'import_ms', 10.0, 12.0)])
+
+    def test_cli_comparisons_use_the_options(self):
+        with mock.patch.object(benchmark, 'compare_branching', return_value={}) as branching, \
+                mock.patch.object(benchmark, 'compare_strategies', return_value={}) as strategies, \
+                mock.patch.object(benchmark, 'format_branching', return_value=''), \
+                mock.patch.object(benchmark, 'format_strategies', return_value=''):
+            benchmark.main(['--sets', 'easy', '--repeat', '1', '--no-memory', '--compare-branching',
+                            '--compare-strategies', '--pipeline', 'eliminate', 'only_choice',
+                            '--branching', 'mrv_degree', 'lcv'])
+        branching.assert_called_once_with(['easy'], 'bitmask', ['eliminate', 'only_choice'])
+        strategies.assert_called_once_with(['easy'], 'bitmask', ['mrv_degree', 'lcv'])
+
+    def test_cli_baseline(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'results.json')
+            args = ['--sets', 'easy', '--repeat', '1', '--no-memory']
+            self.assertEqual(benchmark.main(args + ['-o', output]), 0)
+            with open(output) as f:
+                results = json.load(f)
+            results['sets']['easy']['propagations'] = 1
+            with open(output, 'w') as f:
+                json.dump(results, f)
+            self.assertEqual(benchmark.main(args + ['--baseline', output]), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
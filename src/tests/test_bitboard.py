@@ -0,0 +1,77 @@
+import unittest
+import bitboard
+import solution
+from tests import test_solution
+
+
+class TestBitmaskEngine(unittest.TestCase):
+
+    def test_round_trip(self):
+        values = test_solution.TestNakedTwins.before_naked_twins_1
+        cells = bitboard.values2cells(values, solution.tables)
+        self.assertEqual(bitboard.cells2values(cells, solution.tables), values)
+
+    def test_naked_twins(self):
+        for before, possible in ((test_solution.TestNakedTwins.before_naked_twins_1, test_solution.TestNakedTwins.possible_solutions_1),
+                                 (test_solution.TestNakedTwins.before_naked_twins_2, test_solution.TestNakedTwins.possible_solutions_2)):
+            cells = bitboard.naked_twins(bitboard.values2cells(before, solution.tables), solution.tables)
+            self.assertIn(bitboard.cells2values(cells, solution.tables), possible)
+
+    def test_solve_matches_string_engine(self):
+        grid = test_solution.TestDiagonalSudoku.diagonal_grid
+        self.assertEqual(solution.solve(grid, engine='bitmask'), solution.solve(grid, engine='string'))
+        self.assertEqual(solution.solve(grid), test_solution.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_empty_grid(self):
+        result = solution.solve('.' * 81)
+        for unit in solution.unitlist:
+            self.assertEqual(sorted(result[box] for box in unit), list('123456789'))
+
+    def test_propagate_only_touches_changed_units(self):
+        cells = bitboard.grid2cells('.' * 81, solution.tables)
+        cells[0] = solution.tables.mask_of['5']
+        dirty = set(solution.tables.cell_units[0])
+        bitboard.propagate(cells, solution.tables, [0], dirty, [])
+        self.assertEqual(solution.tables.mask2symbols(cells[1]), '12346789')
+        self.assertEqual(solution.tables.mask2symbols(cells[80]), '12346789')  # same diagonal
+        self.assertEqual(solution.tables.mask2symbols(cells[79]), '123456789')
+
+    def test_branching_heuristics(self):
+        cells = bitboard.grid2cells('.' * 81, solution.tables)
+        bonus = bitboard.diagonal_bonus(solution.tables)
+        self.assertEqual(bitboard.choose_box(cells, solution.tables.popcount), 0)
+        self.assertEqual(bitboard.choose_box_degree(cells, solution.tables, bonus), 40)  # E5
+        cells[0] = solution.tables.mask_of['1'] | solution.tables.mask_of['2']
+        for i in (1, 9, 20):  # A2, B1, C3 lose the 2
+            cells[i] ^= solution.tables.mask_of['2']
+        order = bitboard.least_constraining(cells, solution.tables, 0)
+        self.assertEqual([solution.tables.symbol_of[bit] for bit in order], ['2', '1'])
+
+    def test_rewind_restores_board(self):
+        cells = bitboard.grid2cells(test_solution.TestDiagonalSudoku.diagonal_grid, solution.tables)
+        before = cells[:]
+        trail = [1, before[1]]
+        cells[1] = solution.tables.mask_of['6']
+        bitboard.propagate(cells, solution.tables, [1], set(solution.tables.cell_units[1]), trail)
+        self.assertNotEqual(cells, before)
+        bitboard.rewind(cells, trail, 0)
+        self.assertEqual(cells, before)
+
+    def test_unsolvable(self):
+        # two 2s in the first row
+        grid = '22' + '.' * 79
+        self.assertIs(solution.solve(grid, engine='bitmask'), False)
+
+    def test_malformed_grids(self):
+        grid = test_solution.TestDiagonalSudoku.diagonal_grid
+        for bad in ('123', grid + '.', 'x' * 81, grid[:-1] + 'a'):
+            with self.assertRaises(ValueError):
+                solution.solve(bad, engine='bitmask')
+        self.assertEqual(solution.solve(grid.replace('.', '0')), test_solution.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            solution.solve(test_solution.TestDiagonalSudoku.diagonal_grid, engine='nope')
+
+if __name__ == '__main__':
+    unittest.main()
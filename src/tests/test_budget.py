@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+import benchmark
+import budget
+import solution
+from strategies import SolveStats
+from tests import test_solution
+
+SLOW_GRID = benchmark.load_set('adversarial')[-2]  # about 600 search nodes
+
+
+class TestBudget(unittest.TestCase):
+
+    def test_outcomes(self):
+        result = solution.solve(test_solution.TestDiagonalSudoku.diagonal_grid, max_nodes=1000)
+        self.assertEqual(result.status, budget.SOLVED)
+        self.assertTrue(result)
+        self.assertEqual(result.values, test_solution.TestDiagonalSudoku.solved_diag_sudoku)
+        result = solution.solve(benchmark.load_set('unsolvable')[0], timeout=60)
+        self.assertEqual((result.status, result.values, result.reason), (budget.UNSOLVABLE, None, None))
+        self.assertFalse(result)
+
+    def test_max_nodes(self):
+        for engine in ('bitmask', 'string', 'dlx'):
+            result = solution.solve(SLOW_GRID, engine=engine, max_nodes=20)
+            self.assertEqual((result.status, result.reason), (budget.BUDGET_EXCEEDED, 'max_nodes'), engine)
+            self.assertEqual(result.nodes, 20)
+            stats = SolveStats()
+            result = solution.solve(SLOW_GRID, engine=engine, max_nodes=20, stats=stats)
+            self.assertIs(result.stats, stats)
+            self.assertEqual(stats.nodes, 20)
+        self.assertTrue(solution.solve(SLOW_GRID, max_nodes=10 ** 6))
+
+    def test_timeout(self):
+        result = solution.solve(SLOW_GRID, engine='string', timeout=0.05)
+        self.assertEqual((result.status, result.reason), (budget.BUDGET_EXCEEDED, 'timeout'))
+        self.assertLess(result.seconds, 0.5)
+        self.assertGreater(result.nodes, 0)
+
+    def test_cancel_from_thread(self):
+        token = budget.CancellationToken()
+        threading.Timer(0.05, token.cancel).start()
+        result = solution.solve(SLOW_GRID, engine='string', token=token)
+        self.assertEqual((result.status, result.reason), (budget.BUDGET_EXCEEDED, 'cancelled'))
+        # a cancelled token stops later solves before they start
+        self.assertEqual(solution.solve(SLOW_GRID, token=token).nodes, 0)
+
+    def test_stats_only_when_asked(self):
+        # budgeted solves are on the latency path: nothing is timed unless stats are passed
+        with mock.patch.object(solution, 'SolveStats', side_effect=AssertionError):
+            result = solution.solve(SLOW_GRID, timeout=60, max_nodes=10 ** 6)
+        self.assertEqual(result.status, budget.SOLVED)
+        self.assertIsNone(result.stats)
+        self.assertEqual(result.nodes, solution.solve_with_stats(SLOW_GRID)[1].nodes)
+
+    def test_solve_async(self):
+        async def main():
+            result = await budget.solve_async(SLOW_GRID, max_nodes=10 ** 6)
+            self.assertEqual(result.status, budget.SOLVED)
+            token = budget.CancellationToken()
+            task = asyncio.ensure_future(budget.solve_async(SLOW_GRID, token=token, engine='string'))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertTrue(token.cancelled)
+        asyncio.run(main())
+
+
+if __name__ == '__main__':
+    unittest.main()
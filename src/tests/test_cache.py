@@ -0,0 +1,85 @@
+import os
+import random
+import tempfile
+import unittest
+import cache
+import solution
+from topology import get_topology
+from tests import test_solution
+
+HARD_GRID = '.......214...3..8............7.............56.....61.....4....8..3..9....1..6...2'
+
+
+def transform(grid, perm, relabel=None):
+    grid = ''.join(grid[i] for i in perm)
+    return grid.translate(str.maketrans('123456789', relabel)) if relabel else grid
+
+
+class TestSolutionCache(unittest.TestCase):
+
+    def test_symmetries_keep_units(self):
+        for topology in (solution.tables, get_topology(4), get_topology(16, diagonals=False)):
+            units = {frozenset(topology.index[box] for box in unit) for unit in topology.unitlist}
+            for perm in cache.symmetries(topology):
+                moved = {frozenset(perm.index(i) for i in unit) for unit in units}
+                self.assertEqual(moved, units)
+        self.assertEqual(len(cache.symmetries(solution.tables)), 96)
+
+    def test_canonical_form_is_invariant(self):
+        rng = random.Random(3)
+        key = cache.Canonical(HARD_GRID).key
+        for perm in cache.symmetries(solution.tables):
+            relabel = ''.join(rng.sample('123456789', 9))
+            self.assertEqual(cache.Canonical(transform(HARD_GRID, perm, relabel)).key, key)
+        self.assertNotEqual(cache.Canonical(test_solution.TestDiagonalSudoku.diagonal_grid).key, key)
+
+    def test_hit_maps_solution_back(self):
+        solutions = cache.SolutionCache()
+        rng = random.Random(5)
+        expected = solution.solve(HARD_GRID)
+        self.assertEqual(solution.solve(HARD_GRID, cache=solutions), expected)
+        for perm in rng.sample(cache.symmetries(solution.tables), 10):
+            variant = transform(HARD_GRID, perm, ''.join(rng.sample('123456789', 9)))
+            self.assertEqual(solution.solve(variant, cache=solutions), solution.solve(variant))
+        self.assertEqual(solutions.counters()['misses'], 1)
+        self.assertEqual(solutions.counters()['hits'], 10)
+
+    def test_unsolvable_and_eviction(self):
+        solutions = cache.SolutionCache(maxsize=1)
+        self.assertIs(solution.solve('11' + '.' * 79, cache=solutions), False)
+        self.assertIs(solution.solve('.' * 79 + '22', cache=solutions), False)
+        self.assertEqual(solutions.hits, 1)
+        solution.solve(test_solution.TestDiagonalSudoku.diagonal_grid, cache=solutions)
+        self.assertEqual(solutions.evictions, 1)
+        self.assertEqual(len(solutions.entries), 1)
+
+    def test_disk_store(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'solutions')
+            with cache.SolutionCache(path=path) as solutions:
+                solution.solve(HARD_GRID, cache=solutions)
+            with cache.SolutionCache(path=path) as solutions:
+                self.assertEqual(solution.solve(HARD_GRID[::-1], cache=solutions), solution.solve(HARD_GRID[::-1]))
+                self.assertEqual(solutions.counters()['disk_hits'], 1)
+                self.assertEqual(solutions.misses, 0)
+
+    def test_malformed_grids(self):
+        solutions = cache.SolutionCache()
+        grid = test_solution.TestDiagonalSudoku.diagonal_grid
+        solution.solve(grid, cache=solutions)
+        for bad in (grid.replace('.', 'x'), grid[:80], grid + '.'):
+            with self.assertRaises(ValueError):
+                solution.solve(bad)
+            with self.assertRaises(ValueError):
+                solution.solve(bad, cache=solutions)
+        # '0' stands for an empty box with and without a cache
+        self.assertEqual(solution.solve(grid.replace('.', '0'), cache=solutions), solution.solve(grid))
+        self.assertEqual(solutions.hits, 1)
+
+    def test_topology_mismatch(self):
+        with self.assertRaises(ValueError):
+            solution.solve('.' * 16, topology=get_topology(4), cache=cache.SolutionCache())
+
+
+if __name__ == '__main__':
+    unittest.main()
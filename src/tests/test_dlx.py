@@ -0,0 +1,86 @@
+import random
+import unittest
+import dlx
+import generator
+import solution
+from topology import get_topology
+from tests import test_solution
+from utils import TraceRecorder
+
+HARD_GRID = '.......214...3..8............7.............56.....61.....4....8..3..9....1..6...2'
+
+
+def is_solution(values, grid, topology):
+    for box, given in zip(topology.boxes, grid):
+        if given in topology.mask_of and values[box] != given:
+            return False
+    return all(sorted(values[box] for box in unit) == sorted(topology.symbols) for unit in topology.unitlist)
+
+
+class TestDancingLinks(unittest.TestCase):
+
+    def test_matches_other_engines_on_unique_puzzles(self):
+        for grid in (test_solution.TestDiagonalSudoku.diagonal_grid, HARD_GRID):
+            expected = solution.solve(grid, engine='string')
+            self.assertEqual(solution.solve(grid, engine='dlx'), expected)
+            self.assertEqual(solution.solve(grid, engine='bitmask'), expected)
+
+    def test_differential_random_puzzles(self):
+        # random clue sets: some unique, some with several solutions, some unsolvable
+        rng = random.Random(12)
+        tables = solution.tables
+        for _ in range(12):
+            solved = generator.random_solution(rng)
+            grid = list(solved)
+            for i in rng.sample(range(81), rng.randint(45, 64)):
+                grid[i] = '.'
+            if rng.random() < 0.3:
+                grid[rng.randrange(81)] = rng.choice('123456789')
+            grid = ''.join(grid)
+            counts = {engine: solution.count_solutions(grid, limit=2, engine=engine) for engine in ('dlx', 'bitmask', 'string')}
+            self.assertEqual(len(set(counts.values())), 1, (grid, counts))
+            result = solution.solve(grid, engine='dlx')
+            if counts['dlx'] == 0:
+                self.assertIs(result, False)
+            else:
+                self.assertTrue(is_solution(result, grid, tables), grid)
+            if counts['dlx'] == 1:
+                self.assertEqual(result, solution.solve(grid, engine='bitmask'))
+
+    def test_unsolvable(self):
+        self.assertIs(solution.solve('11' + '.' * 79, engine='dlx'), False)
+        # A1 and I9 are only peers through the main diagonal
+        grid = '1' + '.' * 79 + '1'
+        self.assertEqual(solution.count_solutions(grid, engine='dlx'), 0)
+        self.assertEqual(solution.count_solutions(grid, engine='bitmask'), 0)
+
+    def test_malformed_grids(self):
+        grid = test_solution.TestDiagonalSudoku.diagonal_grid
+        for bad in ('123', grid + '.', 'x' * 81):
+            with self.assertRaises(ValueError):
+                solution.solve(bad, engine='dlx')
+            with self.assertRaises(ValueError):
+                solution.count_solutions(bad, engine='dlx')
+        self.assertEqual(solution.solve(grid.replace('.', '0'), engine='dlx'),
+                         test_solution.TestDiagonalSudoku.solved_diag_sudoku)
+
+    def test_other_topologies(self):
+        for topology in (get_topology(4, diagonals=False), get_topology(16, diagonals=False)):
+            result = solution.solve('.' * len(topology.boxes), engine='dlx', topology=topology)
+            self.assertTrue(is_solution(result, '', topology))
+        plain = get_topology(4, diagonals=False)
+        self.assertEqual(solution.count_solutions('.' * 16, engine='dlx', topology=plain), 288)
+        self.assertEqual(solution.count_solutions('.' * 16, engine='bitmask', topology=plain), 288)
+
+    def test_recorder_and_stats(self):
+        recorder = TraceRecorder()
+        stats, grid = solution.SolveStats(), test_solution.TestDiagonalSudoku.diagonal_grid
+        values = solution.solve(grid, engine='dlx', recorder=recorder, stats=stats)
+        self.assertEqual(len(recorder.history), grid.count('.'))
+        self.assertGreaterEqual(stats.nodes, grid.count('.'))
+        self.assertEqual(dlx.count_solutions(grid, limit=5), 1)
+        self.assertEqual(values, test_solution.TestDiagonalSudoku.solved_diag_sudoku)
+
+
+if __name__ == '__main__':
+    unittest.main()
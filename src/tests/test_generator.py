@@ -0,0 +1,34 @@
+import unittest
+import generator
+import solution
+from tests import test_solution
+
+
+class TestGenerator(unittest.TestCase):
+
+    def test_generated_puzzle_is_unique_and_graded(self):
+        puzzle, grade = generator.generate(seed=7)
+        self.assertTrue(solution.has_unique_solution(puzzle))
+        self.assertEqual(grade, generator.grade(puzzle))
+        self.assertIn(grade.level, generator.LEVELS)
+
+    def test_generate_is_reproducible(self):
+        self.assertEqual(generator.generate(seed=3), generator.generate(seed=3))
+
+    def test_level(self):
+        puzzle, grade = generator.generate(seed=1, level='only_choice')
+        self.assertEqual(grade.level, 'only_choice')
+        self.assertEqual(grade.strategies, ('eliminate', 'only_choice'))
+
+    def test_grade(self):
+        self.assertEqual(generator.grade(test_solution.TestDiagonalSudoku.diagonal_grid).level, 'only_choice')
+        grade = generator.grade('.......214...3..8............7.............56.....61.....4....8..3..9....1..6...2')
+        self.assertEqual(grade.level, 'search')
+        self.assertGreater(grade.nodes, 0)
+
+    def test_generate_many(self):
+        results = list(generator.generate_many(4, workers=2, seed=11))
+        self.assertEqual(sorted(results), sorted(generator.generate(seed) for seed in range(11, 15)))
+
+if __name__ == '__main__':
+    unittest.main()
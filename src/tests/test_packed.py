@@ -0,0 +1,121 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import benchmark
+import bitboard
+import packed
+import solution
+from topology import get_topology
+from tests import test_solution
+
+GRID = test_solution.TestDiagonalSudoku.diagonal_grid
+SOLVED_GRID = ''.join(test_solution.TestDiagonalSudoku.solved_diag_sudoku[box] for box in solution.boxes)
+
+
+class TestPacking(unittest.TestCase):
+
+    def test_grid_round_trip(self):
+        for grid in (GRID, SOLVED_GRID, '.' * 81):
+            data = packed.pack_grid(grid)
+            self.assertEqual(len(data), 41)
+            self.assertEqual(packed.unpack_grid(data), grid)
+        self.assertEqual(packed.unpack_grid(packed.pack_grid(GRID.replace('.', '0'))), GRID)
+        self.assertLess(len(pickle.dumps(packed.pack_grid(SOLVED_GRID))), len(pickle.dumps(SOLVED_GRID)))
+
+    def test_other_sizes(self):
+        for topology in (get_topology(4), get_topology(9, diagonals=False)):
+            grid = topology.symbols + '.' * (len(topology.boxes) - topology.size)
+            data = packed.pack_grid(grid, topology)
+            self.assertEqual(len(data), packed.grid_bytes(topology))
+            self.assertEqual(packed.unpack_grid(data, topology), grid)
+        with self.assertRaises(ValueError):
+            packed.pack_grid('.' * 256, get_topology(16))
+
+    def test_invalid_grids(self):
+        with self.assertRaises(ValueError):
+            packed.pack_grid(GRID[:80])
+        with self.assertRaises(ValueError):
+            packed.pack_grid('x' + GRID[1:])
+
+    def test_cells_round_trip(self):
+        cells = bitboard.grid2cells(GRID, solution.tables)
+        bitboard.reduce_puzzle(cells, solution.tables)
+        data = packed.pack_cells(cells)
+        self.assertEqual(len(data), 92)
+        self.assertEqual(packed.unpack_cells(data), cells)
+        topology = get_topology(16, diagonals=False)
+        cells = bitboard.grid2cells('.' * 256, topology)
+        cells[5] = 1 << 15
+        self.assertEqual(packed.unpack_cells(packed.pack_cells(cells, topology), topology), cells)
+
+
+class TestBoardFile(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'boards.sdk')
+        self.grids = benchmark.load_set('hard')[:6] + benchmark.load_set('unsolvable')[:2]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_create_and_read(self):
+        self.assertEqual(packed.BoardFile.create(self.path, iter(self.grids)), 8)
+        self.assertEqual(os.path.getsize(self.path), packed.HEADER.size + 8 * 83)
+        with packed.BoardFile(self.path) as boards:
+            self.assertEqual(len(boards), 8)
+            self.assertEqual([boards.puzzle(i) for i in range(8)], self.grids)
+            self.assertEqual(list(boards), [(grid, None) for grid in self.grids])
+            with self.assertRaises(IndexError):
+                boards.puzzle(8)
+            with self.assertRaises(ValueError):
+                boards.set_result(0, False)
+
+    def test_solve_in_place(self):
+        packed.BoardFile.create(self.path, self.grids)
+        self.assertEqual(packed.solve_file(self.path, workers=1, chunksize=3), 6)
+        with packed.BoardFile(self.path) as boards:
+            for grid, result in boards:
+                values = solution.solve(grid)
+                self.assertEqual(result, values and ''.join(values[box] for box in solution.boxes))
+        # solved records are skipped
+        self.assertEqual(packed.solve_file(self.path, workers=1), 0)
+
+    def test_solve_with_processes(self):
+        packed.BoardFile.create(self.path, self.grids)
+        self.assertEqual(packed.solve_file(self.path, workers=2, chunksize=2), 6)
+        with packed.BoardFile(self.path) as boards:
+            self.assertEqual(sum(1 for _, result in boards if result), 6)
+            self.assertEqual(sum(1 for _, result in boards if result is False), 2)
+
+    def test_bad_files(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a board file')
+        with self.assertRaises(ValueError):
+            packed.BoardFile(self.path)
+        packed.BoardFile.create(self.path, self.grids)
+        with open(self.path, 'ab') as f:
+            f.write(b'\x00')
+        with self.assertRaises(ValueError):
+            packed.BoardFile(self.path)
+        with self.assertRaises(ValueError):
+            packed.BoardFile.create(self.path, [], get_topology(4, regions='aabbaabbccddccdd'))
+
+    def test_main(self):
+        puzzles = os.path.join(self.dir, 'puzzles.txt')
+        output = os.path.join(self.dir, 'solutions.txt')
+        with open(puzzles, 'w') as f:
+            f.write('\n'.join(self.grids) + '\n')
+        packed.main(['pack', puzzles, self.path])
+        packed.main(['solve', self.path, '-j', '1'])
+        packed.main(['unpack', self.path, '-o', output])
+        with open(output) as f:
+            lines = f.read().split()
+        self.assertEqual(lines[-2:], ['unsolvable', 'unsolvable'])
+        self.assertTrue(all(len(line) == 81 and '.' not in line for line in lines[:6]))
+
+
+if __name__ == '__main__':
+    unittest.main()
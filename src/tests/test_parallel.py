@@ -0,0 +1,112 @@
+import multiprocessing
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+import benchmark
+import bitboard
+import budget
+import parallel
+import solution
+from strategies import SolveStats
+from topology import get_topology
+from tests import test_solution
+
+GRID = test_solution.TestDiagonalSudoku.diagonal_grid
+
+
+class TestSplit(unittest.TestCase):
+
+    def solver(self, stats=None):
+        return bitboard.Solver(solution.tables, stats=stats)
+
+    def test_subtrees_cover_the_search(self):
+        grid = benchmark.load_set('adversarial')[0]
+        stats = SolveStats()
+        found, subtrees = parallel.split(self.solver(stats), bitboard.grid2cells(grid, solution.tables), 2, 100)
+        self.assertIsNone(found)
+        self.assertGreater(len(subtrees), 2)
+        self.assertGreater(stats.nodes, 2)
+        solutions = [bitboard.search(cells, solution.tables) for cells in subtrees]
+        self.assertEqual(sum(1 for cells in solutions if cells), 1)
+        found = next(cells for cells in solutions if cells)
+        self.assertEqual(bitboard.cells2values(found, solution.tables), solution.solve(grid))
+
+    def test_width_stops_the_split(self):
+        grid = benchmark.load_set('adversarial')[0]
+        _, subtrees = parallel.split(self.solver(), bitboard.grid2cells(grid, solution.tables), 2, 1)
+        self.assertEqual(len(subtrees), 1)
+
+    def test_solved_and_unsolvable(self):
+        found, subtrees = parallel.split(self.solver(), bitboard.grid2cells(GRID, solution.tables), 2, 4)
+        self.assertEqual((bitboard.cells2values(found, solution.tables), subtrees),
+                         (test_solution.TestDiagonalSudoku.solved_diag_sudoku, []))
+        grid = benchmark.load_set('unsolvable')[0]
+        self.assertEqual(parallel.split(self.solver(), bitboard.grid2cells(grid, solution.tables), 2, 4), (None, []))
+
+    def test_cancelled_subtree(self):
+        event = multiprocessing.Event()
+        event.set()
+        parallel.init_worker(event, 9, True, None, solution.DEFAULT_PIPELINE, solution.DEFAULT_BRANCHING)
+        grid = benchmark.load_set('adversarial')[0]
+        found, stats = parallel.search_subtree(bitboard.grid2cells(grid, solution.tables))
+        self.assertIsNone(found)
+        self.assertEqual(stats.nodes, 0)
+
+
+class TestParallelSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.solver = parallel.ParallelSolver(workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.solver.close()
+
+    def test_same_solutions(self):
+        grids = benchmark.load_set('hard')[:3] + benchmark.load_set('adversarial')[:3] + \
+            benchmark.load_set('unsolvable')[:2] + [GRID]
+        for grid in grids:
+            self.assertEqual(self.solver.solve(grid), solution.solve(grid), grid)
+        # the running subtrees were cancelled, and cancelling did not stop the next puzzle
+        self.assertTrue(self.solver.event.is_set())
+
+    def test_stats_and_budget(self):
+        grid = benchmark.load_set('adversarial')[0]
+        stats = SolveStats()
+        self.assertTrue(self.solver.solve(grid, stats))
+        self.assertGreater(stats.nodes, 0)
+        self.assertGreater(stats.strategies['eliminate'].calls, 0)
+        result = self.solver.solve(grid, timeout=0)
+        self.assertEqual((result.status, result.reason), (budget.BUDGET_EXCEEDED, 'timeout'))
+        result = self.solver.solve(grid, timeout=60)
+        self.assertEqual(result.status, budget.SOLVED)
+        self.assertEqual(result.values, solution.solve(grid))
+
+    def test_other_topologies(self):
+        topology = get_topology(4, diagonals=False)
+        with parallel.ParallelSolver(workers=2, topology=topology, levels=1) as solver:
+            values = solver.solve('1' + '.' * 15)
+            self.assertEqual(values['A1'], '1')
+            # a complete, consistent board solves to itself
+            self.assertEqual(solution.solve(''.join(values[box] for box in topology.boxes), topology=topology), values)
+            self.assertFalse(solver.solve('11' + '.' * 14))
+
+    def test_failed_subtree_while_cancelling(self):
+        def search_subtree(cells):
+            if cells == 'solved':
+                return GRID, SolveStats()
+            # fails only once the outcome is decided and the subtree is cancelled
+            solver.event.wait(5)
+            raise RuntimeError('worker failed')
+        with parallel.ParallelSolver(workers=2) as solver, mock.patch('parallel.search_subtree', search_subtree):
+            solver.executor.shutdown()
+            solver.executor = ThreadPoolExecutor(2)
+            stats = SolveStats()
+            self.assertEqual(solver.search(['failing', 'solved'], stats), GRID)
+            with self.assertRaises(budget.BudgetExceeded):
+                solver.search(['failing', 'failing'], stats, budget.Budget(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+import solution
+from utils import TraceRecorder, grid2values, reconstruct
+from tests import test_solution
+
+try:
+    import pygame
+    import PySudoku
+except ImportError:
+    pygame = None
+
+
+@unittest.skipIf(pygame is None, "pygame is not installed")
+class TestReplay(unittest.TestCase):
+    grid = test_solution.TestDiagonalSudoku.diagonal_grid
+
+    @classmethod
+    def setUpClass(cls):
+        cls.video_driver = os.environ.get('SDL_VIDEODRIVER')
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.video_driver is None:
+            del os.environ['SDL_VIDEODRIVER']
+        else:
+            os.environ['SDL_VIDEODRIVER'] = cls.video_driver
+
+    def setUp(self):
+        self.recorder = TraceRecorder()
+        self.result = solution.solve(self.grid, recorder=self.recorder)
+        pygame.display.init()
+        pygame.font.init()
+        self.screen = pygame.display.set_mode(PySudoku.SCREEN_SIZE)
+
+    def tearDown(self):
+        # a live display deadlocks the process pools forked by later tests
+        pygame.quit()
+        PySudoku.clear_caches()
+
+    def test_square_position(self):
+        self.assertEqual(PySudoku.square_position(0, 0), (38, 35))
+        self.assertEqual(PySudoku.square_position(4, 5), (327, 385))
+        self.assertEqual(PySudoku.square_position(8, 8), (615, 621))
+
+    def test_dirty_rects_match_full_redraws(self):
+        steps = reconstruct(self.result, self.recorder.history)
+        replay = PySudoku.frames(grid2values(self.grid), self.result, self.recorder.history, self.screen)
+        self.assertEqual(next(replay), [self.screen.get_rect()])
+        values = grid2values(self.grid)
+        for (box, value), dirty in zip(steps, replay):
+            values[box] = value
+            self.assertEqual(len(dirty), 1)
+            self.assertLess(dirty[0].width * dirty[0].height, 50 * 50)
+            frame = pygame.image.tostring(self.screen, 'RGB')
+            full = pygame.Surface(PySudoku.SCREEN_SIZE).convert()
+            PySudoku.Board(values, full).draw()
+            self.assertEqual(pygame.image.tostring(full, 'RGB'), frame, box)
+
+    def test_tiles_and_glyphs_are_cached(self):
+        board = PySudoku.Board(grid2values(self.grid), self.screen)
+        squares = list(board.squares.values())
+        self.assertIs(squares[0].font, squares[-1].font)
+        self.assertIs(PySudoku.SudokuSquare.tile(squares[0].color), PySudoku.SudokuSquare.tile(squares[0].color))
+        self.assertIs(board.squares['A1'].text, PySudoku.SudokuSquare.glyph('2'))
+
+    def test_export_image_sequence(self):
+        directory = tempfile.mkdtemp()
+        try:
+            count = PySudoku.export(grid2values(self.grid), self.result, self.recorder.history,
+                                    os.path.join(directory, 'frame_{:03d}.bmp'))
+            self.assertEqual(count, len(reconstruct(self.result, self.recorder.history)) + 1)
+            self.assertEqual(sorted(os.listdir(directory))[-1], 'frame_{:03d}.bmp'.format(count - 1))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import reader
+from tests import test_solution
+
+GRID = test_solution.TestDiagonalSudoku.diagonal_grid
+MULTI_LINE = '''# a grid as printed by display()
+2 . . |. . . |. . .
+. . . |. . 6 |2 . .
+. . 1 |. . . |. 7 .
+------+------+------
+. . 6 |. . 8 |. . .
+3 . . |. 9 . |. . 7
+. . . |6 . . |4 . .
+------+------+------
+. 4 . |. . . |8 . .
+. . 5 |2 . . |. . .
+. . . |. . . |. . 3
+'''
+
+
+class TestReader(unittest.TestCase):
+
+    def write(self, tmp, name, text, compress=False):
+        path = os.path.join(tmp, name)
+        with (gzip.open(path, 'wt') if compress else open(path, 'w')) as f:
+            f.write(text)
+        return path
+
+    def test_formats(self):
+        text = '\n'.join([GRID + ' naked_twins 0', GRID.replace('.', '0'), '', MULTI_LINE])
+        with tempfile.TemporaryDirectory() as tmp:
+            for compress in (False, True):
+                path = self.write(tmp, 'puzzles', text, compress)
+                self.assertEqual(list(reader.read_grids(path)), [GRID] * 3)
+
+    def test_rejected_records_are_reported(self):
+        lines = [GRID, GRID[:80], '22' + '.' * 79, GRID[:-1] + 'x', '1' + '.' * 79 + '1',
+                 '1........', '.2.......', GRID]
+        report = io.StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.write(tmp, 'puzzles.txt', '\n'.join(lines) + '\n')
+            self.assertEqual(list(reader.read_grids(path, errors=report)), [GRID, GRID])
+        rows = [line.split('\t') for line in report.getvalue().splitlines()]
+        self.assertEqual([int(row[0]) for row in rows], [2, 3, 4, 5, 6])
+        self.assertIn('expected 81 cells', rows[0][1])
+        self.assertIn('given twice', rows[1][1])
+        self.assertIn('unexpected characters: X', rows[2][1])
+        self.assertIn('given twice', rows[3][1])
+        self.assertIn('incomplete grid: 2 of 9 rows', rows[4][1])
+
+    def test_no_digit_left(self):
+        # A1 sees 1-8 in its row and 9 in its column
+        grid = '.12345678' + '9' + '.' * 71
+        self.assertEqual(reader.contradiction(grid, reader.get_topology()), 'no digit left for box A1')
+
+    def test_streaming(self):
+        # records are produced as lines come in, without reading ahead
+        def lines():
+            yield 1, GRID
+            raise AssertionError("read past the first record")
+        self.assertEqual(next(reader.validate(reader.parse(lines()))).grid, GRID)
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self.write(tmp, 'puzzles.gz', GRID + '\nbad\n', compress=True)
+            output, errors = os.path.join(tmp, 'out.txt'), os.path.join(tmp, 'errors.tsv')
+            reader.main([path, '-o', output, '--errors', errors])
+            with open(output) as f:
+                self.assertEqual(f.read(), GRID + '\n')
+            with open(errors) as f:
+                self.assertTrue(f.read().startswith('2\t'))
+
+
+if __name__ == '__main__':
+    unittest.main()
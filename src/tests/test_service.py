@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+import benchmark
+import service
+from budget import BUDGET_EXCEEDED, SOLVED, UNSOLVABLE
+from tests import test_solution
+
+GRID = test_solution.TestDiagonalSudoku.diagonal_grid
+SOLVED_GRID = ''.join(test_solution.TestDiagonalSudoku.solved_diag_sudoku[box]
+                      for box in sorted(test_solution.TestDiagonalSudoku.solved_diag_sudoku))
+
+
+def run_service(coroutine, **options):
+    """Run coroutine(service) against a started service whose batches run in threads"""
+    async def main():
+        with ThreadPoolExecutor(2) as executor:
+            async with service.SolveService(workers=2, executor=executor, **options) as svc:
+                return await coroutine(svc)
+    return asyncio.run(main())
+
+
+class TestSolveService(unittest.TestCase):
+
+    def test_benchmark_stays_out_of_the_service(self):
+        code = 'import sys, service; assert "benchmark" not in sys.modules'
+        subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(__file__)), check=True)
+
+    def test_solve(self):
+        async def check(svc):
+            self.assertEqual(await svc.solve(GRID), {'status': SOLVED, 'solution': SOLVED_GRID})
+            self.assertEqual((await svc.solve(benchmark.load_set('unsolvable')[0]))['status'], UNSOLVABLE)
+            self.assertEqual((await svc.solve('12'))['status'], service.INVALID)
+            self.assertEqual((await svc.solve('x' * 81))['status'], service.INVALID)
+            self.assertEqual((await svc.solve(None))['status'], service.INVALID)
+            conflict = await svc.solve('11' + '.' * 79)
+            self.assertEqual(conflict['status'], UNSOLVABLE)
+            self.assertIn('given twice', conflict['error'])
+            return svc.metrics()
+        metrics = run_service(check)
+        self.assertEqual(metrics['requests'], {SOLVED: 1, UNSOLVABLE: 2, service.INVALID: 3})
+        # contradictions are answered without a worker
+        self.assertEqual(metrics['batches'], 2)
+
+    def test_budget(self):
+        async def check(svc):
+            return await svc.solve(benchmark.load_set('adversarial')[-2])
+        self.assertEqual(run_service(check, max_nodes=5)['status'], BUDGET_EXCEEDED)
+
+    def test_micro_batching(self):
+        grids = benchmark.load_set('easy')
+
+        async def check(svc):
+            responses = await asyncio.gather(*(svc.solve(grid) for grid in grids))
+            return responses, svc.metrics()
+        responses, metrics = run_service(check, batch_size=8, batch_delay=0.01)
+        self.assertTrue(all(response['status'] == SOLVED for response in responses))
+        self.assertEqual(metrics['batches'], 4)
+        self.assertEqual(metrics['mean_batch_size'], len(grids) / 4)
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['in_flight_batches'], 0)
+
+    def test_queue_full(self):
+        async def check(svc):
+            svc.batcher.cancel()  # nothing leaves the queue
+            task = asyncio.ensure_future(svc.solve(GRID))
+            await asyncio.sleep(0)
+            with self.assertRaises(service.QueueFull):
+                await svc.solve(GRID, wait=False)
+            code, payload = await svc.route('POST', '/solve', json.dumps({'grid': GRID}).encode())
+            task.cancel()
+            return code, svc.metrics()['rejected']
+        self.assertEqual(run_service(check, max_queue=1), (503, 2))
+
+    def test_route(self):
+        async def check(svc):
+            return [await svc.route('POST', '/solve', json.dumps({'grid': GRID}).encode()),
+                    await svc.route('POST', '/solve', b'not json'),
+                    await svc.route('POST', '/solve', json.dumps({'grid': '123'}).encode()),
+                    await svc.route('POST', '/solve', json.dumps({'grid': ''}).encode()),
+                    await svc.route('GET', '/solve', b''),
+                    await svc.route('GET', '/nowhere', b''),
+                    await svc.route('GET', '/metrics', b'')]
+        responses = run_service(check)
+        self.assertEqual([code for code, _ in responses], [200, 400, 400, 400, 405, 404, 200])
+        self.assertEqual(responses[0][1]['solution'], SOLVED_GRID)
+        self.assertEqual(responses[-1][1]['requests'], {SOLVED: 1, service.INVALID: 2})
+        self.assertEqual(responses[3][1], {'status': service.INVALID, 'error': 'no grid'})
+
+    def test_http_load_test(self):
+        grids = benchmark.load_set('hard')[:10] + ['123']
+
+        async def check(svc):
+            server = await asyncio.start_server(svc.handle_http, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                report = await service.load_test('127.0.0.1', port, grids, connections=3)
+            return report, svc.metrics()
+        report, metrics = run_service(check)
+        self.assertEqual(report['requests'], 11)
+        self.assertEqual(report['statuses'], {SOLVED: 10, service.INVALID: 1})
+        self.assertEqual(metrics['requests'], report['statuses'])
+        self.assertIsNotNone(metrics['latency_ms'])
+
+    def test_serve_lines(self):
+        lines = [json.dumps({'id': 7, 'grid': GRID}), GRID, '', json.dumps({'grid': '1'}),
+                 json.dumps({'grid': '# comment'}), json.dumps({'op': 'metrics'})]
+
+        async def check(svc):
+            stream = asyncio.StreamReader()
+            stream.feed_data(('\n'.join(lines) + '\n').encode())
+            stream.feed_eof()
+            output = []
+            await svc.serve_lines(stream, output.append)
+            return [json.loads(line) for line in output]
+        responses = run_service(check)
+        self.assertEqual(len(responses), 5)
+        by_id = [response for response in responses if response.get('id') == 7]
+        self.assertEqual(by_id, [{'id': 7, 'status': SOLVED, 'solution': SOLVED_GRID}])
+        statuses = sorted(response['status'] for response in responses if 'status' in response)
+        self.assertEqual(statuses, [service.INVALID, service.INVALID, SOLVED, SOLVED])
+        self.assertTrue(any('queue_depth' in response for response in responses))
+
+    def test_parse_address(self):
+        self.assertEqual(service.parse_address('0.0.0.0:9000'), ('0.0.0.0', 9000))
+        self.assertEqual(service.parse_address(':9000'), ('127.0.0.1', 9000))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import benchmark
+import session
+import solution
+from cache import SolutionCache
+from topology import get_topology
+from utils import grid2values, values2grid
+from tests import test_solution
+
+GRID = test_solution.TestDiagonalSudoku.diagonal_grid
+SOLVED = test_solution.TestDiagonalSudoku.solved_diag_sudoku
+
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        self.game = session.Session(GRID)
+
+    def test_candidates_follow_the_moves(self):
+        values = grid2values(GRID)
+        solution.eliminate(values)
+        self.assertEqual(self.game.values(), values)
+        self.game.place('A2', '9')
+        self.assertEqual(self.game.candidates('A2'), '9')
+        self.assertNotIn('9', self.game.candidates('A3'))
+        self.assertNotIn('9', self.game.candidates('I2'))
+        self.game.place('A2', '3')
+        self.assertIn('9', self.game.candidates('A3'))
+        self.game.clear('A2')
+        self.assertEqual(self.game.values(), values)
+
+    def test_undo(self):
+        before = self.game.values()
+        self.game.place('A2', '9')
+        self.game.place('A2', '3')
+        self.game.clear('B1')  # an empty box: not a move
+        self.game.clear('A2')
+        self.assertEqual(self.game.undo(), 'A2')
+        self.assertEqual(self.game.candidates('A2'), '3')
+        self.assertEqual(self.game.undo(), 'A2')
+        self.assertEqual(self.game.candidates('A2'), '9')
+        self.assertEqual(self.game.undo(), 'A2')
+        self.assertEqual(self.game.values(), before)
+        self.assertIsNone(self.game.undo())
+
+    def test_invalid_moves(self):
+        with self.assertRaises(ValueError):
+            self.game.place('A1', '3')  # a given
+        with self.assertRaises(ValueError):
+            self.game.place('J1', '3')
+        with self.assertRaises(ValueError):
+            self.game.place('A2', '0')
+        with self.assertRaises(ValueError):
+            self.game.clear('A1')
+
+    def test_is_still_solvable(self):
+        self.assertTrue(self.game.is_still_solvable())
+        self.game.place('A2', SOLVED['A2'])
+        self.assertTrue(self.game.is_still_solvable())
+        wrong = next(digit for digit in '123456789' if digit != SOLVED['A3'])
+        self.game.place('A3', wrong)
+        self.assertFalse(self.game.is_still_solvable())
+        self.assertIsNone(self.game.next_hint())
+        self.game.undo()
+        self.assertTrue(self.game.is_still_solvable())
+        self.assertFalse(session.Session(benchmark.load_set('unsolvable')[0]).is_still_solvable())
+
+    def test_other_solutions(self):
+        game = session.Session('.' * 81)
+        first = game.solution[0]
+        other = next(symbol for symbol, bit in game.topology.mask_of.items() if bit != first)
+        game.place('A1', other)
+        self.assertTrue(game.is_still_solvable())
+        self.assertFalse(game.unique)
+        self.assertEqual(game.wrong, 0)
+        game.place('A2', other)  # same digit twice in a row
+        self.assertFalse(game.is_still_solvable())
+
+    def test_hints_solve_the_puzzle(self):
+        for grid in [GRID] + benchmark.load_set('hard')[:2]:
+            game = session.Session(grid)
+            solved = values2grid(solution.solve(grid))
+            strategies = set()
+            while not game.is_solved():
+                hint = game.next_hint()
+                self.assertEqual(hint.digit, solved[game.topology.index[hint.box]], hint)
+                strategies.add(hint.strategy)
+                game.place(hint.box, hint.digit)
+            self.assertIsNone(game.next_hint())
+            self.assertLessEqual(strategies, set(session.HINT_STRATEGIES) | {session.SEARCH})
+            self.assertIn('eliminate', strategies)
+
+    def test_cheapest_hint(self):
+        # a single empty box is a naked single
+        solved = values2grid(SOLVED)
+        game = session.Session('.' + solved[1:])
+        self.assertEqual(game.next_hint(), session.Hint('A1', solved[0], 'eliminate'))
+
+    def test_cache_and_topology(self):
+        cache = SolutionCache()
+        session.Session(GRID, cache=cache)
+        session.Session(GRID, cache=cache)
+        self.assertEqual(cache.counters()['hits'], 1)
+        topology = get_topology(4, diagonals=False)
+        game = session.Session('1...' + '.' * 12, topology)
+        game.place('A2', '1')
+        self.assertFalse(game.is_still_solvable())
+        game.undo()
+        hint = game.next_hint()
+        game.place(hint.box, hint.digit)
+        self.assertTrue(game.is_still_solvable())
+
+
+if __name__ == '__main__':
+    unittest.main()
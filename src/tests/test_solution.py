@@ -5,6 +5,8 @@ own additional test cases to cover any failed tests shown in the Project Assista
 """
 import unittest
 import solution
+import bitboard
+import dlx
 
 
 class TestNakedTwins(unittest.TestCase):
@@ -80,6 +82,16 @@ class TestNakedTwins(unittest.TestCase):
         self.assertTrue(solution.naked_twins(self.before_naked_twins_2) in self.possible_solutions_2,
                         "Your naked_twins function produced an unexpected board.")
 
+class TestNakedTwinsOriginalInput(unittest.TestCase):
+
+    def test_all_twins_from_original_input(self):
+        values = {box: '56789' for box in solution.boxes}
+        values.update({'A1': '23', 'A2': '23', 'A3': '34', 'A4': '34', 'A5': '2345'})
+        result = solution.naked_twins(values)
+        # both pairs are processed even though each one breaks up the other
+        self.assertEqual([result[box] for box in ('A1', 'A2', 'A3', 'A4', 'A5')], ['2', '2', '4', '4', '5'])
+        self.assertEqual(values['A1'], '23')
+
 class TestDiagonalSudoku(unittest.TestCase):
     diagonal_grid = '2.............62....1....7...6..8...3...9...7...6..4...4....8....52.............3'
     solved_diag_sudoku = {'G7': '8', 'G6': '9', 'G5': '7', 'G4': '3', 'G3': '2', 'G2': '4', 'G1': '6', 'G9': '5',
@@ -97,5 +109,33 @@ class TestDiagonalSudoku(unittest.TestCase):
     def test_solve(self):
         self.assertEqual(solution.solve(self.diagonal_grid), self.solved_diag_sudoku)
 
+class TestCountSolutions(unittest.TestCase):
+    engines = ('bitmask', 'string')
+
+    def test_unique(self):
+        for engine in self.engines:
+            self.assertEqual(solution.count_solutions(TestDiagonalSudoku.diagonal_grid, engine=engine), 1)
+            self.assertTrue(solution.has_unique_solution(TestDiagonalSudoku.diagonal_grid, engine=engine))
+
+    def test_limit_stops_early(self):
+        for engine in self.engines:
+            self.assertEqual(solution.count_solutions('.' * 81, limit=5, engine=engine), 5)
+            self.assertFalse(solution.has_unique_solution('.' * 81, engine=engine))
+
+    def test_limit_below_one(self):
+        for engine in self.engines + ('dlx',):
+            for limit in (0, -1):
+                with self.assertRaises(ValueError):
+                    solution.count_solutions('.' * 81, limit=limit, engine=engine)
+        # the engines themselves stop at once rather than enumerating every board
+        self.assertEqual(bitboard.count_solutions(bitboard.grid2cells('.' * 81, solution.tables), solution.tables,
+                                                  limit=0), 1)
+        self.assertEqual(dlx.count_solutions('.' * 81, solution.tables, limit=0), 1)
+
+    def test_unsolvable(self):
+        for engine in self.engines:
+            self.assertEqual(solution.count_solutions('22' + '.' * 79, engine=engine), 0)
+            self.assertIs(solution.solve('22' + '.' * 79, engine=engine), False)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,164 @@
+import unittest
+import benchmark
+import bitboard
+import solution
+from strategies import (DEFAULT_PIPELINE, EXTRA_STRATEGIES, STRATEGY_NAMES, Branching, SolveStats, check_branching,
+                        check_pipeline)
+
+
+class TestPipeline(unittest.TestCase):
+    grid = '.......214...3..8............7.............56.....61.....4....8..3..9....1..6...2'
+
+    def test_check_pipeline(self):
+        self.assertEqual(check_pipeline(['eliminate', 'only_choice']), ('eliminate', 'only_choice'))
+        for pipeline in (('only_choice',), ('eliminate', 'eliminate'), ('eliminate', 'x_wing_typo')):
+            with self.assertRaises(ValueError):
+                check_pipeline(pipeline)
+
+    def test_solve_with_stats(self):
+        expected = solution.solve(self.grid)
+        for engine, pipeline in (('bitmask', ('eliminate',)), ('bitmask', ('eliminate', 'naked_twins', 'only_choice')),
+                                 ('string', ('eliminate', 'only_choice', 'naked_twins'))):
+            values, stats = solution.solve_with_stats(self.grid, engine, pipeline)
+            self.assertEqual(values, expected)
+            self.assertIsInstance(stats, SolveStats)
+            self.assertEqual(tuple(stats.strategies), pipeline)
+            self.assertGreater(stats.nodes, 0)
+            for counter in stats.strategies.values():
+                self.assertGreater(counter.calls, 0)
+                self.assertGreaterEqual(counter.seconds, 0.0)
+            self.assertGreater(stats.strategies['eliminate'].eliminated, 0)
+
+    def test_default_stats_with_another_pipeline(self):
+        pipeline = DEFAULT_PIPELINE + ('x_wing',)
+        for engine in ('bitmask', 'string'):
+            stats = SolveStats()
+            self.assertEqual(solution.solve(self.grid, engine, pipeline=pipeline, stats=stats), solution.solve(self.grid))
+            self.assertGreater(stats.strategies['x_wing'].calls, 0, engine)
+            self.assertIn('x_wing', stats.as_dict()['strategies'])
+
+    def test_stronger_pipeline_needs_fewer_nodes(self):
+        _, weak = solution.solve_with_stats(self.grid, pipeline=('eliminate',))
+        _, strong = solution.solve_with_stats(self.grid)
+        self.assertLess(strong.nodes, weak.nodes)
+
+
+def without(values, digits, boxes):
+    """Clear digits from the candidates of boxes"""
+    for box in boxes:
+        values[box] = ''.join(digit for digit in values[box] if digit not in digits)
+    return values
+
+
+class TestExtraStrategies(unittest.TestCase):
+
+    def apply_both(self, name, values):
+        """Apply a strategy with both engines, checking that they agree"""
+        expected = solution.STRATEGIES[name](values.copy())
+        solver = bitboard.Solver(solution.tables, DEFAULT_PIPELINE + (name,))
+        cells = bitboard.values2cells(values, solution.tables)
+        for u in range(len(solution.unitlist)):
+            self.assertTrue(getattr(solver, name)(cells, u, [], set(), [].append))
+        self.assertEqual(bitboard.cells2values(cells, solution.tables), expected, name)
+        return expected
+
+    def changed(self, before, after):
+        return {box for box in before if before[box] != after[box]}
+
+    def test_x_wing(self):
+        # 1 can only go in columns 1 and 5 of rows A and E
+        values = without(solution.grid2values('.' * 81), '1', [r + c for r in 'AE' for c in '2346789'])
+        result = self.apply_both('x_wing', values)
+        self.assertEqual(self.changed(values, result), {r + c for r in 'BCDFGHI' for c in '15'})
+        self.assertTrue(all('1' not in result[box] for box in self.changed(values, result)))
+
+    def test_pointing_pairs(self):
+        # in the top-left square, 1 can only go in row A
+        values = without(solution.grid2values('.' * 81), '1', ['B1', 'B2', 'B3', 'C1', 'C2', 'C3'])
+        result = self.apply_both('pointing_pairs', values)
+        self.assertEqual(self.changed(values, result), {'A' + c for c in '456789'})
+
+    def test_pointing_pairs_on_a_diagonal(self):
+        # in the top-left square, 1 can only go on the main diagonal
+        values = without(solution.grid2values('.' * 81), '1', ['A2', 'A3', 'B1', 'B3', 'C1', 'C2'])
+        result = self.apply_both('pointing_pairs', values)
+        self.assertEqual(self.changed(values, result), {'D4', 'E5', 'F6', 'G7', 'H8', 'I9'})
+
+    def test_box_line(self):
+        # in row A, 1 can only go in the top-left square
+        values = without(solution.grid2values('.' * 81), '1', ['A' + c for c in '456789'])
+        result = self.apply_both('box_line', values)
+        self.assertEqual(self.changed(values, result), {'B1', 'B2', 'B3', 'C1', 'C2', 'C3'})
+
+    def test_hidden_subsets(self):
+        values = without(solution.grid2values('.' * 81), '12', ['A' + c for c in '3456789'])
+        result = self.apply_both('hidden_pairs', values)
+        self.assertEqual((result['A1'], result['A2']), ('12', '12'))
+        self.assertEqual(self.changed(values, result), {'A1', 'A2'})
+        values = without(solution.grid2values('.' * 81), '123', ['A' + c for c in '456789'])
+        result = self.apply_both('hidden_triples', values)
+        self.assertEqual([result[box] for box in ('A1', 'A2', 'A3')], ['123'] * 3)
+
+    def test_naked_triples(self):
+        values = solution.grid2values('.' * 81)
+        values.update(A1='12', A2='23', A3='13')
+        result = self.apply_both('naked_triples', values)
+        # row A and the top-left square both hold the triple
+        self.assertEqual(self.changed(values, result), {'A' + c for c in '456789'} | {r + c for r in 'BC' for c in '123'})
+
+    def test_same_solutions_fewer_nodes(self):
+        for engine, grids in (('bitmask', benchmark.load_set('adversarial')[:5] + benchmark.load_set('unsolvable')[:3]),
+                              ('string', benchmark.load_set('hard')[:4] + benchmark.load_set('unsolvable')[:2])):
+            default = [solution.solve_with_stats(grid, engine) for grid in grids]
+            for pipeline in [DEFAULT_PIPELINE + (name,) for name in EXTRA_STRATEGIES] + [STRATEGY_NAMES]:
+                results = [solution.solve_with_stats(grid, engine, pipeline) for grid in grids]
+                self.assertEqual([values for values, _ in results], [values for values, _ in default], pipeline)
+            # a single rule can change which box the search branches on, so only all of them together
+            # are sure to save nodes
+            self.assertLess(sum(stats.nodes for _, stats in results), sum(stats.nodes for _, stats in default))
+
+    def test_rules_keep_the_solution(self):
+        for grid in benchmark.load_set('hard')[:10]:
+            expected = solution.solve(grid)
+            for name in EXTRA_STRATEGIES:
+                cells = bitboard.grid2cells(grid, solution.tables)
+                bitboard.Solver(solution.tables, ('eliminate', name)).reduce(cells)
+                for box, mask in zip(solution.boxes, cells):
+                    self.assertTrue(mask & solution.tables.mask_of[expected[box]], (name, grid, box))
+
+
+class TestBranching(unittest.TestCase):
+    grid = TestPipeline.grid
+
+    def test_check_branching(self):
+        self.assertEqual(check_branching(('mrv_degree', 'lcv')), Branching('mrv_degree', 'lcv'))
+        for branching in (('mrv', 'random'), ('degree', 'natural')):
+            with self.assertRaises(ValueError):
+                check_branching(branching)
+
+    def test_same_solution_fewer_nodes(self):
+        expected = solution.solve(self.grid)
+        for engine in ('bitmask', 'string'):
+            _, default = solution.solve_with_stats(self.grid, engine)
+            for branching in (('mrv_degree', 'natural'), ('mrv', 'lcv'), ('mrv_degree', 'lcv')):
+                values, stats = solution.solve_with_stats(self.grid, engine, branching=branching)
+                self.assertEqual(values, expected)
+            _, degree = solution.solve_with_stats(self.grid, engine, branching=('mrv_degree', 'natural'))
+            self.assertLess(degree.nodes, default.nodes)
+
+    def test_degree_tie_break(self):
+        # on an empty board every box ties on candidates; the centre is on both diagonals
+        values = solution.grid2values('.' * 81)
+        self.assertEqual(solution.choose_box(values, 'mrv'), 'A1')
+        self.assertEqual(solution.choose_box(values, 'mrv_degree'), 'E5')
+
+    def test_least_constraining_value(self):
+        values = solution.grid2values('.' * 81)
+        values['A1'] = '12'
+        for peer in ('A2', 'B1', 'C3'):
+            values[peer] = '13456789'
+        self.assertEqual(solution.order_values(values, 'A1', 'lcv'), ['2', '1'])
+        self.assertEqual(solution.order_values(values, 'A1', 'natural'), '12')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+import unittest
+import solution
+from topology import get_topology
+from utils import boxes, extract_peers, extract_units
+
+
+class TestTopology(unittest.TestCase):
+
+    def assertValidSolution(self, values, topology):
+        self.assertTrue(values)
+        for unit in topology.unitlist:
+            self.assertEqual(sorted(values[box] for box in unit), sorted(topology.symbols))
+
+    def test_diagonal_9x9_matches_unit_scan(self):
+        topology = get_topology(9, diagonals=True)
+        self.assertEqual(topology.boxes, boxes)
+        self.assertEqual(len(topology.unitlist), 29)
+        self.assertEqual(topology.peers, dict(extract_peers(extract_units(topology.unitlist, boxes), boxes)))
+
+    def test_cached_by_configuration(self):
+        self.assertIs(get_topology(16, diagonals=False), get_topology(16, diagonals=False))
+        self.assertIsNot(get_topology(16, diagonals=False), get_topology(16, diagonals=True))
+        self.assertIs(get_topology(), solution.tables)
+
+    def test_solution_tables_are_lazy(self):
+        # a fresh interpreter: importing the solver builds no topology, and the
+        # module attributes of the diagonal board are looked up on first access
+        code = ('import solution, topology; assert topology._cached_topology.cache_info().currsize == 0; '
+                'assert solution.peers is solution.topology.peers; '
+                'assert solution.square_units is solution.tables.region_units')
+        subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(os.path.dirname(__file__)), check=True)
+        self.assertEqual(solution.units, get_topology().units)
+        with self.assertRaises(AttributeError):
+            solution.no_such_table
+        units = extract_units(solution.unitlist, boxes)
+        self.assertEqual(dict(units), solution.units)
+
+    def test_star_import_binds_the_tables(self):
+        namespace = {}
+        exec('from solution import *', namespace)
+        for name in solution.BOARD_TABLES:
+            self.assertIs(namespace[name], getattr(solution, name), name)
+        for name in ('solve', 'search', 'reduce_puzzle', 'grid2values', 'boxes'):
+            self.assertIn(name, namespace)
+        self.assertLessEqual(set(solution.BOARD_TABLES), set(dir(solution)))
+
+    def test_solve_other_sizes(self):
+        for size, diagonals in ((4, True), (16, True), (25, False)):
+            topology = get_topology(size, diagonals)
+            self.assertEqual(len(topology.cell_peers[0]), len(topology.peers['A1']))
+            self.assertValidSolution(solution.solve('.' * size * size, topology=topology), topology)
+
+    def test_custom_regions(self):
+        # 6x6 board with 2x3 rectangular regions
+        layout = ''.join(str(r // 2 * 2 + c // 3) for r in range(6) for c in range(6))
+        topology = get_topology(6, diagonals=False, regions=layout)
+        self.assertEqual(topology.region_units[0], ['A1', 'A2', 'A3', 'B1', 'B2', 'B3'])
+        self.assertValidSolution(solution.solve('.' * 36, topology=topology), topology)
+
+    def test_invalid_configurations(self):
+        with self.assertRaises(ValueError):
+            get_topology(6)  # not a square size, needs a region layout
+        with self.assertRaises(ValueError):
+            get_topology(4, regions='0011' * 4)
+        with self.assertRaises(ValueError):
+            solution.solve('.' * 16, engine='string', topology=get_topology(4))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import tempfile
+import unittest
+import solution
+from strategies import SolveStats
+from tracing import SearchTracer
+from tests import test_solution
+
+HARD_GRID = '.......214...3..8............7.............56.....61.....4....8..3..9....1..6...2'
+
+
+class FakeClock:
+    """A clock that ticks one second per reading"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+class TestSearchTracer(unittest.TestCase):
+
+    def test_nodes_match_stats(self):
+        for engine in ('bitmask', 'string', 'dlx'):
+            stats = SolveStats()
+            with SearchTracer() as tracer:
+                solution.solve(HARD_GRID, engine=engine, stats=stats, tracer=tracer)
+            self.assertEqual(tracer.nodes, stats.nodes, engine)
+            self.assertEqual(tracer.solutions, 1)
+            # every node is either on the path to the solution or backtracked
+            self.assertEqual(tracer.backtracks, tracer.nodes - (tracer.events[-1][2]))
+            self.assertGreaterEqual(tracer.max_depth, tracer.events[-1][2])
+
+    def test_no_search(self):
+        with SearchTracer() as tracer:
+            solution.solve(test_solution.TestDiagonalSudoku.diagonal_grid, tracer=tracer)
+        self.assertEqual((tracer.nodes, tracer.solutions, tracer.max_depth), (0, 1, 0))
+
+    def test_intervals(self):
+        tracer = SearchTracer(clock=FakeClock())
+        with tracer:  # started at 1
+            tracer.choose(1, 'A1', 2)   # 2
+            tracer.node(1, 'A1', '1')   # 3
+            tracer.choose(2, 'B2', 2)   # 4
+            tracer.node(2, 'B2', '3')   # 5
+            tracer.node(2, 'B2', '4')   # 6
+            tracer.node(1, 'A1', '2')   # 7
+            tracer.solution(1)          # 8
+        self.assertEqual(tracer.intervals(), [
+            (3, 7, 1, ('A1=1',), 2, True),
+            (5, 6, 2, ('A1=1', 'B2=3'), 2, True),
+            (6, 7, 2, ('A1=1', 'B2=4'), 2, True),
+            (7, 9, 1, ('A1=2',), 2, False),
+        ])
+        self.assertEqual(sorted(tracer.collapsed_stacks()),
+                         ['A1=1 2000000', 'A1=1;B2=3 1000000', 'A1=1;B2=4 1000000', 'A1=2 2000000'])
+        trace = tracer.to_chrome_trace()
+        first = trace['traceEvents'][0]
+        self.assertEqual((first['name'], first['ts'], first['dur'], first['cat']), ('A1=1', 2e6, 4e6, 'backtrack'))
+        self.assertEqual(trace['otherData']['backtracks'], 3)
+
+    def test_write_chrome_trace(self):
+        with SearchTracer() as tracer:
+            solution.solve(HARD_GRID, tracer=tracer)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.json')
+            tracer.write_chrome_trace(path)
+            with open(path) as f:
+                events = json.load(f)['traceEvents']
+        self.assertEqual(sum(1 for event in events if event['ph'] == 'X'), tracer.nodes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import solution
+from utils import RingRecorder, TraceRecorder, grid2values
+from tests import test_solution
+
+
+class TestRecorders(unittest.TestCase):
+    grid = test_solution.TestDiagonalSudoku.diagonal_grid
+
+    def replay(self, recorder, result):
+        values = grid2values(self.grid)
+        for box, value in recorder.reconstruct(result):
+            values[box] = value
+        return values
+
+    def test_trace_recorder_replays_to_solution(self):
+        for engine in ('string', 'bitmask'):
+            recorder = TraceRecorder()
+            result = solution.solve(self.grid, engine=engine, recorder=recorder)
+            self.assertTrue(recorder.history)
+            self.assertEqual(self.replay(recorder, result), result)
+
+    def test_ring_recorder_is_bounded(self):
+        recorder = RingRecorder(maxlen=10)
+        solution.solve(self.grid, engine='string', recorder=recorder)
+        self.assertEqual(len(recorder.history), 10)
+
+    def test_recording_is_scoped_to_one_solve(self):
+        first, second = TraceRecorder(), TraceRecorder()
+        solution.solve(self.grid, recorder=first)
+        solution.solve(self.grid, recorder=second)
+        self.assertEqual(first.history, second.history)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import batch
+import solution
+from topology import get_topology
+from tests import test_solution
+
+try:
+    import numpy
+    import vectorized
+except ImportError:
+    numpy = None
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestVectorized(unittest.TestCase):
+    grids = [test_solution.TestDiagonalSudoku.diagonal_grid,  # solved by propagation alone
+             '.......214...3..8............7.............56.....61.....4....8..3..9....1..6...2',  # needs search
+             '22' + '.' * 79,  # contradiction
+             '.' * 81]
+
+    def test_solve_batch_matches_scalar(self):
+        self.assertEqual(vectorized.solve_batch(self.grids), [batch.solve_grid(grid) for grid in self.grids])
+
+    def test_propagate_status(self):
+        tables = vectorized.get_batch_tables(solution.tables)
+        cells, status = vectorized.propagate(vectorized.grids2cells(self.grids, solution.tables), tables)
+        self.assertEqual(list(status), [vectorized.SOLVED, vectorized.STALLED,
+                                        vectorized.CONTRADICTION, vectorized.STALLED])
+        self.assertEqual(vectorized.cells2grids(cells[:1], tables)[0], batch.solve_grid(self.grids[0]))
+
+    def test_other_topologies(self):
+        for topology in (get_topology(4), get_topology(25, diagonals=False)):
+            grid = vectorized.solve_batch(['.' * len(topology.boxes)], topology)[0]
+            self.assertTrue(solution.has_unique_solution(grid, topology=topology))
+
+    def test_batch_cli_path(self):
+        self.assertEqual(list(batch.solve_grids(self.grids * 3, workers=2, chunksize=5, vectorized=True)),
+                         list(batch.solve_grids(self.grids * 3, workers=1)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""Board topologies: the boxes, units and peers of a sudoku variant.
+
+A Topology describes a size x size board (4x4, 9x9, 16x16, 25x25, ...) with
+square or custom-shaped regions and, optionally, the two diagonal units. It
+holds both the string tables used by the dictionary functions in solution.py
+(``units``, ``peers``) and the integer index tables used by the bitmask engine
+(``unit_cells``, ``cell_units``, ``cell_peers``). Topologies are treated as read-only
+and cached by configuration, so every solve of a given variant shares one instance.
+"""
+from functools import cached_property, lru_cache
+
+from utils import cross
+
+ROW_LABELS = 'ABCDEFGHIJKLMNOPQRSTUVWXY'
+SYMBOLS = '123456789ABCDEFGHIJKLMNOP'
+MAX_SIZE = len(SYMBOLS)
+
+
+def _popcount_table(bits):
+    # doubling the table adds a high bit, i.e. one more to every count
+    increment = bytes(range(1, 256)) + b'\x00'
+    table = b'\x00'
+    for _ in range(bits):
+        table += table.translate(increment)
+    return table
+
+
+# popcount of every 16-bit mask; wider masks are split in two halves
+POPCOUNT16 = _popcount_table(16)
+
+
+class WidePopcount:
+    """Popcount lookup for masks of up to 32 bits that is indexed like the bytes tables"""
+    def __getitem__(self, mask):
+        return POPCOUNT16[mask & 0xFFFF] + POPCOUNT16[mask >> 16]
+
+
+class Topology:
+    """The units and peers of a size x size board.
+
+    Use get_topology() rather than this constructor, so that tables are built once
+    per configuration.
+
+    Parameters
+    ----------
+    size(int)
+        the number of digits, rows and columns (up to 25)
+    diagonals(bool)
+        whether both main diagonals are units too (diagonal sudoku)
+    regions(string)
+        optional custom region layout: size * size characters in row-major order,
+        where boxes marked with the same character form a region. By default
+        regions are the usual sqrt(size) x sqrt(size) squares.
+    """
+    def __init__(self, size=9, diagonals=True, regions=None):
+        if not 1 < size <= MAX_SIZE:
+            raise ValueError("size must be between 2 and {}, got {}".format(MAX_SIZE, size))
+        self.size = size
+        self.diagonals = diagonals
+        self.regions = regions
+        self.rows = ROW_LABELS[:size]
+        self.cols = [str(c) for c in range(1, size + 1)]
+        self.boxes = cross(self.rows, self.cols)
+        self.symbols = SYMBOLS[:size]
+
+        self.row_units = [cross(r, self.cols) for r in self.rows]
+        self.column_units = [cross(self.rows, [c]) for c in self.cols]
+        self.region_units = self._region_units(regions)
+        self.diagonal_units = []
+        if diagonals:
+            self.diagonal_units = [[self.rows[i] + self.cols[i] for i in range(size)],
+                                   [self.rows[i] + self.cols[-1 - i] for i in range(size)]]
+        self.unitlist = self.row_units + self.column_units + self.region_units + self.diagonal_units
+        # unit indices of each kind, in the order of unitlist
+        self.row_ids = range(size)
+        self.column_ids = range(size, 2 * size)
+        self.region_ids = range(2 * size, 3 * size)
+
+        # box -> member units and box -> peers, built in one pass over the units
+        # instead of scanning every unit for every box
+        self.units = {box: [] for box in self.boxes}
+        for unit in self.unitlist:
+            for box in unit:
+                self.units[box].append(unit)
+        self.peers = {box: set().union(*self.units[box]) - {box} for box in self.boxes}
+
+        # the same tables as integer indices, for the bitmask engine
+        self.index = {box: i for i, box in enumerate(self.boxes)}
+        self.unit_cells = tuple(tuple(self.index[box] for box in unit) for unit in self.unitlist)
+        cell_units = [[] for _ in self.boxes]
+        for u, cells in enumerate(self.unit_cells):
+            for i in cells:
+                cell_units[i].append(u)
+        self.cell_units = tuple(tuple(member) for member in cell_units)
+        self.cell_peers = tuple(tuple(sorted(self.index[peer] for peer in self.peers[box]))
+                                for box in self.boxes)
+
+        self.all_digits = (1 << size) - 1
+        self.digit_bits = tuple(1 << d for d in range(size))
+        self.mask_of = dict(zip(self.symbols, self.digit_bits))
+        self.symbol_of = dict(zip(self.digit_bits, self.symbols))
+        self.popcount = POPCOUNT16 if size <= 16 else WidePopcount()
+
+    def _region_units(self, regions):
+        if regions is None:
+            side = int(round(self.size ** 0.5))
+            if side * side != self.size:
+                raise ValueError("a {0}x{0} board needs a custom region layout".format(self.size))
+            row_bands = [self.rows[i:i + side] for i in range(0, self.size, side)]
+            col_bands = [self.cols[i:i + side] for i in range(0, self.size, side)]
+            return [cross(rs, cs) for rs in row_bands for cs in col_bands]
+        if len(regions) != self.size * self.size:
+            raise ValueError("region layout must have {} cells, got {}".format(self.size * self.size, len(regions)))
+        units = {}
+        for label, box in zip(regions, self.boxes):
+            units.setdefault(label, []).append(box)
+        if len(units) != self.size or any(len(unit) != self.size for unit in units.values()):
+            raise ValueError("region layout must define {0} regions of {0} boxes each".format(self.size))
+        return list(units.values())
+
+    @cached_property
+    def intersections(self):
+        """For each unit, a (shared, outside, rest) tuple of box indices for every other
+        unit it shares at least two boxes with: the shared boxes, the boxes of the unit
+        outside the other unit, and the boxes of the other unit outside this one.
+        Only the pointing_pairs and box_line strategies need it, so it is built on first use.
+        """
+        result = []
+        for cells in self.unit_cells:
+            members = set(cells)
+            result.append(tuple(
+                (tuple(i for i in cells if i in other), tuple(i for i in cells if i not in other),
+                 tuple(i for i in other_cells if i not in members))
+                for other, other_cells in ((set(other_cells), other_cells) for other_cells in self.unit_cells)
+                if other_cells is not cells and len(members & other) >= 2))
+        return tuple(result)
+
+    def mask2symbols(self, mask):
+        """Convert a candidate mask into the string of symbols it allows, e.g. 0b101 -> '13'"""
+        return ''.join(symbol for symbol, bit in zip(self.symbols, self.digit_bits) if mask & bit)
+
+    def __repr__(self):
+        return 'Topology(size={}, diagonals={}, regions={!r})'.format(self.size, self.diagonals, self.regions)
+
+
+def get_topology(size=9, diagonals=True, regions=None):
+    """Return the shared Topology for a board configuration, building it on first use"""
+    # normalize the arguments, lru_cache keys positional and keyword calls apart
+    return _cached_topology(size, bool(diagonals), regions)
+
+
+@lru_cache(maxsize=None)
+def _cached_topology(size, diagonals, regions):
+    return Topology(size, diagonals, regions)
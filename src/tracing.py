@@ -0,0 +1,152 @@
+"""Search-tree tracing: which box each choice point picked, every node tried,
+how deep the search went and where it backtracked, with timestamps.
+
+The engines report three events to the tracer of a solve:
+
+- choose(depth, box, candidates): a choice point picked box, which has that many candidates
+- node(depth, box, digit): the search tries digit in box, at that depth (1 for the
+  first choice point)
+- solution(depth): every box is solved
+
+A node ends when the search tries another node at the same depth or above, or
+when tracing finishes. Nodes that end without having led to a solution are
+backtracks. Like recorders (see utils.NullRecorder), the default tracer is
+disabled and the engines skip the calls altogether, so an untraced solve pays
+one boolean check per search node.
+
+    with SearchTracer() as tracer:
+        solve(grid, tracer=tracer)
+    tracer.write_chrome_trace('solve.json')  # open in chrome://tracing or Perfetto
+"""
+from time import perf_counter
+
+
+class NullTracer:
+    """Tracer that ignores every event. It is the default for every solve."""
+    enabled = False
+
+    def choose(self, depth, box, candidates):
+        pass
+
+    def node(self, depth, box, digit):
+        pass
+
+    def solution(self, depth):
+        pass
+
+
+NULL_TRACER = NullTracer()
+
+
+class SearchTracer(NullTracer):
+    """Tracer that keeps every event in memory, timestamped with clock().
+    Use it as a context manager to mark the start and the end of the trace.
+    Subclasses can override choose/node/solution to act on events as they come,
+    calling the base methods to keep them recorded.
+    """
+    enabled = True
+
+    def __init__(self, clock=perf_counter):
+        self.clock = clock
+        self.events = []  # (timestamp, kind, depth, box, value), value is a digit or a candidate count
+        self.nodes = 0
+        self.solutions = 0
+        self.max_depth = 0
+        self.started = self.finished = None
+
+    def __enter__(self):
+        self.started = self.clock()
+        self.finished = None
+        return self
+
+    def __exit__(self, *exc_info):
+        self.finished = self.clock()
+
+    def choose(self, depth, box, candidates):
+        self.events.append((self.clock(), 'choose', depth, box, candidates))
+
+    def node(self, depth, box, digit):
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        self.events.append((self.clock(), 'node', depth, box, digit))
+
+    def solution(self, depth):
+        self.solutions += 1
+        self.events.append((self.clock(), 'solution', depth, None, None))
+
+    def intervals(self):
+        """Replay the events into one entry per node
+        Returns
+        -------
+        list
+            (start, end, depth, path, candidates, backtracked) tuples in start order, where
+            path is the tuple of 'box=digit' names from the first choice point to the node
+        """
+        end_of_trace = self.finished or (self.events[-1][0] if self.events else 0.0)
+        result = []
+        open_nodes = []  # [start, depth, path, candidates, on a solution path]
+        candidates = {}
+
+        def close(until_depth, at):
+            while open_nodes and open_nodes[-1][1] >= until_depth:
+                start, depth, path, count, solved = open_nodes.pop()
+                result.append((start, at, depth, path, count, not solved))
+
+        for timestamp, kind, depth, box, value in self.events:
+            if kind == 'choose':
+                candidates[depth] = value
+            elif kind == 'node':
+                close(depth, timestamp)
+                path = (open_nodes[-1][2] if open_nodes else ()) + ('{}={}'.format(box, value),)
+                open_nodes.append([timestamp, depth, path, candidates.get(depth), False])
+            else:
+                for entry in open_nodes:
+                    entry[4] = True
+        close(0, end_of_trace)
+        result.sort()
+        return result
+
+    @property
+    def backtracks(self):
+        return sum(1 for interval in self.intervals() if interval[5])
+
+    def summary(self):
+        return {'nodes': self.nodes, 'backtracks': self.backtracks, 'max_depth': self.max_depth,
+                'solutions': self.solutions,
+                'seconds': (self.finished or self.clock()) - self.started if self.started else None}
+
+    def to_chrome_trace(self):
+        """Return the trace in the Chrome trace event format: one complete ('X')
+        event per node, nested by depth, and an instant event per solution
+        """
+        origin = self.started if self.started is not None else (self.events[0][0] if self.events else 0.0)
+        micros = lambda t: (t - origin) * 1e6
+        events = []
+        for start, end, depth, path, candidates, backtracked in self.intervals():
+            events.append({'name': path[-1], 'cat': 'backtrack' if backtracked else 'solution path',
+                           'ph': 'X', 'ts': micros(start), 'dur': micros(end) - micros(start),
+                           'pid': 0, 'tid': 0,
+                           'args': {'depth': depth, 'candidates': candidates}})
+        for timestamp, kind, depth, _, _ in self.events:
+            if kind == 'solution':
+                events.append({'name': 'solution', 'ph': 'i', 's': 't', 'ts': micros(timestamp),
+                               'pid': 0, 'tid': 0, 'args': {'depth': depth}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.summary()}
+
+    def write_chrome_trace(self, path):
+        import json  # kept off the import path of the solver
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def collapsed_stacks(self):
+        """Return the trace as collapsed stacks, one 'A1=3;B4=7 <self microseconds>'
+        line per node, the input format of flamegraph.pl and speedscope
+        """
+        self_time = {}
+        for start, end, depth, path, _, _ in self.intervals():
+            duration = (end - start) * 1e6
+            self_time[path] = self_time.get(path, 0.0) + duration
+            if len(path) > 1:
+                self_time[path[:-1]] = self_time.get(path[:-1], 0.0) - duration
+        return ['{} {}'.format(';'.join(path), max(0, int(round(t)))) for path, t in self_time.items()]
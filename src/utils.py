@@ -1,4 +1,4 @@
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 rows = 'ABCDEFGHI'
 cols = '123456789'
@@ -8,7 +8,6 @@ def cross(A, B):
     return [x+y for x in A for y in B]
 
 boxes = cross(rows, cols)
-history = {}  # history must be declared here so that it exists in the assign_values scope
 
 def extract_units(unitlist, boxes):
     """Initialize a mapping from box names to the units that the boxes belong to
@@ -26,9 +25,11 @@ def extract_units(unitlist, boxes):
     """
     # the value for keys that aren't in the dictionary are initialized as an empty list
     units = defaultdict(list)
-    for current_box in boxes:
-        for unit in unitlist:
-            if current_box in unit:
+    wanted = set(boxes)
+    # one pass over the units instead of a membership scan of every unit for every box
+    for unit in unitlist:
+        for current_box in unit:
+            if current_box in wanted:
                 # defaultdict avoids this raising a KeyError when new keys are added
                 units[current_box].append(unit)
     return units
@@ -60,27 +61,73 @@ def extract_peers(units, boxes):
                     peers[key_box].add(peer_box)
     return peers
 
-def assign_value(values, box, value):
+class NullRecorder:
+    """Assignment recorder that drops everything. It is the default for every solve,
+    so headless runs never pay for serializing the board.
+    """
+    enabled = False
+
+    def record(self, prev, grid, step):
+        pass
+
+class TraceRecorder:
+    """Assignment recorder that keeps the full history of a single solve in memory,
+    in the format expected by reconstruct() and PySudoku.play()
+    """
+    enabled = True
+
+    def __init__(self):
+        self.history = {}
+
+    def record(self, prev, grid, step):
+        """Store the (box, value) step that turned the prev grid string into grid"""
+        self.history[grid] = (prev, step)
+
+    def reconstruct(self, values):
+        """Return the list of (box, value) assignments that lead to the given board"""
+        return reconstruct(values, self.history)
+
+class RingRecorder(TraceRecorder):
+    """Trace recorder that only keeps the most recent maxlen assignments"""
+    def __init__(self, maxlen=1000):
+        if maxlen < 1:
+            raise ValueError("maxlen must be at least 1")
+        self.maxlen = maxlen
+        self.history = OrderedDict()
+
+    def record(self, prev, grid, step):
+        self.history.pop(grid, None)
+        self.history[grid] = (prev, step)
+        if len(self.history) > self.maxlen:
+            self.history.popitem(last=False)
+
+NULL_RECORDER = NullRecorder()
+
+def assign_value(values, box, value, recorder=NULL_RECORDER):
     """You must use this function to update your values dictionary if you want to
-    try using the provided visualization tool. This function records each assignment
-    (in order) for later reconstruction.
+    try using the provided visualization tool. Assignments are handed to the
+    recorder (in order) for later reconstruction.
     Parameters
     ----------
     values(dict)
         a dictionary of the form {'box_name': '123456789', ...}
+    recorder(NullRecorder or TraceRecorder)
+        receives each assignment that solves a box; nothing is recorded by default
     Returns
     -------
     dict
-        The values dictionary with the naked twins eliminated from peers
+        The values dictionary with the new value assigned to box
     """
     # Don't waste memory appending actions that don't actually change any values
     if values[box] == value:
         return values
 
-    prev = values2grid(values)
-    values[box] = value
-    if len(value) == 1:
-        history[values2grid(values)] = (prev, (box, value))
+    if len(value) == 1 and recorder.enabled:
+        prev = values2grid(values)
+        values[box] = value
+        recorder.record(prev, values2grid(values), (box, value))
+    else:
+        values[box] = value
     return values
 
 def values2grid(values):
@@ -115,12 +162,14 @@ def grid2values(grid):
     -------
         A grid in dictionary form
             Keys: The boxes, e.g., 'A1'
-            Values: The value in each box, e.g., '8'. If the box has no value,
-            then the value will be '123456789'.
+            Values: The value in each box, e.g., '8'. If the box has no value
+            ('.' or '0'), then the value will be '123456789'.
     """
+    if len(grid) != len(boxes):
+        raise ValueError("expected a grid of {} characters, got {}".format(len(boxes), len(grid)))
     sudoku_grid = {}
     for val, key in zip(grid, boxes):
-        if val == '.':
+        if val in '.0':
             sudoku_grid[key] = '123456789'
         else:
             sudoku_grid[key] = val
@@ -0,0 +1,190 @@
+"""Vectorized constraint propagation for many boards at once, with NumPy.
+
+B boards are stored as a (B, boxes) array of candidate masks, the same masks the
+bitmask engine uses. Each round applies eliminate and only_choice to every
+board still in play with a handful of array operations over precomputed peer
+and unit index matrices. Boards that propagation alone cannot finish are
+handed to the bitmask engine's search, one at a time.
+
+NumPy is an optional dependency: it is only needed by this module.
+"""
+import numpy as np
+
+import bitboard
+from strategies import DEFAULT_PIPELINE
+from topology import POPCOUNT16, get_topology
+
+POPCOUNT_TABLE = np.frombuffer(POPCOUNT16, dtype=np.uint8)
+
+# propagation outcome of each board
+STALLED, SOLVED, CONTRADICTION = 0, 1, 2
+
+
+class BatchTables:
+    """Peer and unit index matrices of a topology, padded to rectangular shape.
+    Peer rows are padded with the index of an extra, always-empty column that is
+    appended to the boards during elimination.
+    """
+    def __init__(self, topology):
+        self.topology = topology
+        self.dtype = np.uint16 if topology.size <= 16 else np.uint32
+        pad = len(topology.boxes)
+        width = max(len(peers) for peers in topology.cell_peers)
+        self.peers = np.full((pad, width), pad, dtype=np.intp)
+        for i, peers in enumerate(topology.cell_peers):
+            self.peers[i, :len(peers)] = peers
+        self.units = np.array(topology.unit_cells, dtype=np.intp)
+        self.all_digits = self.dtype(topology.all_digits)
+        self.digit_bits = np.array(topology.digit_bits, dtype=self.dtype)
+        # character code -> mask for reading grids; anything but a symbol is empty
+        self.mask_of_char = np.full(256, topology.all_digits, dtype=self.dtype)
+        for symbol, bit in topology.mask_of.items():
+            self.mask_of_char[ord(symbol)] = bit
+        # single-digit mask -> character code for writing grids
+        self.char_of_bit = {bit: ord(symbol) for bit, symbol in topology.symbol_of.items()}
+        self.char_of_mask16 = np.full(1 << 16, ord('.'), dtype=np.uint8)
+        if self.dtype == np.uint16:
+            for bit, char in self.char_of_bit.items():
+                self.char_of_mask16[bit] = char
+
+    def char_of_mask(self, cells):
+        """Character codes of an array of masks: the symbol of solved boxes, '.' otherwise"""
+        if self.dtype == np.uint16:
+            return self.char_of_mask16[cells]
+        chars = np.full(cells.shape, ord('.'), dtype=np.uint8)
+        for bit, char in self.char_of_bit.items():
+            chars[cells == bit] = char
+        return chars
+
+
+_batch_tables = {}
+
+
+def get_batch_tables(topology):
+    """Return the BatchTables of a topology, building them on first use"""
+    if topology not in _batch_tables:
+        _batch_tables[topology] = BatchTables(topology)
+    return _batch_tables[topology]
+
+
+def popcount(cells):
+    """Number of candidates in each mask of an array"""
+    if cells.dtype == np.uint16:
+        return POPCOUNT_TABLE[cells]
+    return POPCOUNT_TABLE[cells & 0xFFFF] + POPCOUNT_TABLE[cells >> 16]
+
+
+def grids2cells(grids, topology):
+    """Convert grid strings into a (B, boxes) array of candidate masks"""
+    tables = get_batch_tables(topology)
+    n = len(topology.boxes)
+    for grid in grids:
+        if len(grid) != n:
+            raise ValueError("expected grids of {} characters, got {!r}".format(n, grid))
+    chars = np.frombuffer(''.join(grids).encode('ascii'), dtype=np.uint8)
+    return tables.mask_of_char[chars].reshape(len(grids), n)
+
+
+def cells2grids(cells, tables):
+    """Convert a (B, boxes) array of candidate masks into grid strings ('.' for unsolved boxes)"""
+    chars = tables.char_of_mask(cells)
+    return [row.tobytes().decode('ascii') for row in chars]
+
+
+def eliminate(cells, tables):
+    """Clear the digits of all solved boxes from their peers, for every board at once"""
+    solved = np.where(popcount(cells) == 1, cells, 0)
+    solved = np.concatenate([solved, np.zeros((len(cells), 1), dtype=cells.dtype)], axis=1)
+    taken = np.bitwise_or.reduce(solved[:, tables.peers], axis=2)
+    return cells & ~taken
+
+
+def only_choice(cells, tables):
+    """Assign every digit that has a single place left in a unit, for every board at once.
+    Returns the new cells and a boolean array flagging boards with a contradiction.
+    """
+    units = cells[:, tables.units]  # (B, units, size)
+    # digits seen at least once / at least twice in each unit
+    once = np.zeros(units.shape[:2], dtype=cells.dtype)
+    twice = np.zeros_like(once)
+    for k in range(units.shape[2]):
+        twice |= once & units[:, :, k]
+        once |= units[:, :, k]
+    missing = (once != tables.all_digits).any(axis=1)
+    hidden = once & ~twice
+    hits = units & hidden[:, :, None]
+    assigned = np.zeros_like(cells)
+    rows = np.arange(len(cells))[:, None]
+    for u in range(tables.units.shape[0]):
+        assigned[rows, tables.units[u]] |= hits[:, u, :]
+    conflict = (popcount(assigned) > 1).any(axis=1)
+    cells = np.where(assigned != 0, assigned & cells, cells)
+    return cells, missing | conflict
+
+
+def propagate(cells, tables, max_rounds=None):
+    """Apply eliminate and only_choice rounds to every board until each one is
+    solved, contradicted or stalled
+    Parameters
+    ----------
+    cells(ndarray)
+        (B, boxes) candidate masks; not modified
+    tables(BatchTables)
+        the index matrices of the topology
+    max_rounds(int)
+        stop after this many rounds even if some boards still change
+    Returns
+    -------
+    tuple
+        The propagated cells and an array with the status of each board
+        (STALLED, SOLVED or CONTRADICTION)
+    """
+    cells = cells.copy()
+    status = np.full(len(cells), STALLED, dtype=np.uint8)
+    active = np.arange(len(cells))
+    rounds = 0
+    while len(active) and (max_rounds is None or rounds < max_rounds):
+        rounds += 1
+        before = cells[active]
+        after, contradiction = only_choice(eliminate(before, tables), tables)
+        contradiction |= (after == 0).any(axis=1)
+        cells[active] = after
+        status[active[contradiction]] = CONTRADICTION
+        solved = ~contradiction & (popcount(after) == 1).all(axis=1)
+        status[active[solved]] = SOLVED
+        changed = (after != before).any(axis=1)
+        active = active[changed & ~contradiction & ~solved]
+    return cells, status
+
+
+def solve_batch(grids, topology=None, pipeline=DEFAULT_PIPELINE):
+    """Solve a batch of grids: vectorized propagation first, then search for the
+    boards it could not finish
+    Parameters
+    ----------
+    grids(list)
+        grid strings of the same topology
+    topology(Topology)
+        the board variant, 9x9 diagonal sudoku by default
+    pipeline(tuple)
+        the strategies used by the search of stalled boards
+    Returns
+    -------
+    list
+        The solved grid string of each board, or False if it has no solution
+    """
+    topology = topology or get_topology()
+    tables = get_batch_tables(topology)
+    cells, status = propagate(grids2cells(grids, topology), tables)
+    # the last round can fill in boxes that eliminate never got to check
+    solved = status == SOLVED
+    inconsistent = np.bitwise_or.reduce(cells[:, tables.units], axis=2) != tables.all_digits
+    status[solved & inconsistent.any(axis=1)] = CONTRADICTION
+    results = cells2grids(cells, tables)
+    for row in np.flatnonzero(status != SOLVED):
+        if status[row] == CONTRADICTION:
+            results[row] = False
+            continue
+        board = bitboard.search(bitboard.new_cells(topology, cells[row].tolist()), topology, pipeline=pipeline)
+        results[row] = board and bitboard.cells2grid(board, topology)
+    return results